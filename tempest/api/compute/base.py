@@ -15,12 +15,15 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import logging
 import time
 
 from tempest.api import compute
 from tempest import clients
+from tempest.common import teardown
 from tempest.common.utils.data_utils import rand_name
+from tempest.common import waiters
 from tempest import exceptions
 import tempest.test
 
@@ -158,17 +161,16 @@ class BaseComputeTest(tempest.test.BaseTestCase):
 
     @classmethod
     def clear_servers(cls):
+        graph = teardown.TeardownGraph()
+        terminated = teardown.BulkWait(
+            lambda ids: cls.servers_client.wait_for_servers_status(
+                ids, waiters.DELETED, ignore_error=True))
         for server in cls.servers:
-            try:
-                cls.servers_client.delete_server(server['id'])
-            except Exception:
-                pass
-
-        for server in cls.servers:
-            try:
-                cls.servers_client.wait_for_server_termination(server['id'])
-            except Exception:
-                pass
+            graph.add(server['id'],
+                      functools.partial(cls.servers_client.delete_server,
+                                        server['id']),
+                      wait=terminated)
+        graph.run()
 
     @classmethod
     def tearDownClass(cls):
@@ -194,6 +196,18 @@ class BaseComputeTest(tempest.test.BaseTestCase):
 
         return resp, server
 
+    @classmethod
+    def wait_for_servers(cls, servers, status):
+        """
+        Waits for several servers at once and returns their refreshed
+        details, in the same order. Create every server first, then wait
+        for all of them: they build in parallel and are polled with a
+        single list call.
+        """
+        details = cls.servers_client.wait_for_servers_status(
+            [server['id'] for server in servers], status)
+        return [details[server['id']] for server in servers]
+
     def wait_for(self, condition):
         """Repeatedly calls condition() until a timeout."""
         start_time = int(time.time())
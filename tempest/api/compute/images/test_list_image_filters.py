@@ -32,10 +32,8 @@ class ListImageFiltersTestJSON(base.BaseComputeTest):
 
         try:
             resp, cls.server1 = cls.create_server()
-            resp, cls.server2 = cls.create_server(wait_until='ACTIVE')
-            # NOTE(sdague) this is faster than doing the sync wait_util on both
-            cls.servers_client.wait_for_server_status(cls.server1['id'],
-                                                      'ACTIVE')
+            resp, cls.server2 = cls.create_server()
+            cls.wait_for_servers([cls.server1, cls.server2], 'ACTIVE')
 
             # Create images to be used in the filter tests
             image1_name = rand_name('image')
@@ -67,12 +67,8 @@ class ListServerFiltersTestJSON(base.BaseComputeTest):
         resp, cls.s3 = cls.client.create_server(cls.s3_name, cls.image_ref,
                                                 cls.flavor_ref_alt)
 
-        cls.client.wait_for_server_status(cls.s1['id'], 'ACTIVE')
-        resp, cls.s1 = cls.client.get_server(cls.s1['id'])
-        cls.client.wait_for_server_status(cls.s2['id'], 'ACTIVE')
-        resp, cls.s2 = cls.client.get_server(cls.s2['id'])
-        cls.client.wait_for_server_status(cls.s3['id'], 'ACTIVE')
-        resp, cls.s3 = cls.client.get_server(cls.s3['id'])
+        cls.s1, cls.s2, cls.s3 = cls.wait_for_servers(
+            [cls.s1, cls.s2, cls.s3], 'ACTIVE')
 
         cls.fixed_network_name = cls.config.compute.fixed_network_name
 
@@ -50,13 +50,9 @@ class MultipleCreateTestJSON(base.BaseComputeTest):
         # class.
         self.servers.extend(created_servers)
         # NOTE(maurosr): get a server list, check status of the ones with names
-        # that match and wait for them become active. At a first look, since
-        # they are building in parallel, wait inside the for doesn't seem be
-        # harmful to the performance
+        # that match and wait for them become active.
         if wait_until is not None:
-            for server in created_servers:
-                self.servers_client.wait_for_server_status(server['id'],
-                                                           wait_until)
+            self.wait_for_servers(created_servers, wait_until)
 
         return resp, body
 
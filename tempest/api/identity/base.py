@@ -27,6 +27,9 @@ class BaseIdentityAdminTest(tempest.test.BaseTestCase):
     def setUpClass(cls):
         os = clients.AdminManager(interface=cls._interface)
         cls.client = os.identity_client
+        # NOTE: tests revoke the token of this client on purpose and expect
+        # the following request to be rejected rather than replayed.
+        cls.client.reauth_on_unauthorized = False
         cls.token_client = os.token_client
         cls.endpoints_client = os.endpoints_client
         cls.v3_client = os.identity_v3_client
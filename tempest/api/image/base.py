@@ -17,6 +17,7 @@
 import logging
 
 from tempest import clients
+from tempest.common import image_cache
 from tempest.common.utils.data_utils import rand_name
 from tempest import exceptions
 import tempest.test
@@ -31,9 +32,16 @@ class BaseImageTest(tempest.test.BaseTestCase):
     def setUpClass(cls):
         cls.os = clients.Manager()
         cls.created_images = []
+        cls.fixture_images = []
 
     @classmethod
     def tearDownClass(cls):
+        # Shared fixture images are deleted once no test class uses them
+        cache = image_cache.get_cache()
+        for image_id in cls.fixture_images:
+            cache.release(image_id)
+        cache.purge()
+
         for image_id in cls.created_images:
             try:
                 cls.client.delete_image(image_id)
@@ -59,6 +67,46 @@ class BaseImageTest(tempest.test.BaseTestCase):
         cls.created_images.append(image['id'])
         return resp, image
 
+    @classmethod
+    def get_image_fixture(cls, data, container_format, disk_format,
+                          **kwargs):
+        """Return the id of an active image holding data.
+
+        The images holding the same data and metadata are shared by the
+        test classes of a run, see image_cache, so tests must not modify
+        or delete them. Their ids are listed in cls.fixture_images, whether
+        they are shared or not.
+
+        :param data: a string or a seekable file-like object
+        """
+        if not cls.config.images.reuse_fixture_images:
+            image_id = cls._upload_image(None, data, container_format,
+                                         disk_format, **kwargs)
+            # NOTE: deleted with the images of the class, the cache
+            # doesn't know about it
+            cls.created_images.append(image_id)
+            cls.fixture_images.append(image_id)
+            return image_id
+
+        # NOTE: images are only visible from their endpoint, and private
+        # ones from their tenant
+        cls.client.get_auth()
+        cache = image_cache.get_cache()
+        key = image_cache.fixture_key(
+            image_cache.data_md5(data), keep=cache.keep,
+            endpoint=cls.client.base_url, tenant=cls.client.tenant_name,
+            container_format=container_format, disk_format=disk_format,
+            **kwargs)
+
+        def create(key):
+            return cls._upload_image(key, data, container_format,
+                                     disk_format, **kwargs)
+
+        image_id = cache.acquire(key, cls._find_image_fixture, create,
+                                 cls.client.delete_image)
+        cls.fixture_images.append(image_id)
+        return image_id
+
     @classmethod
     def _check_version(cls, version):
         __, versions = cls.client.get_versions()
@@ -81,6 +129,29 @@ class BaseV1ImageTest(BaseImageTest):
             msg = "Glance API v1 not supported"
             raise cls.skipException(msg)
 
+    @classmethod
+    def _upload_image(cls, key, data, container_format, disk_format,
+                      **kwargs):
+        """Create an image holding data, tagged with the fixture key."""
+        name = kwargs.pop('name', rand_name(cls.__name__ + "-fixture"))
+        if key is not None:
+            properties = dict(kwargs.pop('properties', {}))
+            properties[image_cache.FIXTURE_PROPERTY] = key
+            kwargs['properties'] = properties
+        resp, image = cls.client.create_image(name, container_format,
+                                              disk_format, data=data,
+                                              **kwargs)
+        return image['id']
+
+    @classmethod
+    def _find_image_fixture(cls, key):
+        prop = image_cache.FIXTURE_PROPERTY
+        resp, images = cls.client.image_list_detail(
+            status='active', **{'property-%s' % prop: key})
+        for image in images:
+            if image.get('properties', {}).get(prop) == key:
+                return image['id']
+
 
 class BaseV2ImageTest(BaseImageTest):
 
@@ -91,3 +162,30 @@ class BaseV2ImageTest(BaseImageTest):
         if not cls._check_version('v2.0'):
             msg = "Glance API v2 not supported"
             raise cls.skipException(msg)
+
+    @classmethod
+    def _upload_image(cls, key, data, container_format, disk_format,
+                      **kwargs):
+        """Create an image holding data, tagged with the fixture key."""
+        name = kwargs.pop('name', rand_name(cls.__name__ + "-fixture"))
+        if key is not None:
+            properties = dict(kwargs.pop('properties', {}))
+            properties[image_cache.FIXTURE_PROPERTY] = key
+            kwargs['properties'] = properties
+        resp, image = cls.client.create_image(name, container_format,
+                                              disk_format, **kwargs)
+        try:
+            cls.client.store_image(image['id'], data)
+        except Exception:
+            cls.client.delete_image(image['id'])
+            raise
+        return image['id']
+
+    @classmethod
+    def _find_image_fixture(cls, key):
+        prop = image_cache.FIXTURE_PROPERTY
+        resp, images = cls.client.image_list({prop: key,
+                                              'status': 'active'})
+        for image in images:
+            if image.get(prop) == key:
+                return image['id']
@@ -16,6 +16,7 @@
 #    under the License.
 
 import cStringIO as StringIO
+import hashlib
 
 from tempest.api.image import base
 from tempest import exceptions
@@ -60,6 +61,26 @@ class CreateRegisterImagesTest(base.BaseV1ImageTest):
         self.assertTrue('size' in body)
         self.assertEqual(1024, body.get('size'))
 
+    @attr(type='gate')
+    def test_upload_from_generator_then_stream(self):
+        # Upload image data from a generator, then stream it back
+        resp, body = self.create_image(name='New Streamed Image',
+                                       container_format='bare',
+                                       disk_format='raw')
+        image_id = body.get('id')
+        self.created_images.append(image_id)
+        data = '*' * 2048
+        resp, body = self.client.update_image(
+            image_id, data=(data[i:i + 512] for i in xrange(0, 2048, 512)))
+        self.assertEqual(2048, body.get('size'))
+        self.assertEqual(hashlib.md5(data).hexdigest(), body.get('checksum'))
+
+        dest = StringIO.StringIO()
+        resp, body = self.client.get_image_streaming(image_id, dest=dest)
+        self.assertEqual(200, resp.status)
+        self.assertEqual(data, dest.getvalue())
+        self.assertEqual(hashlib.md5(data).hexdigest(), body.hexdigest())
+
     @attr(type='gate')
     def test_register_remote_image(self):
         # Register a new remote image
@@ -17,7 +17,7 @@
 #    under the License.
 
 import cStringIO as StringIO
-import random
+import hashlib
 
 from tempest.api.image import base
 from tempest import exceptions
@@ -66,6 +66,26 @@ class CreateRegisterImagesTest(base.BaseV2ImageTest):
         self.assertTrue('size' in body)
         self.assertEqual(1024, body.get('size'))
 
+    @attr(type='gate')
+    def test_store_from_generator_then_stream(self):
+        # Store image data from a generator, then stream it back
+        resp, body = self.create_image(name='New Streamed Image',
+                                       container_format='bare',
+                                       disk_format='raw')
+        image_id = body.get('id')
+        self.created_images.append(image_id)
+        data = '*' * 2048
+        resp, body = self.client.store_image(
+            image_id, (data[i:i + 512] for i in xrange(0, 2048, 512)))
+        self.assertEqual(204, resp.status)
+
+        dest = StringIO.StringIO()
+        resp, body = self.client.get_image_file_streaming(image_id,
+                                                          dest=dest)
+        self.assertEqual(200, resp.status)
+        self.assertEqual(data, dest.getvalue())
+        self.assertEqual(hashlib.md5(data).hexdigest(), body.hexdigest())
+
 
 class ListImagesTest(base.BaseV2ImageTest):
 
@@ -79,24 +99,22 @@ class ListImagesTest(base.BaseV2ImageTest):
         # We add a few images here to test the listing functionality of
         # the images API
         for x in xrange(0, 10):
-            cls.created_images.append(cls._create_standard_image(x))
+            cls._create_standard_image(x)
 
     @classmethod
     def _create_standard_image(cls, number):
         """
         Create a new standard image and return the ID of the newly-registered
-        image. Note that the size of the new image is a random number between
-        1024 and 4096
+        image. Note that the size of the new image is between 1024 and 4096,
+        and depends on number only, so that the image can be shared with
+        other test classes and runs (see get_image_fixture)
         """
-        image_file = StringIO.StringIO('*' * random.randint(1024, 4096))
+        image_file = StringIO.StringIO('*' * (1024 + number * 307))
         name = 'New Standard Image %s' % number
-        resp, body = cls.create_image(name=name, container_format='bare',
-                                      disk_format='raw',
-                                      visibility='public')
-        image_id = body['id']
-        resp, body = cls.client.store_image(image_id, data=image_file)
-
-        return image_id
+        return cls.get_image_fixture(image_file, name=name,
+                                     container_format='bare',
+                                     disk_format='raw',
+                                     visibility='public')
 
     @attr(type='gate')
     def test_index_no_params(self):
@@ -104,5 +122,5 @@ class ListImagesTest(base.BaseV2ImageTest):
         resp, images_list = self.client.image_list()
         self.assertEqual(resp['status'], '200')
         image_list = map(lambda x: x['id'], images_list)
-        for image in self.created_images:
+        for image in self.fixture_images:
             self.assertTrue(image in image_list)
@@ -18,6 +18,7 @@
 from tempest.api.object_storage import base
 from tempest.common.utils.data_utils import arbitrary_string
 from tempest.common.utils.data_utils import rand_name
+from tempest import exceptions
 from tempest.test import attr
 
 
@@ -30,14 +31,8 @@ class ContainerTest(base.BaseObjectTest):
     @classmethod
     def tearDownClass(cls):
         for container in cls.containers:
-            objlist = \
-                cls.container_client.list_all_container_objects(container)
-            # delete every object in the container
-            for obj in objlist:
-                resp, _ = \
-                    cls.object_client.delete_object(container, obj['name'])
-            # delete the container
-            resp, _ = cls.container_client.delete_container(container)
+            # delete every object in the container, then the container
+            cls.container_client.purge_container(container)
 
     @attr(type='smoke')
     def test_create_container(self):
@@ -88,6 +83,40 @@ class ContainerTest(base.BaseObjectTest):
         object_names = [obj['name'] for obj in object_list]
         self.assertIn(object_name, object_names)
 
+    @attr(type='positive')
+    def test_list_all_container_objects_paginated(self):
+        # list a container one object per page
+        container_name = rand_name(name='TestContainer')
+        resp, _ = self.container_client.create_container(container_name)
+        self.containers.append(container_name)
+        object_names = sorted(rand_name(name='TestObject') for _ in range(3))
+        for object_name in object_names:
+            self.object_client.create_object(container_name, object_name,
+                                             arbitrary_string())
+        objlist = self.container_client.list_all_container_objects(
+            container_name, params={'limit': 1})
+        self.assertEqual(object_names, [obj['name'] for obj in objlist])
+        objlist = self.container_client.list_all_container_objects(
+            container_name, params={'limit': 1, 'marker': object_names[0]})
+        self.assertEqual(object_names[1:], [obj['name'] for obj in objlist])
+
+    @attr(type='positive')
+    def test_purge_container(self):
+        # delete a container along with its objects
+        container_name = rand_name(name='TestContainer')
+        resp, _ = self.container_client.create_container(container_name)
+        self.containers.append(container_name)
+        for i in range(5):
+            self.object_client.create_object(container_name,
+                                             rand_name(name='TestObject'),
+                                             arbitrary_string())
+        report = self.container_client.purge_container(container_name)
+        self.containers.remove(container_name)
+        self.assertEqual(5, report['deleted'])
+        self.assertRaises(exceptions.NotFound,
+                          self.container_client.list_container_metadata,
+                          container_name)
+
     @attr(type='smoke')
     def test_container_metadata(self):
         # update/retrieve/delete container metadata
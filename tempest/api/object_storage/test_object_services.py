@@ -15,6 +15,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import hashlib
+import StringIO
 import time
 
 import testtools
@@ -44,14 +46,8 @@ class ObjectTest(base.BaseObjectTest):
 
     @classmethod
     def tearDownClass(cls):
-        objlist = cls.container_client.list_all_container_objects(
-            cls.container_name)
-        # delete every object in the container
-        for obj in objlist:
-            resp, _ = cls.object_client.delete_object(cls.container_name,
-                                                      obj['name'])
-        # delete the container
-        resp, _ = cls.container_client.delete_container(cls.container_name)
+        # delete every object in the container, then the container
+        cls.container_client.purge_container(cls.container_name)
         # delete the user setup created
         cls.data.teardown_all()
 
@@ -69,6 +65,26 @@ class ObjectTest(base.BaseObjectTest):
                                                    object_name, data)
         self.assertEqual(resp['status'], '201')
 
+    @attr(type='positive')
+    def test_create_and_get_object_streaming(self):
+        # upload an object of unknown length in chunks and read it back
+        object_name = rand_name(name='TestObject')
+        chunks = [arbitrary_string(size=1024, base_text=str(i))
+                  for i in range(10)]
+        data = ''.join(chunks)
+        resp, md5 = self.object_client.create_object_streaming(
+            self.container_name, object_name, iter(chunks))
+        self.assertEqual(resp['status'], '201')
+        self.assertEqual(resp['etag'], hashlib.md5(data).hexdigest())
+        self.assertEqual(md5, resp['etag'])
+
+        dest = StringIO.StringIO()
+        resp, body = self.object_client.get_object_streaming(
+            self.container_name, object_name, dest=dest)
+        self.assertEqual(resp['status'], '200')
+        self.assertEqual(dest.getvalue(), data)
+        self.assertEqual(body.hexdigest(), resp['etag'])
+
     @attr(type='smoke')
     def test_delete_object(self):
         # create object
@@ -381,6 +397,41 @@ class ObjectTest(base.BaseObjectTest):
             self.container_name, object_name)
         self.assertEqual(data * segments, body)
 
+    @attr(type='positive')
+    def test_get_object_ranged(self):
+        # download an object as ranges requested concurrently
+        object_name = rand_name(name='TestObject')
+        data = arbitrary_string(size=10 * 1024 + 7, base_text=object_name)
+        self.object_client.create_object(self.container_name, object_name,
+                                         data)
+        resp, buf, report = self.object_client.get_object_ranged(
+            self.container_name, object_name, chunk_size=1024, workers=4)
+        self.addCleanup(buf.close)
+        self.assertEqual(11, report['ranges'])
+        self.assertEqual(hashlib.md5(data).hexdigest(), report['md5'])
+        self.assertEqual(data, buf[:])
+
+    @attr(type='positive')
+    def test_create_large_object_in_parallel(self):
+        # upload an object as segments sent concurrently
+        object_name = rand_name(name='LObject')
+        data = arbitrary_string(size=10 * 1024 + 7, base_text=object_name)
+        resp, report = self.object_client.create_large_object(
+            self.container_name, object_name, StringIO.StringIO(data),
+            segment_size=1024, workers=4)
+        self.assertEqual(resp['status'], '201')
+        self.assertEqual(11, report['segments'])
+        self.assertEqual(len(data), report['bytes'])
+        self.assertEqual(hashlib.md5(data).hexdigest(), report['md5'])
+
+        resp, _ = self.object_client.list_object_metadata(
+            self.container_name, object_name)
+        self.assertEqual(resp['x-object-manifest'],
+                         '%s/%s/' % (self.container_name, object_name))
+        resp, body = self.object_client.get_object(
+            self.container_name, object_name)
+        self.assertEqual(data, body)
+
 
 class PublicObjectTest(base.BaseObjectTest):
     def setUp(self):
@@ -389,14 +440,8 @@ class PublicObjectTest(base.BaseObjectTest):
         self.container_client.create_container(self.container_name)
 
     def tearDown(self):
-        objlist = self.container_client.list_all_container_objects(
-            self.container_name)
-        # delete every object in the container
-        for obj in objlist:
-            resp, _ = self.object_client.delete_object(
-                self.container_name, obj['name'])
-        # delete the container
-        resp, _ = self.container_client.delete_container(self.container_name)
+        # delete every object in the container, then the container
+        self.container_client.purge_container(self.container_name)
         super(PublicObjectTest, self).tearDown()
 
     @attr(type='smoke')
@@ -15,11 +15,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import logging
 import time
 
 from tempest import clients
+from tempest.common import teardown
 from tempest.common.utils.data_utils import rand_name
+from tempest.common import waiters
 from tempest import exceptions
 import tempest.test
 
@@ -118,8 +121,13 @@ class BaseVolumeTest(tempest.test.BaseTestCase):
 
     @classmethod
     def tearDownClass(cls):
-        cls.clear_snapshots()
-        cls.clear_volumes()
+        # Deleted in waves, see teardown.TeardownGraph.run(): the snapshots
+        # and the volumes without any first, then the other volumes once
+        # every resource of the first wave is gone
+        graph = teardown.TeardownGraph()
+        cls._add_snapshots(graph)
+        cls._add_volumes(graph)
+        graph.run()
         cls.clear_isolated_creds()
 
     @classmethod
@@ -147,31 +155,40 @@ class BaseVolumeTest(tempest.test.BaseTestCase):
 
     @classmethod
     def clear_volumes(cls):
-        for volume in cls.volumes:
-            try:
-                cls.volumes_client.delete_volume(volume['id'])
-            except Exception:
-                pass
-
-        for volume in cls.volumes:
-            try:
-                cls.volumes_client.wait_for_resource_deletion(volume['id'])
-            except Exception:
-                pass
+        graph = teardown.TeardownGraph()
+        cls._add_volumes(graph)
+        graph.run()
 
     @classmethod
     def clear_snapshots(cls):
-        for snapshot in cls.snapshots:
-            try:
-                cls.snapshots_client.delete_snapshot(snapshot['id'])
-            except Exception:
-                pass
+        graph = teardown.TeardownGraph()
+        cls._add_snapshots(graph)
+        graph.run()
 
+    @classmethod
+    def _add_snapshots(cls, graph):
         for snapshot in cls.snapshots:
-            try:
-                cls.snapshots_client.wait_for_resource_deletion(snapshot['id'])
-            except Exception:
-                pass
+            graph.add(('snapshot', snapshot['id']),
+                      functools.partial(cls.snapshots_client.delete_snapshot,
+                                        snapshot['id']),
+                      wait=functools.partial(
+                          cls.snapshots_client.wait_for_resource_deletion,
+                          snapshot['id']))
+
+    @classmethod
+    def _add_volumes(cls, graph):
+        deleted = teardown.BulkWait(
+            lambda ids: cls.volumes_client.wait_for_volumes_status(
+                ids, waiters.DELETED))
+        for volume in cls.volumes:
+            snapshots = [('snapshot', snapshot['id'])
+                         for snapshot in cls.snapshots
+                         if snapshot.get('volume_id') == volume['id']]
+            graph.add(('volume', volume['id']),
+                      functools.partial(cls.volumes_client.delete_volume,
+                                        volume['id']),
+                      wait=deleted, requires=snapshots,
+                      resource_id=volume['id'])
 
     def wait_for(self, condition):
         """Repeatedly calls condition() until a timeout."""
@@ -15,212 +15,161 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import importlib
 import logging
 
 from tempest import config
 from tempest import exceptions
-from tempest.services import botoclients
-from tempest.services.compute.json.aggregates_client import \
-    AggregatesClientJSON
-from tempest.services.compute.json.availability_zone_client import \
-    AvailabilityZoneClientJSON
-from tempest.services.compute.json.extensions_client import \
-    ExtensionsClientJSON
-from tempest.services.compute.json.fixed_ips_client import FixedIPsClientJSON
-from tempest.services.compute.json.flavors_client import FlavorsClientJSON
-from tempest.services.compute.json.floating_ips_client import \
-    FloatingIPsClientJSON
-from tempest.services.compute.json.hosts_client import HostsClientJSON
-from tempest.services.compute.json.images_client import ImagesClientJSON
-from tempest.services.compute.json.interfaces_client import \
-    InterfacesClientJSON
-from tempest.services.compute.json.keypairs_client import KeyPairsClientJSON
-from tempest.services.compute.json.limits_client import LimitsClientJSON
-from tempest.services.compute.json.quotas_client import QuotasClientJSON
-from tempest.services.compute.json.security_groups_client import \
-    SecurityGroupsClientJSON
-from tempest.services.compute.json.servers_client import ServersClientJSON
-from tempest.services.compute.json.services_client import ServicesClientJSON
-from tempest.services.compute.json.volumes_extensions_client import \
-    VolumesExtensionsClientJSON
-from tempest.services.compute.xml.aggregates_client import AggregatesClientXML
-from tempest.services.compute.xml.availability_zone_client import \
-    AvailabilityZoneClientXML
-from tempest.services.compute.xml.extensions_client import ExtensionsClientXML
-from tempest.services.compute.xml.fixed_ips_client import FixedIPsClientXML
-from tempest.services.compute.xml.flavors_client import FlavorsClientXML
-from tempest.services.compute.xml.floating_ips_client import \
-    FloatingIPsClientXML
-from tempest.services.compute.xml.images_client import ImagesClientXML
-from tempest.services.compute.xml.interfaces_client import \
-    InterfacesClientXML
-from tempest.services.compute.xml.keypairs_client import KeyPairsClientXML
-from tempest.services.compute.xml.limits_client import LimitsClientXML
-from tempest.services.compute.xml.quotas_client import QuotasClientXML
-from tempest.services.compute.xml.security_groups_client \
-    import SecurityGroupsClientXML
-from tempest.services.compute.xml.servers_client import ServersClientXML
-from tempest.services.compute.xml.services_client import ServicesClientXML
-from tempest.services.compute.xml.volumes_extensions_client import \
-    VolumesExtensionsClientXML
-from tempest.services.identity.json.identity_client import IdentityClientJSON
-from tempest.services.identity.json.identity_client import TokenClientJSON
-from tempest.services.identity.v3.json.endpoints_client import \
-    EndPointClientJSON
-from tempest.services.identity.v3.json.identity_client import \
-    IdentityV3ClientJSON
-from tempest.services.identity.v3.json.service_client import \
-    ServiceClientJSON
-from tempest.services.identity.v3.xml.endpoints_client import EndPointClientXML
-from tempest.services.identity.v3.xml.identity_client import \
-    IdentityV3ClientXML
-from tempest.services.identity.v3.xml.service_client import \
-    ServiceClientXML
-from tempest.services.identity.xml.identity_client import IdentityClientXML
-from tempest.services.identity.xml.identity_client import TokenClientXML
-from tempest.services.image.v1.json.image_client import ImageClientJSON
-from tempest.services.image.v2.json.image_client import ImageClientV2JSON
-from tempest.services.network.json.network_client import NetworkClient
-from tempest.services.object_storage.account_client import AccountClient
-from tempest.services.object_storage.account_client import \
-    AccountClientCustomizedHeader
-from tempest.services.object_storage.container_client import ContainerClient
-from tempest.services.object_storage.object_client import ObjectClient
-from tempest.services.object_storage.object_client import \
-    ObjectClientCustomizedHeader
-from tempest.services.orchestration.json.orchestration_client import \
-    OrchestrationClient
-from tempest.services.volume.json.admin.volume_types_client import \
-    VolumeTypesClientJSON
-from tempest.services.volume.json.snapshots_client import SnapshotsClientJSON
-from tempest.services.volume.json.volumes_client import VolumesClientJSON
-from tempest.services.volume.xml.admin.volume_types_client import \
-    VolumeTypesClientXML
-from tempest.services.volume.xml.snapshots_client import SnapshotsClientXML
-from tempest.services.volume.xml.volumes_client import VolumesClientXML
 
 LOG = logging.getLogger(__name__)
 
-IMAGES_CLIENTS = {
-    "json": ImagesClientJSON,
-    "xml": ImagesClientXML,
+INTERFACES = ('json', 'xml')
+
+COMPUTE = 'tempest.services.compute'
+IDENTITY = 'tempest.services.identity'
+OBJECT_STORAGE = 'tempest.services.object_storage'
+VOLUME = 'tempest.services.volume'
+
+# Registry of the clients a Manager provides: attribute name -> dotted path
+# of the client class, or a dict of such paths keyed by interface type.
+# Client modules are only imported when the client is first used.
+CLIENTS = {
+    'servers_client': {
+        "json": COMPUTE + '.json.servers_client.ServersClientJSON',
+        "xml": COMPUTE + '.xml.servers_client.ServersClientXML',
+    },
+    'limits_client': {
+        "json": COMPUTE + '.json.limits_client.LimitsClientJSON',
+        "xml": COMPUTE + '.xml.limits_client.LimitsClientXML',
+    },
+    'images_client': {
+        "json": COMPUTE + '.json.images_client.ImagesClientJSON',
+        "xml": COMPUTE + '.xml.images_client.ImagesClientXML',
+    },
+    'keypairs_client': {
+        "json": COMPUTE + '.json.keypairs_client.KeyPairsClientJSON',
+        "xml": COMPUTE + '.xml.keypairs_client.KeyPairsClientXML',
+    },
+    'quotas_client': {
+        "json": COMPUTE + '.json.quotas_client.QuotasClientJSON',
+        "xml": COMPUTE + '.xml.quotas_client.QuotasClientXML',
+    },
+    'flavors_client': {
+        "json": COMPUTE + '.json.flavors_client.FlavorsClientJSON',
+        "xml": COMPUTE + '.xml.flavors_client.FlavorsClientXML',
+    },
+    'extensions_client': {
+        "json": COMPUTE + '.json.extensions_client.ExtensionsClientJSON',
+        "xml": COMPUTE + '.xml.extensions_client.ExtensionsClientXML',
+    },
+    'volumes_extensions_client': {
+        "json": COMPUTE + '.json.volumes_extensions_client.'
+                          'VolumesExtensionsClientJSON',
+        "xml": COMPUTE + '.xml.volumes_extensions_client.'
+                         'VolumesExtensionsClientXML',
+    },
+    'floating_ips_client': {
+        "json": COMPUTE + '.json.floating_ips_client.FloatingIPsClientJSON',
+        "xml": COMPUTE + '.xml.floating_ips_client.FloatingIPsClientXML',
+    },
+    'snapshots_client': {
+        "json": VOLUME + '.json.snapshots_client.SnapshotsClientJSON',
+        "xml": VOLUME + '.xml.snapshots_client.SnapshotsClientXML',
+    },
+    'volumes_client': {
+        "json": VOLUME + '.json.volumes_client.VolumesClientJSON',
+        "xml": VOLUME + '.xml.volumes_client.VolumesClientXML',
+    },
+    'volume_types_client': {
+        "json": VOLUME + '.json.admin.volume_types_client.'
+                         'VolumeTypesClientJSON',
+        "xml": VOLUME + '.xml.admin.volume_types_client.'
+                        'VolumeTypesClientXML',
+    },
+    'identity_client': {
+        "json": IDENTITY + '.json.identity_client.IdentityClientJSON',
+        "xml": IDENTITY + '.xml.identity_client.IdentityClientXML',
+    },
+    'identity_v3_client': {
+        "json": IDENTITY + '.v3.json.identity_client.IdentityV3ClientJSON',
+        "xml": IDENTITY + '.v3.xml.identity_client.IdentityV3ClientXML',
+    },
+    'token_client': {
+        "json": IDENTITY + '.json.identity_client.TokenClientJSON',
+        "xml": IDENTITY + '.xml.identity_client.TokenClientXML',
+    },
+    'security_groups_client': {
+        "json": COMPUTE + '.json.security_groups_client.'
+                          'SecurityGroupsClientJSON',
+        "xml": COMPUTE + '.xml.security_groups_client.'
+                         'SecurityGroupsClientXML',
+    },
+    'interfaces_client': {
+        "json": COMPUTE + '.json.interfaces_client.InterfacesClientJSON',
+        "xml": COMPUTE + '.xml.interfaces_client.InterfacesClientXML',
+    },
+    'endpoints_client': {
+        "json": IDENTITY + '.v3.json.endpoints_client.EndPointClientJSON',
+        "xml": IDENTITY + '.v3.xml.endpoints_client.EndPointClientXML',
+    },
+    'fixed_ips_client': {
+        "json": COMPUTE + '.json.fixed_ips_client.FixedIPsClientJSON',
+        "xml": COMPUTE + '.xml.fixed_ips_client.FixedIPsClientXML',
+    },
+    'availability_zone_client': {
+        "json": COMPUTE + '.json.availability_zone_client.'
+                          'AvailabilityZoneClientJSON',
+        "xml": COMPUTE + '.xml.availability_zone_client.'
+                         'AvailabilityZoneClientXML',
+    },
+    'service_client': {
+        "json": IDENTITY + '.v3.json.service_client.ServiceClientJSON',
+        "xml": IDENTITY + '.v3.xml.service_client.ServiceClientXML',
+    },
+    'aggregates_client': {
+        "json": COMPUTE + '.json.aggregates_client.AggregatesClientJSON',
+        "xml": COMPUTE + '.xml.aggregates_client.AggregatesClientXML',
+    },
+    'services_client': {
+        "json": COMPUTE + '.json.services_client.ServicesClientJSON',
+        "xml": COMPUTE + '.xml.services_client.ServicesClientXML',
+    },
+    'network_client': ('tempest.services.network.json.network_client.'
+                       'NetworkClient'),
+    'hosts_client': COMPUTE + '.json.hosts_client.HostsClientJSON',
+    'account_client': OBJECT_STORAGE + '.account_client.AccountClient',
+    'image_client': ('tempest.services.image.v1.json.image_client.'
+                     'ImageClientJSON'),
+    'image_client_v2': ('tempest.services.image.v2.json.image_client.'
+                        'ImageClientV2JSON'),
+    'container_client': OBJECT_STORAGE + '.container_client.ContainerClient',
+    'object_client': OBJECT_STORAGE + '.object_client.ObjectClient',
+    'orchestration_client': ('tempest.services.orchestration.json.'
+                             'orchestration_client.OrchestrationClient'),
+    'ec2api_client': 'tempest.services.botoclients.APIClientEC2',
+    's3_client': 'tempest.services.botoclients.ObjectClientS3',
+    'custom_object_client': (OBJECT_STORAGE + '.object_client.'
+                             'ObjectClientCustomizedHeader'),
+    'custom_account_client': (OBJECT_STORAGE + '.account_client.'
+                              'AccountClientCustomizedHeader'),
 }
 
-KEYPAIRS_CLIENTS = {
-    "json": KeyPairsClientJSON,
-    "xml": KeyPairsClientXML,
-}
-
-QUOTAS_CLIENTS = {
-    "json": QuotasClientJSON,
-    "xml": QuotasClientXML,
-}
-
-SERVERS_CLIENTS = {
-    "json": ServersClientJSON,
-    "xml": ServersClientXML,
-}
-
-LIMITS_CLIENTS = {
-    "json": LimitsClientJSON,
-    "xml": LimitsClientXML,
-}
-
-FLAVORS_CLIENTS = {
-    "json": FlavorsClientJSON,
-    "xml": FlavorsClientXML
-}
-
-EXTENSIONS_CLIENTS = {
-    "json": ExtensionsClientJSON,
-    "xml": ExtensionsClientXML
-}
-
-VOLUMES_EXTENSIONS_CLIENTS = {
-    "json": VolumesExtensionsClientJSON,
-    "xml": VolumesExtensionsClientXML,
-}
-
-FLOAT_CLIENTS = {
-    "json": FloatingIPsClientJSON,
-    "xml": FloatingIPsClientXML,
-}
-
-SNAPSHOTS_CLIENTS = {
-    "json": SnapshotsClientJSON,
-    "xml": SnapshotsClientXML,
-}
-
-VOLUMES_CLIENTS = {
-    "json": VolumesClientJSON,
-    "xml": VolumesClientXML,
-}
-
-VOLUME_TYPES_CLIENTS = {
-    "json": VolumeTypesClientJSON,
-    "xml": VolumeTypesClientXML,
-}
+# Clients which are built from the configuration only, without credentials
+CONFIG_ONLY_CLIENTS = set(['token_client'])
 
-IDENTITY_CLIENT = {
-    "json": IdentityClientJSON,
-    "xml": IdentityClientXML,
-}
 
-IDENTITY_V3_CLIENT = {
-    "json": IdentityV3ClientJSON,
-    "xml": IdentityV3ClientXML,
-}
-
-TOKEN_CLIENT = {
-    "json": TokenClientJSON,
-    "xml": TokenClientXML,
-}
-
-SECURITY_GROUPS_CLIENT = {
-    "json": SecurityGroupsClientJSON,
-    "xml": SecurityGroupsClientXML,
-}
-
-INTERFACES_CLIENT = {
-    "json": InterfacesClientJSON,
-    "xml": InterfacesClientXML,
-}
-
-ENDPOINT_CLIENT = {
-    "json": EndPointClientJSON,
-    "xml": EndPointClientXML,
-}
-
-FIXED_IPS_CLIENT = {
-    "json": FixedIPsClientJSON,
-    "xml": FixedIPsClientXML
-}
-
-AVAILABILITY_ZONE_CLIENT = {
-    "json": AvailabilityZoneClientJSON,
-    "xml": AvailabilityZoneClientXML,
-}
-
-SERVICE_CLIENT = {
-    "json": ServiceClientJSON,
-    "xml": ServiceClientXML,
-}
-
-AGGREGATES_CLIENT = {
-    "json": AggregatesClientJSON,
-    "xml": AggregatesClientXML,
-}
-
-SERVICES_CLIENT = {
-    "json": ServicesClientJSON,
-    "xml": ServicesClientXML,
-}
+def get_client_class(path):
+    (module_part, _, name) = path.rpartition('.')
+    return getattr(importlib.import_module(module_part), name)
 
 
 class Manager(object):
 
     """
     Top level manager for OpenStack Compute clients
+
+    Clients listed in CLIENTS are built, and their modules imported, on
+    first access to the corresponding attribute.
     """
 
     def __init__(self, username=None, password=None, tenant_name=None,
@@ -248,61 +197,37 @@ class Manager(object):
                    "tenant_name: %(tenant_name)s") % locals()
             raise exceptions.InvalidConfiguration(msg)
 
+        if interface not in INTERFACES:
+            msg = "Unsupported interface type `%s'" % interface
+            raise exceptions.InvalidConfiguration(msg)
+        self.interface = interface
+
         self.auth_url = self.config.identity.uri
 
         if self.config.identity.strategy == 'keystone':
-            client_args = (self.config, self.username, self.password,
-                           self.auth_url, self.tenant_name)
+            self.client_args = (self.config, self.username, self.password,
+                                self.auth_url, self.tenant_name)
         else:
-            client_args = (self.config, self.username, self.password,
-                           self.auth_url)
-
-        try:
-            self.servers_client = SERVERS_CLIENTS[interface](*client_args)
-            self.limits_client = LIMITS_CLIENTS[interface](*client_args)
-            self.images_client = IMAGES_CLIENTS[interface](*client_args)
-            self.keypairs_client = KEYPAIRS_CLIENTS[interface](*client_args)
-            self.quotas_client = QUOTAS_CLIENTS[interface](*client_args)
-            self.flavors_client = FLAVORS_CLIENTS[interface](*client_args)
-            ext_cli = EXTENSIONS_CLIENTS[interface](*client_args)
-            self.extensions_client = ext_cli
-            vol_ext_cli = VOLUMES_EXTENSIONS_CLIENTS[interface](*client_args)
-            self.volumes_extensions_client = vol_ext_cli
-            self.floating_ips_client = FLOAT_CLIENTS[interface](*client_args)
-            self.snapshots_client = SNAPSHOTS_CLIENTS[interface](*client_args)
-            self.volumes_client = VOLUMES_CLIENTS[interface](*client_args)
-            self.volume_types_client = \
-                VOLUME_TYPES_CLIENTS[interface](*client_args)
-            self.identity_client = IDENTITY_CLIENT[interface](*client_args)
-            self.identity_v3_client = \
-                IDENTITY_V3_CLIENT[interface](*client_args)
-            self.token_client = TOKEN_CLIENT[interface](self.config)
-            self.security_groups_client = \
-                SECURITY_GROUPS_CLIENT[interface](*client_args)
-            self.interfaces_client = INTERFACES_CLIENT[interface](*client_args)
-            self.endpoints_client = ENDPOINT_CLIENT[interface](*client_args)
-            self.fixed_ips_client = FIXED_IPS_CLIENT[interface](*client_args)
-            self.availability_zone_client = \
-                AVAILABILITY_ZONE_CLIENT[interface](*client_args)
-            self.service_client = SERVICE_CLIENT[interface](*client_args)
-            self.aggregates_client = AGGREGATES_CLIENT[interface](*client_args)
-            self.services_client = SERVICES_CLIENT[interface](*client_args)
-        except KeyError:
-            msg = "Unsupported interface type `%s'" % interface
-            raise exceptions.InvalidConfiguration(msg)
-        self.network_client = NetworkClient(*client_args)
-        self.hosts_client = HostsClientJSON(*client_args)
-        self.account_client = AccountClient(*client_args)
-        self.image_client = ImageClientJSON(*client_args)
-        self.image_client_v2 = ImageClientV2JSON(*client_args)
-        self.container_client = ContainerClient(*client_args)
-        self.object_client = ObjectClient(*client_args)
-        self.orchestration_client = OrchestrationClient(*client_args)
-        self.ec2api_client = botoclients.APIClientEC2(*client_args)
-        self.s3_client = botoclients.ObjectClientS3(*client_args)
-        self.custom_object_client = ObjectClientCustomizedHeader(*client_args)
-        self.custom_account_client = \
-            AccountClientCustomizedHeader(*client_args)
+            self.client_args = (self.config, self.username, self.password,
+                                self.auth_url)
+
+    def __getattr__(self, name):
+        # NOTE: only called when normal attribute lookup fails, so every
+        # client is built once and then found in the instance dict.
+        if name not in CLIENTS:
+            raise AttributeError(name)
+        client = self._build_client(name)
+        setattr(self, name, client)
+        return client
+
+    def _build_client(self, name):
+        path = CLIENTS[name]
+        if isinstance(path, dict):
+            path = path[self.interface]
+        client_class = get_client_class(path)
+        if name in CONFIG_ONLY_CLIENTS:
+            return client_class(self.config)
+        return client_class(*self.client_args)
 
 
 class AltManager(Manager):
@@ -0,0 +1,206 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import calendar
+import logging
+import os
+import sys
+import threading
+import time
+
+from tempest import config
+
+LOG = logging.getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def parse_expiry(expires):
+    """Convert a Keystone ISO 8601 expiry string into a UNIX timestamp.
+
+    Returns None if the value is missing or cannot be parsed.
+    """
+    if not expires:
+        return None
+    # Keystone returns e.g. 2013-06-20T12:34:56Z or, with some token
+    # providers, 2013-06-20T12:34:56.123456Z
+    value = expires.rstrip('Z').split('.')[0]
+    try:
+        return calendar.timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%S'))
+    except ValueError:
+        LOG.warning("Unable to parse token expiry %r", expires)
+        return None
+
+
+class AuthEntry(object):
+
+    """A token together with the service catalog it was issued with."""
+
+    def __init__(self, token, catalog, expires=None):
+        self.token = token
+        self.catalog = catalog
+        self.expires = expires
+        self.issued_at = time.time()
+
+    def is_expired(self, now=None):
+        if self.expires is None:
+            return False
+        return self.expires <= (now or time.time())
+
+
+class _Flight(object):
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.exc_info = None
+
+
+class TokenCache(object):
+
+    """Credential-keyed token and service catalog cache.
+
+    Lookups for a key that is not cached, or whose token has expired, are
+    single-flight: the first caller authenticates while concurrent callers
+    for the same key wait for, and share, its result (or its exception).
+
+    If refresh_margin is set, a background thread re-authenticates every
+    cached key that far ahead of its token expiry. Callers keep getting the
+    current, still valid, token without waiting while a refresh runs.
+    """
+
+    def __init__(self, refresh_margin=0):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._fetchers = {}
+        self._last_used = {}
+        self._flights = {}
+        self._refresher = None
+        self._refresher_pid = None
+
+    def get(self, key, fetch):
+        """Return the cached AuthEntry for key, calling fetch() on a miss.
+
+        :param key: hashable identifying the credentials
+        :param fetch: zero argument callable returning a new AuthEntry
+        """
+        with self._lock:
+            self._fetchers[key] = fetch
+            self._last_used[key] = time.time()
+            entry = self._entries.get(key)
+            if entry is not None and not entry.is_expired():
+                self._ensure_refresher()
+                return entry
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if leader:
+            self._fly(key, flight, fetch)
+        else:
+            flight.event.wait()
+        if flight.exc_info is not None:
+            raise flight.exc_info[0], flight.exc_info[1], flight.exc_info[2]
+        return flight.entry
+
+    def _fly(self, key, flight, fetch):
+        try:
+            flight.entry = fetch()
+        except Exception:
+            flight.exc_info = sys.exc_info()
+        finally:
+            with self._lock:
+                if flight.entry is not None:
+                    self._entries[key] = flight.entry
+                del self._flights[key]
+            flight.event.set()
+
+    def refresh(self, key):
+        """Re-authenticate key unless a request for it is in flight."""
+        with self._lock:
+            fetch = self._fetchers.get(key)
+            if fetch is None or key in self._flights:
+                return
+            flight = self._flights[key] = _Flight()
+        self._fly(key, flight, fetch)
+        if flight.exc_info is not None:
+            # e.g. the user was deleted; forget it rather than retrying on
+            # every tick. The next get() authenticates synchronously.
+            LOG.warning("Failed to refresh token for %s: %s", key[1],
+                        flight.exc_info[1])
+            with self._lock:
+                self._entries.pop(key, None)
+                self._fetchers.pop(key, None)
+
+    def _due_for_refresh(self, now):
+        # Only tokens that were used since they were issued are refreshed,
+        # so credentials nobody uses any more are left to expire.
+        with self._lock:
+            return [key for key, entry in self._entries.items()
+                    if entry.expires is not None and
+                    entry.expires - self.refresh_margin <= now and
+                    self._last_used.get(key, 0) >= entry.issued_at]
+
+    def _ensure_refresher(self):
+        # NOTE: called with self._lock held. Threads do not survive a fork,
+        # so a child process starts its own refresher.
+        if not self.refresh_margin:
+            return
+        pid = os.getpid()
+        if self._refresher is not None and self._refresher_pid == pid:
+            return
+        self._refresher_pid = pid
+        self._refresher = threading.Thread(target=self._refresh_loop,
+                                           name='token-refresher')
+        self._refresher.daemon = True
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        interval = max(1, min(60, self.refresh_margin / 4.0))
+        while True:
+            time.sleep(interval)
+            for key in self._due_for_refresh(time.time()):
+                self.refresh(key)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_token(self, token):
+        """Drop every entry holding the given token."""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.token == token:
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_cache():
+    """Return the process-wide token cache, creating it if needed."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = config.TempestConfig()
+                _cache = TokenCache(conf.identity.token_refresh_margin)
+    return _cache
@@ -0,0 +1,56 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Running blocking calls concurrently on a bounded number of threads.
+"""
+
+import Queue
+import sys
+import threading
+
+
+def run_concurrently(funcs, workers):
+    """Call every zero argument callable using at most workers threads.
+
+    Returns a list with, for each callable, None or the exc_info of the
+    exception it raised.
+    """
+    results = [None] * len(funcs)
+    tasks = Queue.Queue()
+    for task in enumerate(funcs):
+        tasks.put(task)
+
+    def worker():
+        while True:
+            try:
+                index, func = tasks.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                func()
+            except Exception:
+                results[index] = sys.exc_info()
+
+    threads = [threading.Thread(target=worker)
+               for _ in xrange(min(workers, len(funcs)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
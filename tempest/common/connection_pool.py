@@ -0,0 +1,326 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import logging
+import os
+import threading
+import time
+import urlparse
+
+import httplib2
+
+from tempest import config
+from tempest import exceptions
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+_pool = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+
+def _add_connect_time(elapsed):
+    _local.connect_time = getattr(_local, 'connect_time', 0.0) + elapsed
+
+
+def last_connect_time():
+    """Seconds spent connecting by the last request of this thread."""
+    return getattr(_local, 'connect_time', 0.0)
+
+
+class TimedHTTPConnection(httplib2.HTTPConnectionWithTimeout):
+
+    def connect(self):
+        start = time.time()
+        try:
+            httplib2.HTTPConnectionWithTimeout.connect(self)
+        finally:
+            _add_connect_time(time.time() - start)
+
+
+class TimedHTTPSConnection(httplib2.HTTPSConnectionWithTimeout):
+
+    def connect(self):
+        start = time.time()
+        try:
+            httplib2.HTTPSConnectionWithTimeout.connect(self)
+        finally:
+            _add_connect_time(time.time() - start)
+
+
+CONNECTION_TYPES = {
+    'http': TimedHTTPConnection,
+    'https': TimedHTTPSConnection,
+}
+
+
+class ConnectionPool(object):
+
+    """Process-wide pool of keep-alive httplib2.Http objects.
+
+    httplib2.Http keeps its sockets open between requests, but an instance
+    is not safe to share between threads. The pool hands out one Http per
+    in-flight request and takes it back afterwards, so consecutive requests
+    to the same endpoint reuse an established TCP (and TLS) connection.
+
+    Pooled objects are keyed by (scheme, host, port, TLS options, timeout).
+    At most ``maxsize`` objects exist per key; further checkouts block until
+    one is returned, for ``timeout`` seconds at most. Objects idle for longer
+    than ``idle_timeout`` seconds are closed and dropped.
+
+    The pool also keeps the idle httplib connections of the requests that
+    drive httplib themselves, e.g. streaming ones, see
+    checkout_connection().
+    """
+
+    def __init__(self, maxsize=10, idle_timeout=60, timeout=60):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._idle = collections.defaultdict(collections.deque)
+        self._in_use = collections.defaultdict(int)
+        self._idle_connections = collections.defaultdict(collections.deque)
+        self._pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(uri, disable_ssl_certificate_validation=False,
+                 ca_certs=None, timeout=None):
+        parts = urlparse.urlparse(uri)
+        scheme = parts.scheme.lower()
+        port = parts.port or DEFAULT_PORTS.get(scheme)
+        if scheme == 'https':
+            tls_options = (bool(disable_ssl_certificate_validation), ca_certs)
+        else:
+            tls_options = None
+        return (scheme, parts.hostname, port, tls_options, timeout)
+
+    def _check_fork(self):
+        # NOTE: sockets inherited from a parent process (for example by the
+        # stress driver workers) must not be shared with it, so a forked
+        # child starts over with an empty pool.
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle.clear()
+            self._in_use.clear()
+            self._idle_connections.clear()
+
+    def _evict_idle(self, now):
+        for pool, close in ((self._idle, _close),
+                            (self._idle_connections, _close_connection)):
+            for key, idle in pool.items():
+                while idle and now - idle[0][0] > self.idle_timeout:
+                    _, item = idle.popleft()
+                    close(item)
+                    self.evictions += 1
+                if not idle:
+                    del pool[key]
+
+    def checkout(self, key):
+        """Return an idle Http object or a new one for key.
+
+        :raises ConnectionPoolTimeout: if maxsize objects for key are still
+                                       in use after timeout seconds
+        """
+        deadline = time.time() + self.timeout
+        with self._cond:
+            self._check_fork()
+            self._evict_idle(time.time())
+            while True:
+                idle = self._idle.get(key)
+                if idle:
+                    # Most recently used first, its socket is the least
+                    # likely to have been closed by the server.
+                    _, http = idle.pop()
+                    self.hits += 1
+                    break
+                if self._in_use[key] < self.maxsize:
+                    tls_options, timeout = key[3:]
+                    kwargs = {'timeout': timeout}
+                    if tls_options is not None:
+                        dscv, ca_certs = tls_options
+                        kwargs['disable_ssl_certificate_validation'] = dscv
+                        kwargs['ca_certs'] = ca_certs
+                    http = httplib2.Http(**kwargs)
+                    self.misses += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise exceptions.ConnectionPoolTimeout(
+                        endpoint='%s://%s:%s' % key[:3],
+                        in_use=self._in_use[key], timeout=self.timeout)
+                self._cond.wait(remaining)
+            self._in_use[key] += 1
+            return http
+
+    def checkin(self, key, http, reusable=True):
+        with self._cond:
+            self._check_fork()
+            if self._in_use[key] > 0:
+                self._in_use[key] -= 1
+            if reusable:
+                self._idle[key].append((time.time(), http))
+            else:
+                _close(http)
+            # NOTE: the condition is shared by every key, the waiter woken
+            # by notify() could be waiting for another one
+            self._cond.notify_all()
+
+    def checkout_connection(self, key):
+        """Return an idle httplib connection or a new one for key.
+
+        Unlike the Http objects of checkout(), the connections in use are
+        not counted, so that a caller that doesn't give one back, e.g. when
+        a response is not read to its end, never blocks the others.
+
+        :returns: the connection and whether it was idle
+        """
+        with self._cond:
+            self._check_fork()
+            self._evict_idle(time.time())
+            idle = self._idle_connections.get(key)
+            if idle:
+                _, conn = idle.pop()
+                self.hits += 1
+                return conn, True
+            self.misses += 1
+        return make_connection(key), False
+
+    def checkin_connection(self, key, conn):
+        """Keep conn, whose last response has been read, for reuse."""
+        with self._cond:
+            self._check_fork()
+            idle = self._idle_connections[key]
+            if len(idle) < self.maxsize:
+                idle.append((time.time(), conn))
+                return
+        _close_connection(conn)
+
+    def clear(self):
+        """Close every idle connection held by the pool."""
+        with self._cond:
+            for idle in self._idle.values():
+                for _, http in idle:
+                    _close(http)
+            self._idle.clear()
+            for idle in self._idle_connections.values():
+                for _, conn in idle:
+                    _close_connection(conn)
+            self._idle_connections.clear()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'idle': sum(len(i) for i in self._idle.values()) +
+                sum(len(i) for i in self._idle_connections.values()),
+                'in_use': sum(self._in_use.values()),
+            }
+
+
+class PooledHttp(object):
+
+    """Drop-in replacement for httplib2.Http backed by a ConnectionPool."""
+
+    def __init__(self, disable_ssl_certificate_validation=False,
+                 ca_certs=None, timeout=None, pool=None):
+        self.disable_ssl_certificate_validation = \
+            disable_ssl_certificate_validation
+        self.ca_certs = ca_certs
+        self.timeout = timeout
+        self._pool = pool
+
+    @property
+    def pool(self):
+        return self._pool or get_pool()
+
+    def request(self, uri, method='GET', body=None, headers=None,
+                **kwargs):
+        pool = self.pool
+        key = pool.make_key(uri, self.disable_ssl_certificate_validation,
+                            self.ca_certs, self.timeout)
+        kwargs.setdefault('connection_type', CONNECTION_TYPES.get(key[0]))
+        http = pool.checkout(key)
+        _local.connect_time = 0.0
+        reusable = False
+        try:
+            result = http.request(uri, method, body=body, headers=headers,
+                                  **kwargs)
+            reusable = True
+            return result
+        finally:
+            pool.checkin(key, http, reusable)
+
+
+def make_connection(key):
+    """Return a new httplib connection for a ConnectionPool key.
+
+    It is set up as httplib2.Http sets up its own, TLS options included.
+    """
+    scheme, host, port, tls_options, timeout = key
+    kwargs = {'timeout': timeout}
+    if tls_options is not None:
+        dscv, ca_certs = tls_options
+        kwargs['disable_ssl_certificate_validation'] = dscv
+        kwargs['ca_certs'] = ca_certs
+    return CONNECTION_TYPES[scheme](host, port, **kwargs)
+
+
+def _close_connection(conn):
+    try:
+        conn.close()
+    except Exception:
+        LOG.debug("Failed to close pooled connection", exc_info=True)
+
+
+def _close(http):
+    for conn in http.connections.values():
+        _close_connection(conn)
+    http.connections.clear()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it if needed."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                conf = config.TempestConfig()
+                _pool = ConnectionPool(conf.http.pool_maxsize,
+                                       conf.http.pool_idle_timeout,
+                                       conf.http.pool_timeout)
+    return _pool
+
+
+def reset_pool():
+    """Drop the process-wide connection pool, and the timings of threads.
+
+    They are created again on first use, with the threading primitives of
+    the time, e.g. green ones after eventlet monkey patching.
+    """
+    global _pool, _local
+    with _pool_lock:
+        _pool = None
+        _local = threading.local()
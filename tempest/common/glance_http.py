@@ -15,16 +15,17 @@
 
 # Originally copied from python-glanceclient
 
-import copy
 import hashlib
 import httplib
 import json
 import logging
+import os
 import posixpath
-import re
 import socket
 import StringIO
 import struct
+import threading
+import time
 import urlparse
 
 
@@ -35,17 +36,35 @@ if not hasattr(urlparse, 'parse_qsl'):
 
 import OpenSSL
 
+from tempest.common import http_log
+from tempest.common import metrics
+from tempest.common import streaming
 from tempest import exceptions as exc
 
 
 LOG = logging.getLogger(__name__)
 USER_AGENT = 'tempest'
 CHUNKSIZE = 1024 * 64  # 64kB
-TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
+
+# SSL contexts by configuration, and the last TLS session of each endpoint,
+# shared by all the VerifiedHTTPSConnections of the process
+_ssl_contexts = {}
+_ssl_sessions = {}
+_ssl_lock = threading.Lock()
 
 
 class HTTPClient(object):
 
+    """Keep-alive HTTP client of an image endpoint.
+
+    The 'token' keyword argument is the token to send, or a callable
+    returning it, called for every request so that refreshed tokens are
+    picked up. With 'reauthenticate', a callable taking the token of a
+    request rejected with a 401 and replacing it, the request is replayed
+    once with the new token, unless its body was read from a file or an
+    iterator.
+    """
+
     def __init__(self, endpoint, **kwargs):
         self.endpoint = endpoint
         endpoint_parts = self.parse_endpoint(self.endpoint)
@@ -59,6 +78,15 @@ class HTTPClient(object):
             self.endpoint_scheme, **kwargs)
 
         self.auth_token = kwargs.get('token')
+        self.reauthenticate = kwargs.get('reauthenticate')
+        self.chunk_size = int(kwargs.get('chunk_size') or CHUNKSIZE)
+
+        # Idle keep-alive connections to the endpoint, as (time, conn)
+        self.pool_maxsize = int(kwargs.get('pool_maxsize', 10))
+        self.pool_idle_timeout = float(kwargs.get('pool_idle_timeout', 60))
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._pid = os.getpid()
 
     @staticmethod
     def parse_endpoint(endpoint):
@@ -92,81 +120,180 @@ class HTTPClient(object):
         except httplib.InvalidURL:
             raise exc.EndpointNotFound
 
+    def _checkout(self):
+        """Return an idle or a new connection and whether it was idle."""
+        with self._idle_lock:
+            if self._pid != os.getpid():
+                # NOTE: don't share the sockets of the parent process
+                self._pid = os.getpid()
+                self._idle = []
+            now = time.time()
+            while self._idle:
+                idle_since, conn = self._idle.pop()
+                if now - idle_since <= self.pool_idle_timeout:
+                    return conn, True
+                conn.close()
+        return self.get_connection(), False
+
+    def _checkin(self, conn, resp):
+        """Keep conn for the next request once resp has been read."""
+        if resp.will_close:
+            conn.close()
+            return
+        with self._idle_lock:
+            if (self._pid == os.getpid() and
+                    len(self._idle) < self.pool_maxsize):
+                self._idle.append((time.time(), conn))
+                return
+        conn.close()
+
+    def close(self):
+        """Close the idle connections."""
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for _, conn in idle:
+            conn.close()
+
+    def get_token(self):
+        if callable(self.auth_token):
+            return self.auth_token()
+        return self.auth_token
+
+    def _send_request(self, conn, method, url, headers, body, on_chunk):
+        """Send a request on conn and return the time spent connecting."""
+        connect_time = 0.0
+        if conn.sock is None:
+            start = time.time()
+            conn.connect()
+            connect_time = time.time() - start
+            streaming.disable_nagle(conn)
+        conn.putrequest(method, url)
+        for header, value in headers.items():
+            conn.putheader(header, value)
+        conn.endheaders()
+        if body is not None:
+            streaming.send_body(
+                conn, body, headers.get('Transfer-Encoding') == 'chunked',
+                self.chunk_size, on_chunk)
+        return connect_time
+
     def _http_request(self, url, method, **kwargs):
         """Send an http request with the specified characteristics.
 
         Wrapper around httplib.HTTP(S)Connection.request to handle tasks such
         as setting headers and error handling.
+
+        Connections are kept alive and reused by the next requests. Request
+        bodies are sent without copying them, see streaming.send_body().
+
+        The data sent is passed to the 'upload' keyword argument, a
+        streaming.Upload, if given. With 'checksum', the MD5 of streamed
+        response bodies is computed while they are read.
         """
-        # Copy the kwargs so we can reuse the original in case of redirects
-        kwargs['headers'] = copy.deepcopy(kwargs.get('headers', {}))
-        kwargs['headers'].setdefault('User-Agent', USER_AGENT)
-        if self.auth_token:
-            kwargs['headers'].setdefault('X-Auth-Token', self.auth_token)
+        # Copy the headers so we can reuse the original in case of redirects
+        headers = dict(kwargs.get('headers') or {})
+        headers.setdefault('User-Agent', USER_AGENT)
+        token = self.get_token()
+        if token:
+            headers.setdefault('X-Auth-Token', token)
+        body = kwargs.get('body')
+        upload = kwargs.get('upload')
+        if (body is not None and 'Content-Length' not in headers and
+                headers.get('Transfer-Encoding') != 'chunked'):
+            length = streaming.body_length(body)
+            if length is None:
+                headers['Transfer-Encoding'] = 'chunked'
+            else:
+                headers['Content-Length'] = str(length)
+
+        self._log_request(method, url, headers)
 
-        self._log_request(method, url, kwargs['headers'])
+        conn_url = posixpath.normpath('%s/%s' % (self.endpoint_path, url))
+        bytes_out = [0]
 
-        conn = self.get_connection()
+        def count(chunk):
+            bytes_out[0] += len(chunk)
+            if upload is not None:
+                upload.update(chunk)
 
+        start = time.time()
+        conn, reused = self._checkout()
         try:
-            conn_url = posixpath.normpath('%s/%s' % (self.endpoint_path, url))
-            if kwargs['headers'].get('Transfer-Encoding') == 'chunked':
-                conn.putrequest(method, conn_url)
-                for header, value in kwargs['headers'].items():
-                    conn.putheader(header, value)
-                conn.endheaders()
-                chunk = kwargs['body'].read(CHUNKSIZE)
-                # Chunk it, baby...
-                while chunk:
-                    conn.send('%x\r\n%s\r\n' % (len(chunk), chunk))
-                    chunk = kwargs['body'].read(CHUNKSIZE)
-                conn.send('0\r\n\r\n')
-            else:
-                conn.request(method, conn_url, **kwargs)
-            resp = conn.getresponse()
+            try:
+                connect_time = self._send_request(conn, method, conn_url,
+                                                  headers, body, count)
+                resp = conn.getresponse()
+            except (socket.error, httplib.BadStatusLine):
+                # NOTE: the server may have closed a connection while it
+                # was idle. The request is sent again on a new one, unless
+                # its body was read from a file or an iterator.
+                conn.close()
+                if not reused or not (body is None or
+                                      isinstance(body, basestring)):
+                    raise
+                LOG.debug("Reused connection failed, reconnecting")
+                conn = self.get_connection()
+                bytes_out[0] = 0
+                if upload is not None:
+                    upload.reset()
+                connect_time = self._send_request(conn, method, conn_url,
+                                                  headers, body, count)
+                resp = conn.getresponse()
         except socket.gaierror as e:
+            conn.close()
             message = "Error finding address for %(url)s: %(e)s" % locals()
             raise exc.EndpointNotFound(message)
         except (socket.error, socket.timeout) as e:
+            conn.close()
             endpoint = self.endpoint
             message = "Error communicating with %(endpoint)s %(e)s" % locals()
             raise exc.TimeoutException(message)
-
-        body_iter = ResponseBodyIterator(resp)
+        except Exception:
+            conn.close()
+            raise
+
+        if (resp.status == 401 and self.reauthenticate is not None and
+                token and not kwargs.get('replayed') and
+                (body is None or isinstance(body, basestring))):
+            resp.read()
+            self._checkin(conn, resp)
+            LOG.info("Got 401, re-authenticating and replaying %s %s",
+                     method, url)
+            self.reauthenticate(token)
+            if upload is not None:
+                upload.reset()
+            kwargs['replayed'] = True
+            return self._http_request(url, method, **kwargs)
+
+        body_iter = ResponseBodyIterator(
+            resp, release=lambda: self._checkin(conn, resp),
+            checksum=kwargs.get('checksum', False), discard=conn.close)
 
         # Read body into string if it isn't obviously image data
         if resp.getheader('content-type', None) != 'application/octet-stream':
             body_str = ''.join([body_chunk for body_chunk in body_iter])
             body_iter = StringIO.StringIO(body_str)
+            bytes_in = len(body_str)
             self._log_response(resp, None)
         else:
+            # Image data is streamed to the caller, so the latency is the
+            # time to the response headers
+            bytes_in = int(resp.getheader('content-length', None) or 0)
             self._log_response(resp, body_iter)
 
+        recorder = metrics.get_recorder()
+        if recorder is not None:
+            recorder.record('image', method, url, resp.status,
+                            time.time() - start, connect_time=connect_time,
+                            bytes_out=bytes_out[0], bytes_in=bytes_in)
+
         return resp, body_iter
 
     def _log_request(self, method, url, headers):
-        LOG.info('Request: ' + method + ' ' + url)
-        if headers:
-            headers_out = headers
-            if 'X-Auth-Token' in headers and headers['X-Auth-Token']:
-                token = headers['X-Auth-Token']
-                if len(token) > 64 and TOKEN_CHARS_RE.match(token):
-                    headers_out = headers.copy()
-                    headers_out['X-Auth-Token'] = "<Token omitted>"
-                LOG.info('Request Headers: ' + str(headers_out))
+        http_log.log_request(LOG, method, url, headers)
 
     def _log_response(self, resp, body):
-        status = str(resp.status)
-        LOG.info("Response Status: " + status)
-        if resp.getheaders():
-            LOG.info('Response Headers: ' + str(resp.getheaders()))
-        if body:
-            str_body = str(body)
-            length = len(body)
-            LOG.info('Response Body: ' + str_body[:2048])
-            if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+        http_log.log_response(LOG, resp.status, resp.getheaders(), body)
 
     def json_request(self, method, url, **kwargs):
         kwargs.setdefault('headers', {})
@@ -194,7 +321,8 @@ class HTTPClient(object):
                                      'application/octet-stream')
         if 'body' in kwargs:
             if (hasattr(kwargs['body'], 'read')
-                    and method.lower() in ('post', 'put')):
+                    and method.lower() in ('post', 'put')
+                    and streaming.body_length(kwargs['body']) is None):
                 # We use 'Transfer-Encoding: chunked' because
                 # body size may not always be known in advance.
                 kwargs['headers']['Transfer-Encoding'] = 'chunked'
@@ -271,7 +399,8 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
             msg = msg + ', subjectAltName "%s"' % san_list
         raise exc.SSLCertificateError(msg)
 
-    def verify_callback(self, connection, x509, errnum,
+    @classmethod
+    def verify_callback(cls, connection, x509, errnum,
                         depth, preverify_ok):
         if x509.has_expired():
             msg = "SSL Certificate expired on '%s'" % x509.get_notAfter()
@@ -279,38 +408,57 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
 
         if depth == 0 and preverify_ok is True:
             # We verify that the host matches against the last
-            # certificate in the chain
-            return self.host_matches_cert(self.host, x509)
+            # certificate in the chain. The context is shared, so the
+            # host is the one connect() stored in the connection.
+            return cls.host_matches_cert(connection.get_app_data(), x509)
         else:
             # Pass through OpenSSL's default result
             return preverify_ok
 
+    def context_key(self):
+        return (self.cacert, self.cert_file, self.key_file,
+                self.insecure is True, self.ssl_compression is not False)
+
     def setcontext(self):
         """
         Set up the OpenSSL context.
+
+        Contexts are cached by configuration, so that the certificate,
+        key and CA files are only loaded once, and so that TLS sessions
+        can be resumed by later connections.
         """
-        self.context = OpenSSL.SSL.Context(OpenSSL.SSL.SSLv23_METHOD)
+        key = self.context_key()
+        with _ssl_lock:
+            context = _ssl_contexts.get(key)
+            if context is None:
+                context = self.make_context()
+                _ssl_contexts[key] = context
+        self.context = context
+
+    def make_context(self):
+        context = OpenSSL.SSL.Context(OpenSSL.SSL.SSLv23_METHOD)
+        context.set_session_cache_mode(OpenSSL.SSL.SESS_CACHE_CLIENT)
 
         if self.ssl_compression is False:
-            self.context.set_options(0x20000)  # SSL_OP_NO_COMPRESSION
+            context.set_options(0x20000)  # SSL_OP_NO_COMPRESSION
 
         if self.insecure is not True:
-            self.context.set_verify(OpenSSL.SSL.VERIFY_PEER,
-                                    self.verify_callback)
+            context.set_verify(OpenSSL.SSL.VERIFY_PEER,
+                               self.verify_callback)
         else:
-            self.context.set_verify(OpenSSL.SSL.VERIFY_NONE,
-                                    self.verify_callback)
+            context.set_verify(OpenSSL.SSL.VERIFY_NONE,
+                               self.verify_callback)
 
         if self.cert_file:
             try:
-                self.context.use_certificate_file(self.cert_file)
+                context.use_certificate_file(self.cert_file)
             except Exception, e:
                 msg = 'Unable to load cert from "%s" %s' % (self.cert_file, e)
                 raise exc.SSLConfigurationError(msg)
             if self.key_file is None:
                 # We support having key and cert in same file
                 try:
-                    self.context.use_privatekey_file(self.cert_file)
+                    context.use_privatekey_file(self.cert_file)
                 except Exception, e:
                     msg = ('No key file specified and unable to load key '
                            'from "%s" %s' % (self.cert_file, e))
@@ -318,24 +466,41 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
 
         if self.key_file:
             try:
-                self.context.use_privatekey_file(self.key_file)
+                context.use_privatekey_file(self.key_file)
             except Exception, e:
                 msg = 'Unable to load key from "%s" %s' % (self.key_file, e)
                 raise exc.SSLConfigurationError(msg)
 
         if self.cacert:
             try:
-                self.context.load_verify_locations(self.cacert)
+                context.load_verify_locations(self.cacert)
             except Exception, e:
-                msg = 'Unable to load CA from "%s"' % (self.cacert, e)
+                msg = 'Unable to load CA from "%s" %s' % (self.cacert, e)
                 raise exc.SSLConfigurationError(msg)
         else:
-            self.context.set_default_verify_paths()
+            context.set_default_verify_paths()
+
+        return context
+
+    def _session_key(self):
+        return (self.context_key(), self.host, self.port)
+
+    def _save_session(self):
+        try:
+            session = self.sock.get_session()
+        except OpenSSL.SSL.Error:
+            return
+        if session is not None:
+            with _ssl_lock:
+                _ssl_sessions[self._session_key()] = session
 
     def connect(self):
         """
         Connect to an SSL port using the OpenSSL library and apply
         per-connection parameters.
+
+        The handshake resumes the last TLS session established with the
+        same host, if any.
         """
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         if self.timeout is not None:
@@ -343,14 +508,47 @@ class VerifiedHTTPSConnection(httplib.HTTPSConnection):
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO,
                             struct.pack('LL', self.timeout, 0))
         self.sock = OpenSSLConnectionDelegator(self.context, sock)
+        self.sock.set_app_data(self.host)
+        with _ssl_lock:
+            session = _ssl_sessions.get(self._session_key())
+        if session is not None:
+            self.sock.set_session(session)
         self.sock.connect((self.host, self.port))
+        self.sock.do_handshake()
+        self._save_session()
+
+    def close(self):
+        # NOTE: with TLS 1.3 the session tickets arrive after the
+        # handshake, so the session is saved again once it has been used.
+        # OpenSSL doesn't resume a session whose connection was dropped
+        # without a close_notify.
+        if self.sock is not None:
+            self._save_session()
+            try:
+                self.sock.shutdown()
+            except (OpenSSL.SSL.Error, socket.error):
+                pass
+        httplib.HTTPSConnection.close(self)
 
 
 class ResponseBodyIterator(object):
-    """A class that acts as an iterator over an HTTP response."""
+    """A class that acts as an iterator over an HTTP response.
+
+    Once the body has been read entirely, release is called so that the
+    connection can serve the next requests. If the iterator is closed, or
+    garbage collected, before, discard is called instead to close it.
+    """
 
-    def __init__(self, resp):
+    def __init__(self, resp, release=None, checksum=False, discard=None):
         self.resp = resp
+        self.release = release
+        self.discard = discard
+        self.bytes_read = 0
+        self._md5 = hashlib.md5() if checksum else None
+        self._eof = False
+
+    def __del__(self):
+        self.close()
 
     def __iter__(self):
         while True:
@@ -359,6 +557,37 @@ class ResponseBodyIterator(object):
     def next(self):
         chunk = self.resp.read(CHUNKSIZE)
         if chunk:
+            self.bytes_read += len(chunk)
+            if self._md5 is not None:
+                self._md5.update(chunk)
             return chunk
         else:
+            self._eof = True
+            self.close()
             raise StopIteration()
+
+    def close(self):
+        """Release the connection, closing it unless the body was read."""
+        if self.release is None and self.discard is None:
+            return
+        release, discard = self.release, self.discard
+        self.release = self.discard = None
+        self.resp.close()
+        # The connection can serve another request once the whole
+        # response has been read
+        if self._eof:
+            if release is not None:
+                release()
+        elif discard is not None:
+            discard()
+
+    def write_to(self, dest):
+        """Write the remaining body into the file-like object dest."""
+        for chunk in self:
+            dest.write(chunk)
+        return self.bytes_read
+
+    def hexdigest(self):
+        """The MD5 of the body read so far, if checksum was set."""
+        if self._md5 is not None:
+            return self._md5.hexdigest()
@@ -0,0 +1,168 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Request and response logging for the HTTP clients.
+
+Nothing is formatted, copied or hashed unless a record is actually
+emitted: headers and bodies are passed to the logger as lazy objects, and
+the debug records are skipped altogether when DEBUG is disabled. Logged
+bodies are capped to [debug] log_body_limit bytes.
+
+If [debug] request_log_buffer is set, the debug records are kept in a ring
+buffer of that many records instead of being logged. Tests clear the
+buffer when they start and attach its content to their result when they
+fail, so only the requests of failing tests end up in the output.
+"""
+
+import collections
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from tempest import config
+
+TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
+
+_buffer = None
+_buffer_checked = False
+_buffer_lock = threading.Lock()
+
+
+class _Headers(object):
+
+    """Formats headers with the X-Auth-Token of PKI tokens omitted."""
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def capture(self):
+        # Header dicts are reused, e.g. for retries
+        return _Headers(dict(self.headers))
+
+    def __str__(self):
+        headers = dict(self.headers)
+        headers.pop('status', None)
+        token = headers.get('X-Auth-Token')
+        if token and len(token) > 64 and TOKEN_CHARS_RE.match(token):
+            headers['X-Auth-Token'] = "<Token omitted>"
+        return str(headers)
+
+
+class _Body(object):
+
+    """Formats at most limit bytes of a body."""
+
+    def __init__(self, body, limit, length=None):
+        self.body = body
+        self.limit = limit
+        self.length = length
+
+    def capture(self):
+        # Only keep what may be logged, without the md5 summary
+        if not isinstance(self.body, basestring):
+            return _Body(str(self), self.limit)
+        return _Body(self.body[:self.limit], self.limit, len(self.body))
+
+    def __str__(self):
+        if not isinstance(self.body, basestring):
+            return '<%s>' % type(self.body).__name__
+        if self.length is not None and self.length > len(self.body):
+            return '%s... (%d bytes)' % (self.body, self.length)
+        if len(self.body) <= self.limit:
+            return self.body
+        return '%s... (%d bytes, md5 %s)' % (
+            self.body[:self.limit], len(self.body),
+            hashlib.md5(self.body).hexdigest())
+
+
+class RequestLogBuffer(object):
+
+    """Ring buffer keeping the latest request log records."""
+
+    def __init__(self, size):
+        self.records = collections.deque(maxlen=size)
+
+    def add(self, level, msg, *args):
+        self.records.append((time.time(), level, msg, args))
+
+    def clear(self):
+        self.records.clear()
+
+    def dump(self):
+        lines = []
+        for created, level, msg, args in list(self.records):
+            stamp = time.strftime('%H:%M:%S', time.localtime(created))
+            lines.append('%s.%03d %s %s' % (stamp, (created % 1) * 1000,
+                                            logging.getLevelName(level),
+                                            msg % args))
+        return '\n'.join(lines)
+
+
+def get_buffer():
+    """Return the request log buffer, or None if it is disabled."""
+    global _buffer, _buffer_checked
+    if not _buffer_checked:
+        with _buffer_lock:
+            if not _buffer_checked:
+                size = config.TempestConfig().debug.request_log_buffer
+                if size > 0:
+                    _buffer = RequestLogBuffer(size)
+                _buffer_checked = True
+    return _buffer
+
+
+def _log(logger, level, msg, *args):
+    buf = get_buffer()
+    if buf is not None:
+        if level < logging.INFO:
+            # Stored unformatted, only formatted if the buffer is dumped
+            buf.add(level, msg, *[arg.capture() if hasattr(arg, 'capture')
+                                  else arg for arg in args])
+            return
+        buf.add(level, msg, *args)
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, *args)
+
+
+def _wanted(logger):
+    return get_buffer() is not None or logger.isEnabledFor(logging.DEBUG)
+
+
+def log_request(logger, method, url, headers, body=None):
+    _log(logger, logging.INFO, 'Request: %s %s', method, url)
+    if not _wanted(logger):
+        return
+    limit = config.TempestConfig().debug.log_body_limit
+    if headers:
+        _log(logger, logging.DEBUG, 'Request Headers: %s', _Headers(headers))
+    if body:
+        _log(logger, logging.DEBUG, 'Request Body: %s', _Body(body, limit))
+
+
+def log_response(logger, status, headers, body=None):
+    _log(logger, logging.INFO, 'Response Status: %s', status)
+    if not _wanted(logger):
+        return
+    limit = config.TempestConfig().debug.log_body_limit
+    if headers:
+        _log(logger, logging.DEBUG, 'Response Headers: %s',
+             _Headers(headers))
+    if body:
+        _log(logger, logging.DEBUG, 'Response Body: %s', _Body(body, limit))
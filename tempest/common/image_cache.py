@@ -0,0 +1,199 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Content-addressed cache of image fixtures.
+
+Tests that only read an image don't need their own copy of it. An image
+fixture is identified by the MD5 of its data and its metadata, hashed into
+a key stored in the image as the FIXTURE_PROPERTY property. The first test
+asking for a key uploads the image; later tests of the run get the same
+image.
+
+Every test holding an image counts as a reference. Images the cache
+uploaded are deleted by purge() once nothing references them, and those
+left at the end of the run, unless they are kept for the next runs. Only
+kept images, whose keys are marked as such, are looked for and reused
+across runs: other runs may delete their images at any time, or never if
+they are killed.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+
+from tempest.common import streaming
+from tempest import config
+
+LOG = logging.getLogger(__name__)
+
+FIXTURE_PROPERTY = 'tempest_fixture'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def data_md5(data):
+    """Return the MD5 of a string or of a seekable file-like object.
+
+    A file is read from its current position, which is restored so that
+    the data can be uploaded afterwards.
+    """
+    md5 = hashlib.md5()
+    position = None if isinstance(data, basestring) else data.tell()
+    for chunk in streaming.iter_chunks(data):
+        md5.update(chunk)
+    if position is not None:
+        data.seek(position)
+    return md5.hexdigest()
+
+
+def fixture_key(checksum, keep=False, **metadata):
+    """Return the key of the image with data checksum and metadata.
+
+    :param keep: whether the image is kept for the next runs, see
+                 ImageFixtureCache
+    """
+    fields = dict(metadata, checksum=checksum)
+    if keep:
+        fields['kept'] = True
+    return hashlib.sha1(json.dumps(fields, sort_keys=True)).hexdigest()
+
+
+class _Entry(object):
+
+    def __init__(self, image_id, delete=None):
+        self.image_id = image_id
+        # Set only for the images the cache uploaded
+        self.delete = delete
+        self.refs = 0
+
+
+class ImageFixtureCache(object):
+
+    """Reference counted images shared by the tests of a run, by key.
+
+    :param keep: whether the images are kept for the next runs, in which
+                 case those kept by earlier runs are reused too
+    """
+
+    def __init__(self, keep=False):
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._key_locks = {}
+        self._keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, key, find, create, delete):
+        """Return the id of the image with key and take a reference to it.
+
+        :param key: the fixture key, see fixture_key(), marked as kept if
+                    the cache keeps its images
+        :param find: callable taking key and returning the id of an existing
+                     image holding it, or None; only called if the cache
+                     keeps its images
+        :param create: callable taking key and returning the id of a new
+                       image holding it
+        :param delete: callable taking an image id and deleting the image
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # NOTE: one upload per key, without serializing different keys
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.refs += 1
+                    return entry.image_id
+                self.misses += 1
+            image_id = find(key) if self.keep else None
+            if image_id is not None:
+                LOG.debug("Reusing image %s for fixture %s", image_id, key)
+                entry = _Entry(image_id)
+            else:
+                image_id = create(key)
+                LOG.debug("Uploaded image %s for fixture %s", image_id, key)
+                entry = _Entry(image_id, delete)
+            entry.refs = 1
+            with self._lock:
+                self._entries[key] = entry
+                self._keys[image_id] = key
+            return image_id
+
+    def release(self, image_id):
+        """Drop a reference taken by acquire()."""
+        with self._lock:
+            key = self._keys.get(image_id)
+            if key is None:
+                return
+            entry = self._entries[key]
+            entry.refs = max(0, entry.refs - 1)
+
+    def purge(self, unused_only=True):
+        """Delete the uploaded images that nothing references any more.
+
+        Images found rather than uploaded, or kept for the next runs, are
+        left alone.
+
+        :param unused_only: if False, the images still referenced are
+                            deleted too, e.g. when the run is over
+        """
+        if self.keep:
+            return
+        with self._lock:
+            unused = [(key, entry) for key, entry in self._entries.items()
+                      if entry.delete is not None and
+                      (entry.refs == 0 or not unused_only)]
+            for key, entry in unused:
+                del self._entries[key]
+                del self._keys[entry.image_id]
+        for key, entry in unused:
+            try:
+                entry.delete(entry.image_id)
+            except Exception as e:
+                LOG.warning("Unable to delete image %s of fixture %s: %s",
+                            entry.image_id, key, e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'images': len(self._entries),
+                'in_use': sum(1 for entry in self._entries.values()
+                              if entry.refs),
+            }
+
+
+def get_cache():
+    """Return the process-wide image fixture cache, creating it if needed.
+
+    The images it uploaded are deleted when the process exits.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = config.TempestConfig()
+                _cache = ImageFixtureCache(conf.images.keep_fixture_images)
+                atexit.register(_cache.purge, unused_only=False)
+    return _cache
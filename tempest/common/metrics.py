@@ -0,0 +1,348 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-request HTTP metrics.
+
+Every API call made through RestClient or the Glance HTTPClient is
+recorded under its service, method, URL template (the URL with ids
+replaced by {id}, or the object store path with its account, container
+and object names replaced) and status. Latency and connect time go into
+histograms with a bounded relative error, in the spirit of HdrHistogram,
+so percentiles stay accurate over any number of requests in a fixed
+amount of memory.
+
+The aggregated metrics are exported as JSON or in the Prometheus text
+format, when the process exits if [metrics] export_path is set, or at
+any time with Recorder.dump().
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urlparse
+
+from tempest import config
+
+LOG = logging.getLogger(__name__)
+
+# Path segments replaced by {id} in URL templates: UUIDs with or without
+# dashes, other long hex strings (e.g. Keystone ids) and integers.
+ID_RE = re.compile('^([0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?'
+                   '[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}|[0-9a-fA-F]{32,}|'
+                   '[0-9]+)$')
+
+_recorder = None
+_recorder_checked = False
+_recorder_lock = threading.Lock()
+
+
+# API version segment of an absolute object store path, e.g. v1
+VERSION_RE = re.compile('^v[0-9.]+$')
+
+
+def url_template(url, object_store=False):
+    """Strip the query string and replace the ids in a URL path.
+
+    :param object_store: whether url is an object store URL, whose names
+                         are replaced rather than its ids, see
+                         object_path_template()
+    """
+    path = url.split('?', 1)[0]
+    if object_store:
+        return object_path_template(path)
+    return '/'.join('{id}' if ID_RE.match(part) else part
+                    for part in path.split('/'))
+
+
+def object_path_template(path):
+    """Replace the names in an object store URL path.
+
+    Object names may contain slashes, and container and object names are
+    chosen by the tests, so every segment after the account is replaced:
+    /v1/AUTH_x/c/a/b becomes /v1/{account}/{container}/{object}. Paths
+    relative to the account endpoint, as used by the clients, become
+    {container}/{object}. Paths outside of an account, e.g. /info, are
+    left alone.
+    """
+    if '://' in path:
+        path = urlparse.urlparse(path).path
+    prefix = ''
+    if path.startswith('/'):
+        parts = path.split('/', 3)
+        if len(parts) < 3 or not VERSION_RE.match(parts[1]):
+            return path
+        prefix = '/%s/{account}' % parts[1]
+        path = parts[3] if len(parts) > 3 else ''
+        if path:
+            prefix += '/'
+    names = path.split('/', 1) if path else []
+    return prefix + '/'.join(['{container}', '{object}'][:len(names)])
+
+
+class Histogram(object):
+
+    """Log-linear histogram of non-negative integer values.
+
+    Values below 2 ** precision are counted exactly. Larger values fall in
+    buckets 2 ** (n - precision) wide for values of n bits, which bounds
+    the relative error to 2 ** -precision (under 1% by default).
+    """
+
+    def __init__(self, precision=7):
+        self.precision = precision
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        shift = value.bit_length() - self.precision
+        if shift <= 0:
+            return value
+        return (value >> shift) << shift
+
+    def record(self, value):
+        value = max(0, int(value))
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, percent):
+        """Return the value below which percent % of the values fall."""
+        if not self.count:
+            return None
+        rank = max(1, int(round(self.count * percent / 100.0)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                # The middle of the bucket, within the observed range
+                width = 1 << max(0, bucket.bit_length() - self.precision)
+                return min(max(bucket + width // 2, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        if not self.count:
+            return None
+        return float(self.total) / self.count
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean(),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': sorted(self.counts.items()),
+        }
+
+    @classmethod
+    def from_dict(cls, data, precision=7):
+        histogram = cls(precision)
+        for bucket, count in data['buckets']:
+            histogram.counts[bucket] = count
+        histogram.count = data['count']
+        histogram.total = data['sum']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+class RequestStats(object):
+
+    """Aggregated metrics of the requests sharing a metrics key."""
+
+    def __init__(self):
+        # Times are recorded in microseconds
+        self.latency = Histogram()
+        self.connect = Histogram()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.connect.merge(other.connect)
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+
+
+class Recorder(object):
+
+    """Thread-safe registry of request metrics.
+
+    :param object_store_type: the service of object store requests, see
+                              url_template()
+    """
+
+    LABELS = ('service', 'method', 'url', 'status')
+
+    def __init__(self, object_store_type='object-store'):
+        self.object_store_type = object_store_type
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.started_at = time.time()
+
+    def record(self, service, method, url, status, latency,
+               connect_time=0.0, bytes_out=0, bytes_in=0):
+        """Record one request.
+
+        :param url: the request URL, relative to the service endpoint
+        :param latency: seconds from sending the request to having read
+                        the response
+        :param connect_time: seconds spent opening a connection, 0 if one
+                             was reused
+        """
+        template = url_template(url, service == self.object_store_type)
+        key = (service or 'unknown', method.upper(), template, str(status))
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RequestStats()
+            stats.latency.record(latency * 1e6)
+            stats.connect.record(connect_time * 1e6)
+            stats.bytes_out += bytes_out or 0
+            stats.bytes_in += bytes_in or 0
+
+    def snapshot(self, reset=False):
+        """Return a copy of the metrics, optionally starting over."""
+        with self._lock:
+            stats = self._stats
+            started_at = self.started_at
+            if reset:
+                self._stats = {}
+                self.started_at = time.time()
+            else:
+                stats = dict((key, _copy(value))
+                             for key, value in stats.items())
+        return started_at, stats
+
+    def to_json(self, reset=False):
+        started_at, stats = self.snapshot(reset)
+        requests = []
+        for key, value in sorted(stats.items()):
+            entry = dict(zip(self.LABELS, key))
+            entry['latency_us'] = value.latency.to_dict()
+            entry['connect_us'] = value.connect.to_dict()
+            entry['bytes_in'] = value.bytes_in
+            entry['bytes_out'] = value.bytes_out
+            requests.append(entry)
+        return json.dumps({'start': started_at, 'end': time.time(),
+                           'requests': requests}, indent=2)
+
+    def to_prometheus(self, reset=False):
+        started_at, stats = self.snapshot(reset)
+        lines = []
+        for name, attr, help_text in (
+                ('tempest_http_request_duration_seconds', 'latency',
+                 'Time from sending a request to reading its response.'),
+                ('tempest_http_connect_duration_seconds', 'connect',
+                 'Time spent opening connections for requests.')):
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s summary' % name)
+            for key, value in sorted(stats.items()):
+                histogram = getattr(value, attr)
+                labels = _labels(self.LABELS, key)
+                for quantile in (0.5, 0.9, 0.95, 0.99):
+                    lines.append('%s{%s,quantile="%s"} %.6f' % (
+                        name, labels, quantile,
+                        histogram.percentile(quantile * 100) / 1e6))
+                lines.append('%s_sum{%s} %.6f' % (
+                    name, labels, histogram.total / 1e6))
+                lines.append('%s_count{%s} %d' % (
+                    name, labels, histogram.count))
+        name = 'tempest_http_bytes_total'
+        lines.append('# HELP %s Bytes of request and response bodies.' %
+                     name)
+        lines.append('# TYPE %s counter' % name)
+        for key, value in sorted(stats.items()):
+            labels = _labels(self.LABELS, key)
+            lines.append('%s{%s,direction="out"} %d' % (
+                name, labels, value.bytes_out))
+            lines.append('%s{%s,direction="in"} %d' % (
+                name, labels, value.bytes_in))
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path, fmt='json', reset=False):
+        """Write the metrics to path as 'json' or 'prometheus'."""
+        if fmt == 'prometheus':
+            data = self.to_prometheus(reset)
+        else:
+            data = self.to_json(reset)
+        with open(path, 'w') as f:
+            f.write(data)
+
+
+def _copy(stats):
+    copy = RequestStats()
+    copy.merge(stats)
+    return copy
+
+
+def _labels(names, values):
+    return ','.join('%s="%s"' % (name, value.replace('"', '\\"'))
+                    for name, value in zip(names, values))
+
+
+def _export():
+    conf = config.TempestConfig().metrics
+    path = conf.export_path % {'pid': os.getpid()}
+    try:
+        _recorder.dump(path, conf.export_format)
+    except Exception:
+        LOG.exception("Failed to export request metrics to %s", path)
+
+
+def get_recorder():
+    """Return the process-wide Recorder, or None if metrics are disabled."""
+    global _recorder, _recorder_checked
+    if not _recorder_checked:
+        with _recorder_lock:
+            if not _recorder_checked:
+                tempest_conf = config.TempestConfig()
+                conf = tempest_conf.metrics
+                if conf.enabled:
+                    _recorder = Recorder(
+                        tempest_conf.object_storage.catalog_type)
+                    if conf.export_path:
+                        atexit.register(_export)
+                _recorder_checked = True
+    return _recorder
@@ -0,0 +1,95 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Lazy iteration over marker-paginated listings.
+
+Swift lists containers and objects in pages of at most ``limit`` entries
+sorted by name; the next page starts after the ``marker`` name. iter_pages()
+yields the entries of such a listing one by one, requesting the next page
+in a background thread while the caller consumes the current one. At most
+two pages are held in memory whatever the size of the listing.
+"""
+
+import sys
+import threading
+
+# Largest page the Swift proxy returns by default
+PAGE_SIZE = 10000
+
+
+def entry_marker(entry):
+    """Return the name to resume a listing after entry.
+
+    With a delimiter, the pseudo-directories are listed as entries holding
+    a 'subdir' instead of a 'name'.
+    """
+    if 'name' in entry:
+        return entry['name']
+    return entry['subdir']
+
+
+class _Prefetch(threading.Thread):
+
+    """Fetches a page in the background."""
+
+    def __init__(self, get_page, marker, limit):
+        super(_Prefetch, self).__init__()
+        self.daemon = True
+        self.get_page = get_page
+        self.marker = marker
+        self.limit = limit
+        self.page = None
+        self.exc_info = None
+
+    def run(self):
+        try:
+            self.page = self.get_page(self.marker, self.limit)
+        except Exception:
+            self.exc_info = sys.exc_info()
+
+    def result(self):
+        self.join()
+        if self.exc_info is not None:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+        return self.page
+
+
+def iter_pages(get_page, limit=PAGE_SIZE, marker=None, prefetch=True):
+    """Iterate over the entries of a marker-paginated listing.
+
+    :param get_page: callable taking a marker (None for the first page) and
+                     a limit, and returning a list of entry dicts
+    :param limit: the number of entries requested per page
+    :param marker: list the entries after this name only
+    :param prefetch: request the next page while the current one is being
+                     consumed
+    """
+    page = get_page(marker, limit)
+    while page:
+        pending = None
+        # NOTE: a short page is the last one, there is no need to ask
+        if len(page) >= limit:
+            marker = entry_marker(page[-1])
+            if prefetch:
+                pending = _Prefetch(get_page, marker, limit)
+                pending.start()
+        for entry in page:
+            yield entry
+        if len(page) < limit:
+            return
+        page = pending.result() if pending else get_page(marker, limit)
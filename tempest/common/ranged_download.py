@@ -0,0 +1,158 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Parallel ranged downloads.
+
+A body of known size is fetched as byte ranges requested concurrently,
+each written at its offset into a buffer allocated up front: a memory map
+of the destination file, or an anonymous memory map when there is none.
+The MD5 of the reassembled data is computed at the end so that it can be
+checked against the ETag or checksum announced by the server.
+
+Servers that don't support ranges, e.g. Glance v1, answer a Range request
+with the whole body. The first range is requested alone to find out, and
+its body taken as the whole data if it is such an answer, instead of
+downloading the whole body once per range.
+"""
+
+import hashlib
+import logging
+import mmap
+import time
+
+from tempest.common import concurrency
+from tempest.common import streaming
+
+LOG = logging.getLogger(__name__)
+
+
+def split_ranges(size, chunk_size):
+    """Return the inclusive (first, last) byte ranges covering size."""
+    return [(first, min(first + chunk_size, size) - 1)
+            for first in xrange(0, size, chunk_size)]
+
+
+class EmptyBuffer(str):
+
+    """Stands for the memory map of an empty body, which mmap can't map."""
+
+    def __new__(cls):
+        return super(EmptyBuffer, cls).__new__(cls, '')
+
+    def close(self):
+        pass
+
+
+def allocate(size, dest=None):
+    """Return a writable memory map of size bytes.
+
+    An EmptyBuffer is returned instead if size is 0.
+
+    :param dest: None for an anonymous map, a path or a file object opened
+                 for update, which is truncated to size
+    """
+    if dest is None:
+        return mmap.mmap(-1, size) if size else EmptyBuffer()
+    if isinstance(dest, basestring):
+        with open(dest, 'w+b') as f:
+            return allocate(size, f)
+    dest.truncate(size)
+    dest.flush()
+    return mmap.mmap(dest.fileno(), size) if size else EmptyBuffer()
+
+
+def hexdigest(buf, chunk_size=streaming.CHUNKSIZE):
+    md5 = hashlib.md5()
+    for offset in xrange(0, len(buf), chunk_size):
+        md5.update(buf[offset:offset + chunk_size])
+    return md5.hexdigest()
+
+
+def download(get_range, size, dest=None, chunk_size=None, workers=4):
+    """Download size bytes as concurrent ranges.
+
+    :param get_range: callable taking the first and last byte of a range
+                      and returning the response and its body. A '200'
+                      response to the first range is taken as the whole
+                      body, see the module docstring.
+    :param size: the length of the body
+    :param dest: as for allocate()
+    :param chunk_size: bytes per range, by default size split evenly
+                       between the workers
+    :param workers: number of ranges requested concurrently
+    :returns: the memory map holding the data, which the caller closes,
+              see allocate(), and a dict with the number of ranges
+              requested, whether the server answered them as ranges, the
+              bytes downloaded, the MD5 of the data, the elapsed time and
+              the throughput in bytes per second
+    """
+    workers = max(1, workers)
+    if not chunk_size:
+        chunk_size = -(-size // workers)
+    ranges = split_ranges(size, max(1, chunk_size))
+    buf = allocate(size, dest)
+
+    def store(first, last, body):
+        if len(body) != last - first + 1:
+            raise ValueError("Got %d bytes for the range %d-%d" %
+                             (len(body), first, last))
+        buf[first:last + 1] = body
+
+    def fetch(first, last):
+        resp, body = get_range(first, last)
+        if resp['status'] != '206':
+            raise ValueError("Range %d-%d was answered with a %s" %
+                             (first, last, resp['status']))
+        store(first, last, body)
+
+    start = time.time()
+    ranged = True
+    try:
+        if ranges:
+            probe_first, probe_last = ranges[0]
+            resp, body = get_range(probe_first, probe_last)
+            if resp['status'] == '200':
+                LOG.warning("Ranges aren't supported, the first one was "
+                            "answered with the whole body")
+                ranged = False
+                ranges = ranges[:1]
+                store(0, size - 1, body)
+            else:
+                store(probe_first, probe_last, body)
+            # NOTE: the whole body may be large, don't hold it any longer
+            del body
+        if ranged:
+            errors = concurrency.run_concurrently(
+                [lambda first=first, last=last: fetch(first, last)
+                 for first, last in ranges[1:]], workers)
+            for exc_info in errors:
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+    except Exception:
+        buf.close()
+        raise
+    elapsed = time.time() - start
+    report = {'ranges': len(ranges),
+              'ranged': ranged,
+              'bytes': size,
+              'md5': hexdigest(buf),
+              'elapsed': elapsed,
+              'throughput': size / elapsed if elapsed else None}
+    LOG.info("Downloaded %(bytes)d bytes in %(ranges)d range(s) in "
+             "%(elapsed).2f s", report)
+    return buf, report
@@ -16,26 +16,31 @@
 #    under the License.
 
 import collections
-import hashlib
-import httplib2
 import json
 import logging
 from lxml import etree
-import re
 import time
 
+from tempest.common import auth_cache
+from tempest.common import connection_pool
+from tempest.common import http_log
+from tempest.common import metrics
+from tempest.common import streaming
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import xml_to_json
 
 # redrive rate limited calls at most twice
 MAX_RECURSION_DEPTH = 2
-TOKEN_CHARS_RE = re.compile('^[-A-Za-z0-9+/=]*$')
 
 
 class RestClient(object):
     TYPE = "json"
     LOG = logging.getLogger(__name__)
 
+    # Re-authenticate once and replay a request rejected with a 401
+    reauth_on_unauthorized = True
+
     def __init__(self, config, user, password, auth_url, tenant_name=None):
         self.config = config
         self.user = user
@@ -45,6 +50,7 @@ class RestClient(object):
 
         self.service = None
         self.token = None
+        self.token_expires = None
         self.base_url = None
         self.region = {'compute': self.config.identity.region}
         self.endpoint_url = 'publicURL'
@@ -62,7 +68,8 @@ class RestClient(object):
                                        'retry-after', 'server',
                                        'vary', 'www-authenticate'))
         dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
+        self.http_obj = connection_pool.PooledHttp(
+            disable_ssl_certificate_validation=dscv)
 
     def _set_auth(self):
         """
@@ -70,11 +77,11 @@ class RestClient(object):
         """
 
         if self.strategy == 'keystone':
-            self.token, self.base_url = self.keystone_auth(self.user,
-                                                           self.password,
-                                                           self.auth_url,
-                                                           self.service,
-                                                           self.tenant_name)
+            entry = self._keystone_auth_entry(self.user, self.password,
+                                              self.auth_url, self.tenant_name)
+            self.token = entry.token
+            self.token_expires = entry.expires
+            self.base_url = self._get_endpoint(entry.catalog, self.service)
         else:
             self.token, self.base_url = self.basic_auth(self.user,
                                                         self.password,
@@ -86,7 +93,10 @@ class RestClient(object):
         will fetch a new token and base_url.
         """
 
+        if self.token is not None:
+            auth_cache.get_cache().invalidate_token(self.token)
         self.token = None
+        self.token_expires = None
         self.base_url = None
 
     def get_auth(self):
@@ -117,12 +127,27 @@ class RestClient(object):
     def keystone_auth(self, user, password, auth_url, service, tenant_name):
         """
         Provides authentication via Keystone.
+
+        The token and service catalog are shared through the process-wide
+        token cache, so only the first client authenticating with a given
+        set of credentials sends a request to Keystone.
         """
 
+        entry = self._keystone_auth_entry(user, password, auth_url,
+                                          tenant_name)
+        return entry.token, self._get_endpoint(entry.catalog, service)
+
+    def _keystone_auth_entry(self, user, password, auth_url, tenant_name):
         # Normalize URI to ensure /tokens is in it.
         if 'tokens' not in auth_url:
             auth_url = auth_url.rstrip('/') + '/tokens'
 
+        key = (auth_url, user, password, tenant_name)
+        return auth_cache.get_cache().get(
+            key, lambda: self._keystone_authenticate(user, password,
+                                                     auth_url, tenant_name))
+
+    def _keystone_authenticate(self, user, password, auth_url, tenant_name):
         creds = {
             'auth': {
                 'passwordCredentials': {
@@ -136,8 +161,11 @@ class RestClient(object):
         headers = {'Content-Type': 'application/json'}
         body = json.dumps(creds)
         self._log_request('POST', auth_url, headers, body)
+        start = time.time()
         resp, resp_body = self.http_obj.request(auth_url, 'POST',
                                                 headers=headers, body=body)
+        self._record_metrics('POST', 'tokens', body, resp, resp_body,
+                             time.time() - start, service='identity')
         self._log_response(resp, resp_body)
 
         if resp.status == 200:
@@ -148,21 +176,10 @@ class RestClient(object):
                 print "Failed to obtain token for user: %s" % e
                 raise
 
-            mgmt_url = None
-            for ep in auth_data['serviceCatalog']:
-                if ep["type"] == service:
-                    for _ep in ep['endpoints']:
-                        if service in self.region and \
-                                _ep['region'] == self.region[service]:
-                            mgmt_url = _ep[self.endpoint_url]
-                    if not mgmt_url:
-                        mgmt_url = ep['endpoints'][0][self.endpoint_url]
-                    break
-
-            if mgmt_url is None:
-                raise exceptions.EndpointNotFound(service)
-
-            return token, mgmt_url
+            expires = auth_cache.parse_expiry(
+                auth_data['token'].get('expires'))
+            return auth_cache.AuthEntry(token, auth_data['serviceCatalog'],
+                                        expires)
 
         elif resp.status == 401:
             raise exceptions.AuthenticationFailure(user=user,
@@ -170,6 +187,27 @@ class RestClient(object):
         raise exceptions.IdentityError('Unexpected status code {0}'.format(
             resp.status))
 
+    def _get_endpoint(self, catalog, service):
+        """Returns the endpoint of service in catalog for this client."""
+
+        mgmt_url = None
+        for ep in catalog:
+            if ep["type"] == service:
+                for _ep in ep['endpoints']:
+                    if service in self.region and \
+                            _ep['region'] == self.region[service]:
+                        mgmt_url = _ep[self.endpoint_url]
+                if not mgmt_url:
+                    mgmt_url = ep['endpoints'][0][self.endpoint_url]
+                break
+
+        if mgmt_url is None:
+            raise exceptions.EndpointNotFound(service)
+
+        # NOTE: the catalog is parsed from JSON. A unicode URL would turn
+        # the whole request into unicode, which binary bodies can't join.
+        return mgmt_url.encode('utf-8')
+
     def post(self, url, body, headers):
         return self.request('POST', url, headers, body)
 
@@ -199,37 +237,10 @@ class RestClient(object):
         return resp, versions
 
     def _log_request(self, method, req_url, headers, body):
-        self.LOG.info('Request: ' + method + ' ' + req_url)
-        if headers:
-            print_headers = headers
-            if 'X-Auth-Token' in headers and headers['X-Auth-Token']:
-                token = headers['X-Auth-Token']
-                if len(token) > 64 and TOKEN_CHARS_RE.match(token):
-                    print_headers = headers.copy()
-                    print_headers['X-Auth-Token'] = "<Token omitted>"
-            self.LOG.debug('Request Headers: ' + str(print_headers))
-        if body:
-            str_body = str(body)
-            length = len(str_body)
-            self.LOG.debug('Request Body: ' + str_body[:2048])
-            if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+        http_log.log_request(self.LOG, method, req_url, headers, body)
 
     def _log_response(self, resp, resp_body):
-        status = resp['status']
-        self.LOG.info("Response Status: " + status)
-        headers = resp.copy()
-        del headers['status']
-        if len(headers):
-            self.LOG.debug('Response Headers: ' + str(headers))
-        if resp_body:
-            str_body = str(resp_body)
-            length = len(str_body)
-            self.LOG.debug('Response Body: ' + str_body[:2048])
-            if length >= 2048:
-                self.LOG.debug("Large body (%d) md5 summary: %s", length,
-                               hashlib.md5(str_body).hexdigest())
+        http_log.log_response(self.LOG, resp['status'], resp, resp_body)
 
     def _parse_resp(self, body):
         return json.loads(body)
@@ -268,26 +279,82 @@ class RestClient(object):
 
         req_url = "%s/%s" % (self.base_url, url)
         self._log_request(method, req_url, headers, body)
+        start = time.time()
         resp, resp_body = self.http_obj.request(req_url, method,
                                                 headers=headers, body=body)
+        self._record_metrics(method, url, body, resp, resp_body,
+                             time.time() - start)
         self._log_response(resp, resp_body)
         self.response_checker(method, url, headers, body, resp, resp_body)
 
         return resp, resp_body
 
-    def request(self, method, url,
-                headers=None, body=None):
-        retry = 0
+    def _record_metrics(self, method, url, body, resp, resp_body, latency,
+                        service=None):
+        recorder = metrics.get_recorder()
+        if recorder is None:
+            return
+        bytes_out = len(body) if isinstance(body, basestring) else 0
+        recorder.record(service or self.service, method, url, resp.status,
+                        latency,
+                        connect_time=connection_pool.last_connect_time(),
+                        bytes_out=bytes_out,
+                        bytes_in=len(resp_body or ''))
+
+    def _refresh_token(self):
+        """Picks up a token refreshed in, or expired from, the token cache.
+
+        Only the token is replaced; base_url is left alone since tests may
+        point it at another tenant on purpose.
+        """
+
+        if self.strategy != 'keystone':
+            return
+        entry = self._keystone_auth_entry(self.user, self.password,
+                                          self.auth_url, self.tenant_name)
+        if entry.token != self.token:
+            self.token = entry.token
+            self.token_expires = entry.expires
+
+    def _reauthenticate(self, failed_token):
+        """Replaces a token which was rejected with a 401.
+
+        Concurrent callers rejected with the same token share a single
+        authentication request; requests holding a valid token carry on.
+        """
+
+        auth_cache.get_cache().invalidate_token(failed_token)
+        self._refresh_token()
+
+    def _current_token(self):
+        """Returns the token to send, authenticating or refreshing it."""
+
         if (self.token is None) or (self.base_url is None):
             self._set_auth()
+        else:
+            self._refresh_token()
+        return self.token
 
+    def request(self, method, url,
+                headers=None, body=None):
+        retry = 0
         if headers is None:
             headers = {}
-        headers['X-Auth-Token'] = self.token
+        headers['X-Auth-Token'] = self._current_token()
 
         resp, resp_body = self._request(method, url,
                                         headers=headers, body=body)
 
+        # A file-like body has been consumed and can not be replayed
+        if (resp.status == 401 and self.reauth_on_unauthorized and
+                self.strategy == 'keystone' and not hasattr(body, 'read')):
+            self.LOG.info("Got 401, re-authenticating and replaying "
+                          "%s %s", method, url)
+            self._reauthenticate(headers['X-Auth-Token'])
+            headers['X-Auth-Token'] = self.token
+            resp, resp_body = self._request(method, url,
+                                            headers=headers, body=body)
+
         while (resp.status == 413 and
                'retry-after' in resp and
                 not self.is_absolute_limit(
@@ -302,6 +369,49 @@ class RestClient(object):
                             resp, resp_body)
         return resp, resp_body
 
+    def stream_request(self, method, url, headers=None, body=None,
+                       content_length=None, chunk_size=streaming.CHUNKSIZE):
+        """Sends a request without holding its bodies in memory.
+
+        body may be a string, a file-like object or an iterator of strings.
+        It is sent with chunked transfer encoding unless content_length is
+        given or can be found out without reading body.
+
+        Returns the response, a StreamingBody iterating over the response
+        body and the MD5 hex digest of the data sent. Error responses raise
+        the same exceptions as request(). A request rejected with a 401 is
+        not replayed, since body can only be read once.
+        """
+
+        headers = dict(headers or {})
+        headers['X-Auth-Token'] = self._current_token()
+        req_url = "%s/%s" % (self.base_url, url)
+        self._log_request(method, req_url, headers, None)
+        start = time.time()
+        # NOTE: streaming requests go through the same connection pool,
+        # with the same TLS options, as the others
+        http = self.http_obj
+        resp, resp_body, upload = streaming.request(
+            req_url, method, headers=headers, body=body,
+            content_length=content_length, chunk_size=chunk_size,
+            timeout=http.timeout,
+            disable_ssl_certificate_validation=(
+                http.disable_ssl_certificate_validation),
+            ca_certs=http.ca_certs)
+        recorder = metrics.get_recorder()
+        if recorder is not None:
+            # The latency is the time to the response headers
+            recorder.record(self.service, method, url, resp.status,
+                            time.time() - start,
+                            bytes_out=upload.bytes_sent,
+                            bytes_in=int(resp.get('content-length', 0)))
+        self._log_response(resp, None)
+        if resp.status >= 400:
+            error_body = resp_body.read()
+            self._error_checker(method, url, headers, None, resp,
+                                error_body)
+        return resp, resp_body, upload.hexdigest()
+
     def _error_checker(self, method, url,
                        headers, body, resp, resp_body):
 
@@ -403,13 +513,9 @@ class RestClient(object):
 
     def wait_for_resource_deletion(self, id):
         """Waits for a resource to be deleted."""
-        start_time = int(time.time())
-        while True:
-            if self.is_resource_deleted(id):
-                return
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-            time.sleep(self.build_interval)
+        waiters.wait_for(lambda: self.is_resource_deleted(id), True,
+                         self.build_timeout, self.build_interval,
+                         name='deletion of %s' % id)
 
     def is_resource_deleted(self, id):
         """
@@ -0,0 +1,125 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import jsonschema
+
+from tempest import config
+
+LOG = logging.getLogger(__name__)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class SchemaCache(object):
+
+    """Cache of JSON schemas and their compiled validators, by URL.
+
+    A schema is fetched once per URL and ``ttl`` seconds; the validator
+    built from it is reused for every validation until then. With
+    ``cache_dir``, fetched schemas are also saved there, so other processes
+    and later runs skip the download while the copy is fresh.
+    """
+
+    def __init__(self, ttl=3600, cache_dir=None):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._validators = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir,
+                            hashlib.md5(url).hexdigest() + '.json')
+
+    def _load(self, url, now):
+        """Return a fresh schema saved in cache_dir and its fetch time."""
+        try:
+            with open(self._path(url)) as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return None, None
+        if saved.get('url') != url or now - saved['fetched'] > self.ttl:
+            return None, None
+        return saved['schema'], saved['fetched']
+
+    def _save(self, url, schema, fetched):
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            # Written aside and renamed, so that readers never see a
+            # partial file
+            fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'url': url, 'fetched': fetched, 'schema': schema},
+                          f)
+            os.rename(tmp, self._path(url))
+        except (IOError, OSError) as e:
+            LOG.warning("Unable to save the schema of %s in %s: %s",
+                        url, self.cache_dir, e)
+
+    def get_validator(self, url, fetch):
+        """Return the validator of the schema at url.
+
+        :param url: the URL of the schema, identifying it in the cache
+        :param fetch: zero argument callable downloading the schema dict
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._validators.get(url)
+            if cached is not None and now - cached[0] <= self.ttl:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            schema = fetched = None
+            if self.cache_dir:
+                schema, fetched = self._load(url, now)
+            if schema is None:
+                # NOTE: fetched with the lock held, so that concurrent
+                # callers wait for one download instead of all doing it
+                schema, fetched = fetch(), now
+                if self.cache_dir:
+                    self._save(url, schema, fetched)
+            cls = jsonschema.validators.validator_for(schema)
+            validator = cls(schema)
+            self._validators[url] = (fetched, validator)
+            return validator
+
+    def clear(self):
+        with self._lock:
+            self._validators.clear()
+
+
+def get_cache():
+    """Return the process-wide schema cache, creating it if needed."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = config.TempestConfig()
+                _cache = SchemaCache(conf.images.schema_cache_ttl,
+                                     conf.images.schema_cache_dir)
+    return _cache
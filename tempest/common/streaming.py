@@ -0,0 +1,346 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Streaming HTTP requests.
+
+httplib2 sends and reads whole bodies as strings. The helpers here talk
+to httplib directly so that request bodies are read from a file-like
+object or an iterator, and response bodies are handed out chunk by chunk,
+in constant memory whatever their size. The MD5 of the data is computed
+on the fly in both directions.
+
+Connections are set up and kept alive by the process-wide connection pool,
+with the TLS options of the client, as for the other requests.
+"""
+
+import hashlib
+import httplib
+import mmap
+import os
+import socket
+import stat
+import urlparse
+
+import httplib2
+
+from tempest.common import connection_pool
+from tempest import exceptions
+
+CHUNKSIZE = 1024 * 64  # 64kB
+
+
+def body_length(data):
+    """Return the length of data if it is known without reading it."""
+    if data is None:
+        return 0
+    if isinstance(data, (basestring, mmap.mmap)):
+        return len(data)
+    if hasattr(data, 'fileno'):
+        try:
+            return os.fstat(data.fileno()).st_size - data.tell()
+        except (AttributeError, IOError, OSError):
+            pass
+    if hasattr(data, 'len'):
+        # e.g. StringIO
+        return data.len - data.tell()
+    return None
+
+
+def iter_chunks(data, chunk_size=CHUNKSIZE):
+    """Iterate over a string, a file-like object or an iterator."""
+    if data is None:
+        return
+    if isinstance(data, basestring):
+        for offset in xrange(0, len(data), chunk_size):
+            yield data[offset:offset + chunk_size]
+    elif hasattr(data, 'read'):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in data:
+            if chunk:
+                yield chunk
+
+
+def iter_blocks(data, block_size):
+    """Iterate over data in blocks of exactly block_size bytes.
+
+    Only the last block may be shorter. Unlike iter_chunks(), the chunks of
+    an iterator are split or joined as needed.
+    """
+    pending = []
+    pending_size = 0
+    for chunk in iter_chunks(data, block_size):
+        pending.append(chunk)
+        pending_size += len(chunk)
+        if pending_size < block_size:
+            continue
+        buf = ''.join(pending)
+        offset = 0
+        while pending_size - offset >= block_size:
+            yield buf[offset:offset + block_size]
+            offset += block_size
+        pending = [buf[offset:]] if offset < pending_size else []
+        pending_size -= offset
+    if pending_size:
+        yield ''.join(pending)
+
+
+def _map_file(data):
+    """Return a read-only map of a regular file and the file position.
+
+    (None, 0) is returned for anything that can't be mapped, e.g. pipes,
+    sockets, file-like objects without a descriptor or empty files.
+    """
+    try:
+        fileno = data.fileno()
+        position = data.tell()
+        st = os.fstat(fileno)
+        if not stat.S_ISREG(st.st_mode) or st.st_size <= position:
+            return None, 0
+        return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ), position
+    except (AttributeError, IOError, OSError, ValueError, mmap.error):
+        return None, 0
+
+
+def iter_buffers(data, chunk_size=CHUNKSIZE):
+    """Like iter_chunks() but without copying the data where possible.
+
+    Byte strings and memory maps are sliced with buffer(), and regular
+    files are memory mapped and sliced the same way, so no chunk is ever
+    copied in Python. Other file-like objects and iterators are read as by
+    iter_chunks().
+    """
+    if isinstance(data, (str, mmap.mmap)):
+        for offset in xrange(0, len(data), chunk_size):
+            yield buffer(data, offset, chunk_size)
+        return
+    mapped, position = _map_file(data)
+    if mapped is None:
+        for chunk in iter_chunks(data, chunk_size):
+            yield chunk
+        return
+    try:
+        for offset in xrange(position, len(mapped), chunk_size):
+            yield buffer(mapped, offset, chunk_size)
+        # Leave the file where reading it would have left it
+        data.seek(len(mapped))
+    finally:
+        mapped.close()
+
+
+def send_body(conn, data, chunked, chunk_size=CHUNKSIZE, on_chunk=None):
+    """Send data on an httplib connection, optionally chunked.
+
+    The chunk framing is written separately from the payload, which is
+    passed to the socket as is, so chunks are never concatenated or
+    copied. on_chunk is called with every chunk before it is sent.
+    """
+    framing = ''
+    for chunk in iter_buffers(data, chunk_size):
+        if not len(chunk):
+            continue
+        if on_chunk is not None:
+            on_chunk(chunk)
+        if chunked:
+            # The CRLF ending the previous chunk goes with this header
+            conn.send('%s%x\r\n' % (framing, len(chunk)))
+            framing = '\r\n'
+        conn.send(chunk)
+    if chunked:
+        conn.send('%s0\r\n\r\n' % framing)
+
+
+def disable_nagle(conn):
+    """Send the small framing writes of a connection without delay."""
+    try:
+        conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (AttributeError, socket.error):
+        pass
+
+
+class StreamingBody(object):
+
+    """Iterator over the chunks of a response body.
+
+    The MD5 and the length of what has been read so far are available as
+    hexdigest() and bytes_read. Once the body has been read entirely, the
+    connection is passed to release, if given, for the next requests; it is
+    closed if close() is called before.
+    """
+
+    def __init__(self, conn, resp, chunk_size=CHUNKSIZE, release=None):
+        self.conn = conn
+        self.resp = resp
+        self.chunk_size = chunk_size
+        self.release = release
+        self.bytes_read = 0
+        self._md5 = hashlib.md5()
+
+    def __iter__(self):
+        try:
+            while True:
+                chunk = self.resp.read(self.chunk_size)
+                if not chunk:
+                    break
+                self._md5.update(chunk)
+                self.bytes_read += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def read(self):
+        """Read the whole remaining body into a string."""
+        return ''.join(self)
+
+    def write_to(self, dest):
+        """Write the remaining body into the file-like object dest."""
+        for chunk in self:
+            dest.write(chunk)
+        return self.bytes_read
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+    def close(self):
+        if self.conn is None:
+            return
+        conn, self.conn = self.conn, None
+        # NOTE: a response is closed once it has been read to its end
+        if (self.release is not None and self.resp.isclosed() and
+                not self.resp.will_close):
+            self.release(conn)
+        else:
+            conn.close()
+
+
+class Upload(object):
+
+    """Keeps track of the MD5 and the length of the data sent."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bytes_sent = 0
+        self._md5 = hashlib.md5()
+
+    def update(self, chunk):
+        self._md5.update(chunk)
+        self.bytes_sent += len(chunk)
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+    def verify(self, name, checksum, size):
+        """Check the checksum and size the server found for the data sent.
+
+        :raises ChecksumMismatch: if checksum isn't the MD5 of the data
+        :raises SizeMismatch: if size isn't the number of bytes sent
+        """
+        if checksum != self.hexdigest():
+            raise exceptions.ChecksumMismatch(
+                name=name, actual=checksum, expected=self.hexdigest())
+        if int(size) != self.bytes_sent:
+            raise exceptions.SizeMismatch(
+                name=name, actual=size, expected=self.bytes_sent)
+
+
+def _send_request(conn, method, path, headers, body, chunked, chunk_size,
+                  upload):
+    if conn.sock is None:
+        conn.connect()
+        disable_nagle(conn)
+    conn.putrequest(method, path, skip_accept_encoding=True)
+    for header, value in headers.items():
+        conn.putheader(header, value)
+    conn.endheaders()
+    send_body(conn, body, chunked, chunk_size, upload.update)
+
+
+def request(url, method, headers=None, body=None, content_length=None,
+            chunk_size=CHUNKSIZE, timeout=None,
+            disable_ssl_certificate_validation=False, ca_certs=None):
+    """Send a request and return its response with a streaming body.
+
+    The connection is taken from the connection pool, and given back once
+    the response body has been read.
+
+    :param body: a string, a file-like object, an iterator of strings or
+                 None
+    :param content_length: length of body. If it is not given and cannot
+                           be found out without reading body, body is sent
+                           with chunked transfer encoding.
+    :param disable_ssl_certificate_validation: as for httplib2.Http
+    :param ca_certs: as for httplib2.Http
+    :returns: (an httplib2.Response, a StreamingBody, the Upload with the
+              MD5 and the length of the data sent)
+    """
+    headers = dict(headers or {})
+    if content_length is None:
+        content_length = body_length(body)
+    if content_length is None:
+        headers['Transfer-Encoding'] = 'chunked'
+    else:
+        headers['Content-Length'] = str(content_length)
+
+    parts = urlparse.urlparse(url)
+    path = parts.path
+    if parts.query:
+        path += '?' + parts.query
+    chunked = content_length is None
+    pool = connection_pool.get_pool()
+    key = pool.make_key(url, disable_ssl_certificate_validation, ca_certs,
+                        timeout)
+    conn, reused = pool.checkout_connection(key)
+    upload = Upload()
+    try:
+        try:
+            _send_request(conn, method, path, headers, body, chunked,
+                          chunk_size, upload)
+            resp = conn.getresponse()
+        except (socket.error, httplib.BadStatusLine):
+            # NOTE: the server may have closed a connection while it was
+            # idle. The request is sent again on a new one, unless its body
+            # was read from a file or an iterator.
+            conn.close()
+            if not reused or not (body is None or
+                                  isinstance(body, basestring)):
+                raise
+            conn = connection_pool.make_connection(key)
+            upload.reset()
+            _send_request(conn, method, path, headers, body, chunked,
+                          chunk_size, upload)
+            resp = conn.getresponse()
+    except socket.gaierror as e:
+        conn.close()
+        message = "Error finding address for %s: %s" % (url, e)
+        raise exceptions.EndpointNotFound(message)
+    except (socket.error, socket.timeout) as e:
+        conn.close()
+        message = "Error communicating with %s: %s" % (url, e)
+        raise exceptions.TimeoutException(message)
+    except Exception:
+        conn.close()
+        raise
+    resp_body = StreamingBody(conn, resp, chunk_size,
+                              lambda conn: pool.checkin_connection(key, conn))
+    return httplib2.Response(resp), resp_body, upload
@@ -0,0 +1,160 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Concurrent deletion of test fixtures.
+
+Resources are added to a TeardownGraph together with the resources that
+must be gone before they can be deleted, e.g. a volume requires its
+snapshots. run() deletes the graph in waves: every resource whose
+requirements are deleted is deleted concurrently by a bounded pool of
+threads, then the wave is awaited, in bulk where a BulkWait is given.
+"""
+
+import logging
+
+from tempest.common import concurrency
+from tempest import config
+
+LOG = logging.getLogger(__name__)
+
+
+def is_not_found(exc):
+    # NOTE: the tempest clients and the official clients all raise an
+    # exception class called NotFound for a missing resource.
+    return exc.__class__.__name__ == 'NotFound'
+
+
+class BulkWait(object):
+
+    """Waits for the deletion of several resources with a single call.
+
+    :param wait_all: callable taking a list of resource ids and returning
+                     once all of them are deleted
+    """
+
+    def __init__(self, wait_all):
+        self.wait_all = wait_all
+
+
+class _Node(object):
+
+    def __init__(self, key, delete, wait, requires, resource_id):
+        self.key = key
+        self.delete = delete
+        self.wait = wait
+        self.requires = set(requires)
+        self.resource_id = resource_id
+
+
+class TeardownGraph(object):
+
+    """Resources to delete and the order constraints between them."""
+
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = config.TempestConfig().teardown.workers
+        self.workers = max(1, workers)
+        self._nodes = {}
+        self._order = []
+
+    def add(self, key, delete, wait=None, requires=(), resource_id=None):
+        """Add a resource to delete.
+
+        :param key: hashable identifying the resource in the graph
+        :param delete: zero argument callable deleting the resource
+        :param wait: zero argument callable returning once the resource is
+                     gone, or a BulkWait shared by resources of a kind
+        :param requires: keys of the resources to delete first
+        :param resource_id: id passed to a BulkWait, defaults to key
+        """
+        if key not in self._nodes:
+            self._order.append(key)
+        if resource_id is None:
+            resource_id = key
+        self._nodes[key] = _Node(key, delete, wait, requires, resource_id)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def keys(self):
+        """Return the keys of the resources added so far, in order."""
+        return list(self._order)
+
+    def waves(self):
+        """Return the nodes as a list of waves of independent nodes."""
+        done = set()
+        remaining = list(self._order)
+        waves = []
+        while remaining:
+            wave = [key for key in remaining
+                    if not (self._nodes[key].requires & set(remaining))]
+            if not wave:
+                LOG.warning("Dependency cycle between %s, deleting them "
+                            "together", remaining)
+                wave = remaining
+            done.update(wave)
+            remaining = [key for key in remaining if key not in done]
+            waves.append([self._nodes[key] for key in wave])
+        return waves
+
+    def run(self):
+        """Delete everything and return a list of (key, exc_info) failures.
+
+        A failure does not stop the teardown: the resources depending on
+        a failed one are still tried, as their deletion may well succeed.
+        """
+        failures = []
+        for wave in self.waves():
+            errors = concurrency.run_concurrently(
+                [node.delete for node in wave], self.workers)
+            deleted = []
+            for node, exc_info in zip(wave, errors):
+                if exc_info is None:
+                    deleted.append(node)
+                elif not is_not_found(exc_info[1]):
+                    LOG.warning("Failed to delete %s: %s", node.key,
+                                exc_info[1])
+                    failures.append((node.key, exc_info))
+            failures.extend(self._wait(deleted))
+        return failures
+
+    def _wait(self, nodes):
+        tasks = []
+        owners = []
+        bulk = {}
+        for node in nodes:
+            if isinstance(node.wait, BulkWait):
+                bulk.setdefault(node.wait, []).append(node)
+            elif node.wait is not None:
+                tasks.append(node.wait)
+                owners.append([node])
+        for wait, group in bulk.items():
+            ids = [node.resource_id for node in group]
+            tasks.append(lambda wait=wait, ids=ids: wait.wait_all(ids))
+            owners.append(group)
+
+        failures = []
+        errors = concurrency.run_concurrently(tasks, self.workers)
+        for group, exc_info in zip(owners, errors):
+            if exc_info is None:
+                continue
+            for node in group:
+                LOG.warning("Failed waiting for the deletion of %s: %s",
+                            node.key, exc_info[1])
+                failures.append((node.key, exc_info))
+        return failures
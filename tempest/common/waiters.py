@@ -0,0 +1,280 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Polling waiters shared by the service clients and the tests.
+
+Every wait polls a status getter with an exponential backoff: the first
+check after ``initial_interval`` seconds, each following one ``factor``
+times later, capped at the interval the caller asked for, with +/-
+``jitter`` randomisation so that parallel workers don't poll in lock step.
+A wait ends when the status is ready, when it is a failure state (fail
+fast) or at the deadline.
+
+wait_for_each() tracks a set of resources through a single list call per
+poll instead of one GET per resource, optionally narrowed to the resources
+updated since the previous poll.
+
+Each finished wait is reported to the registered listeners as a dict with
+the keys name, start, end, elapsed, polls, outcome ('ready', 'failed',
+'timeout' or 'error') and status.
+"""
+
+import logging
+import random
+import time
+
+from tempest import config
+from tempest import exceptions
+
+LOG = logging.getLogger(__name__)
+
+# Returned by a status getter once the resource does not exist any more
+DELETED = 'DELETED'
+
+_listeners = []
+
+
+def add_listener(listener):
+    """Register a callable receiving a dict for every finished wait."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+
+def _emit(event):
+    LOG.debug("Wait for %(name)s: %(outcome)s after %(elapsed).1f s and "
+              "%(polls)d poll(s), last status %(status)s", event)
+    for listener in _listeners:
+        try:
+            listener(event)
+        except Exception:
+            LOG.exception("Wait event listener %r failed", listener)
+
+
+class Backoff(object):
+
+    """Iterator over the sleep times of an exponential backoff."""
+
+    def __init__(self, initial, maximum, factor=2.0, jitter=0.0):
+        self.initial = min(initial, maximum)
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+
+    def __iter__(self):
+        delay = self.initial
+        while True:
+            spread = delay * self.jitter
+            yield max(0, delay + random.uniform(-spread, spread))
+            delay = min(delay * self.factor, self.maximum)
+
+
+def _as_predicate(ready):
+    if callable(ready):
+        return ready
+    if isinstance(ready, (set, frozenset, list, tuple)):
+        return lambda status: status in ready
+    return lambda status: status == ready
+
+
+def _default_backoff(interval):
+    conf = config.TempestConfig().waiter
+    return Backoff(conf.initial_interval, interval, conf.backoff_factor,
+                   conf.jitter)
+
+
+def wait_for(get_status, ready, timeout, interval, fail_states=(),
+             fail=None, on_timeout=None, name=None, backoff=None):
+    """Poll get_status() until it returns a ready status.
+
+    :param get_status: zero argument callable returning the current status
+    :param ready: the status to wait for, a collection of them, or a
+                  callable taking the status and returning True when done
+    :param timeout: deadline in seconds
+    :param interval: the longest time to sleep between two polls
+    :param fail_states: statuses on which the wait stops immediately
+    :param fail: callable taking the failed status and returning the
+                 exception to raise, defaults to a StatusErrorException
+    :param on_timeout: callable taking the last status and the elapsed time
+                       and returning the exception to raise. If it returns
+                       None, the last status is returned instead.
+    :param name: description of the wait used in logs and events
+    :param backoff: a Backoff, by default built from the [waiter] options
+    :returns: the last status
+    """
+    is_ready = _as_predicate(ready)
+    delays = iter(backoff or _default_backoff(interval))
+    name = name or getattr(get_status, '__name__', 'status')
+    start = time.time()
+    event = {'name': name, 'start': start, 'polls': 0, 'status': None}
+
+    def finish(outcome):
+        event['end'] = time.time()
+        event['elapsed'] = event['end'] - start
+        event['outcome'] = outcome
+        _emit(event)
+
+    while True:
+        old_status = event['status']
+        try:
+            status = get_status()
+        except Exception:
+            finish('error')
+            raise
+        event['polls'] += 1
+        event['status'] = status
+        elapsed = time.time() - start
+        if event['polls'] > 1 and status != old_status:
+            LOG.info('%s: status transition "%s" ==> "%s" in %d second(s)',
+                     name, old_status, status, elapsed)
+        if is_ready(status):
+            finish('ready')
+            return status
+        if status in fail_states:
+            finish('failed')
+            if fail is not None:
+                raise fail(status)
+            raise exceptions.StatusErrorException(name=name, status=status)
+        remaining = timeout - elapsed
+        if remaining <= 0:
+            finish('timeout')
+            if on_timeout is None:
+                raise exceptions.TimeoutException(
+                    "%s did not finish within %d s, last status %s" %
+                    (name, timeout, status))
+            error = on_timeout(status, elapsed)
+            if error is None:
+                return status
+            raise error
+        time.sleep(min(next(delays), remaining))
+
+
+def not_found_as_deleted(get_status):
+    """Wrap a status getter so that a NotFound reads as DELETED."""
+    def _get_status():
+        try:
+            return get_status()
+        except exceptions.NotFound:
+            return DELETED
+    return _get_status
+
+
+def wait_for_each(list_resources, ids, ready, timeout, interval,
+                  fail_states=(), fail=None, on_timeout=None, name=None,
+                  backoff=None, incremental=False):
+    """Poll a list call until every resource in ids is ready.
+
+    This is a generator yielding an (id, resource) pair as soon as each
+    resource reaches a ready status, so callers can start using the first
+    ones while the others are still building. A resource missing from a
+    full listing is reported with the status DELETED and resource None.
+
+    :param list_resources: callable taking a changes-since value (None for
+                           a full listing) and returning a list of resource
+                           dicts with 'id' and 'status' keys
+    :param ids: the resource ids to wait for
+    :param ready: as for wait_for()
+    :param timeout: deadline in seconds for the whole set
+    :param interval: the longest time to sleep between two polls
+    :param fail_states: statuses on which the wait stops immediately
+    :param fail: callable taking the failed id and status and returning
+                 the exception to raise
+    :param on_timeout: callable taking a dict of the pending ids to their
+                       last status and the elapsed time, and returning the
+                       exception to raise
+    :param name: description of the wait used in logs and events
+    :param backoff: a Backoff, by default built from the [waiter] options
+    :param incremental: after the first poll, only ask for the resources
+                        updated since the newest 'updated' time seen. Only
+                        for APIs supporting the changes-since filter.
+    """
+    is_ready = _as_predicate(ready)
+    delays = iter(backoff or _default_backoff(interval))
+    pending = dict((resource_id, None) for resource_id in ids)
+    name = name or '%d resource(s)' % len(pending)
+    start = time.time()
+    event = {'name': name, 'start': start, 'polls': 0, 'status': pending}
+    since = None
+
+    def finish(outcome):
+        event['end'] = time.time()
+        event['elapsed'] = event['end'] - start
+        event['outcome'] = outcome
+        _emit(event)
+
+    while pending:
+        full = since is None or not incremental
+        try:
+            resources = list_resources(None if full else since)
+        except Exception:
+            finish('error')
+            raise
+        event['polls'] += 1
+        elapsed = time.time() - start
+        found = {}
+        for resource in resources:
+            found[resource['id']] = resource
+            # NOTE: 'updated' is an ISO 8601 time set by the server, so
+            # the client clock does not matter.
+            updated = resource.get('updated')
+            if updated and (since is None or updated > since):
+                since = updated
+        if full:
+            for resource_id in pending:
+                found.setdefault(resource_id, None)
+        for resource_id in pending.keys():
+            if resource_id not in found:
+                # Unchanged since the previous poll
+                continue
+            resource = found[resource_id]
+            status = DELETED if resource is None else resource['status']
+            old_status = pending[resource_id]
+            pending[resource_id] = status
+            if old_status is not None and status != old_status:
+                LOG.info('%s: %s status transition "%s" ==> "%s" in %d '
+                         'second(s)', name, resource_id, old_status, status,
+                         elapsed)
+            if is_ready(status):
+                del pending[resource_id]
+                yield resource_id, resource
+            elif status in fail_states:
+                finish('failed')
+                if fail is not None:
+                    raise fail(resource_id, status)
+                raise exceptions.StatusErrorException(
+                    name='%s %s' % (name, resource_id), status=status)
+        if not pending:
+            break
+        remaining = timeout - (time.time() - start)
+        if remaining <= 0:
+            finish('timeout')
+            if on_timeout is not None:
+                raise on_timeout(dict(pending), elapsed)
+            raise exceptions.TimeoutException(
+                "%s did not finish within %d s, still waiting for %s" %
+                (name, timeout, ', '.join('%s (%s)' % item
+                                          for item in pending.items())))
+        time.sleep(min(next(delays), remaining))
+    finish('ready')
+
+
+def wait_for_all(*args, **kwargs):
+    """Like wait_for_each() but return a dict of every ready resource."""
+    return dict(wait_for_each(*args, **kwargs))
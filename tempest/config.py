@@ -79,6 +79,11 @@ IdentityGroup = [
                default='pass',
                help="API key to use when authenticating as admin.",
                secret=True),
+    cfg.IntOpt('token_refresh_margin',
+               default=300,
+               help="Time in seconds before a cached token expires at which "
+                    "it is refreshed in the background. 0 disables "
+                    "proactive refresh."),
 ]
 
 
@@ -254,7 +259,41 @@ ImageGroup = [
     cfg.StrOpt('http_image',
                default='http://download.cirros-cloud.net/0.3.1/'
                'cirros-0.3.1-x86_64-uec.tar.gz',
-               help='http accessable image')
+               help='http accessable image'),
+    cfg.IntOpt('transfer_chunk_size',
+               default=10485760,
+               help="Size in bytes of the ranges image data is downloaded "
+                    "in by the ranged image calls."),
+    cfg.IntOpt('transfer_workers',
+               default=4,
+               help="Number of ranges of an image downloaded "
+                    "concurrently."),
+    cfg.IntOpt('upload_chunk_size',
+               default=65536,
+               help="Size in bytes of the chunks in which image data is "
+                    "sent."),
+    cfg.IntOpt('schema_cache_ttl',
+               default=3600,
+               help="Seconds an image API schema is reused before it is "
+                    "downloaded again."),
+    cfg.StrOpt('schema_cache_dir',
+               default=None,
+               help="Directory in which downloaded image API schemas are "
+                    "kept, to share them between processes and runs."),
+    cfg.FloatOpt('schema_validation_rate',
+                 default=1.0,
+                 help="Fraction of the image API responses validated "
+                      "against their schema. Lower it for high-volume "
+                      "benchmarks."),
+    cfg.BoolOpt('reuse_fixture_images',
+                default=True,
+                help="Share the images holding the same data and metadata "
+                     "between the image tests that only read them."),
+    cfg.BoolOpt('keep_fixture_images',
+                default=False,
+                help="Keep the shared fixture images at the end of a run, "
+                     "so that the next runs keeping them reuse them. Runs "
+                     "that don't only use images of their own."),
 ]
 
 
@@ -347,6 +386,18 @@ ObjectStoreConfig = [
                default=5,
                help="Number of seconds to wait while looping to check the"
                     "status of a container to container synchronization"),
+    cfg.IntOpt('stream_chunk_size',
+               default=65536,
+               help="Size in bytes of the chunks in which object data is "
+                    "sent and received by the streaming object calls."),
+    cfg.IntOpt('segment_size',
+               default=10485760,
+               help="Size in bytes of the segments large objects are split "
+                    "into."),
+    cfg.IntOpt('transfer_workers',
+               default=4,
+               help="Number of segments of a large object transferred "
+                    "concurrently."),
 ]
 
 
@@ -476,7 +527,50 @@ StressGroup = [
                help='regexp for list of log files.'),
     cfg.StrOpt('log_check_interval',
                default=60,
-               help='time between log file error checks.')
+               help='time between log file error checks.'),
+    cfg.IntOpt('metrics_interval',
+               default=10,
+               help="Seconds between two snapshots of the action metrics."),
+    cfg.IntOpt('metrics_window',
+               default=60,
+               help="Seconds of the rolling window the ops/s, error rate "
+                    "and latency percentiles of snapshots cover."),
+    cfg.IntOpt('stop_timeout',
+               default=10,
+               help="Seconds workers are given to finish their current "
+                    "step at the end of a run before being terminated."),
+    cfg.IntOpt('max_backlog',
+               default=100,
+               help="Number of invocations of an open-loop action waiting "
+                    "for a worker beyond which new arrivals are dropped."),
+    cfg.StrOpt('engine',
+               default='thread',
+               help="How the users of a worker process run when a test "
+                    "has several per worker: 'thread' or 'eventlet'."),
+    cfg.IntOpt('agent_timeout',
+               default=300,
+               help="Seconds the coordinator of a distributed stress run "
+                    "waits for an agent to answer before giving up on it."),
+    cfg.StrOpt('agent_token',
+               default=None,
+               secret=True,
+               help="Secret shared by the coordinator of a distributed "
+                    "stress run and its agents, which only run the tests "
+                    "of coordinators sending it."),
+    cfg.FloatOpt('knee_error_rate',
+                 default=0.05,
+                 help="Error rate of a step beyond which the load level of "
+                      "a load profile is deemed saturating."),
+    cfg.FloatOpt('knee_p95_ms',
+                 default=None,
+                 help="p95 latency of a step, in milliseconds, beyond which "
+                      "the load level of a load profile is deemed "
+                      "saturating."),
+    cfg.FloatOpt('knee_latency_factor',
+                 default=3.0,
+                 help="Factor by which the p95 latency of a step must grow "
+                      "from the lowest load level of a load profile for a "
+                      "level to be deemed saturating."),
 ]
 
 
@@ -486,6 +580,117 @@ def register_stress_opts(conf):
         conf.register_opt(opt, group='stress')
 
 
+http_group = cfg.OptGroup(name='http', title='HTTP Client Options')
+
+HttpGroup = [
+    cfg.IntOpt('pool_maxsize',
+               default=10,
+               help="Maximum number of pooled connections kept per "
+                    "endpoint (scheme, host, port and TLS options)."),
+    cfg.IntOpt('pool_idle_timeout',
+               default=60,
+               help="Time in seconds after which an idle pooled connection "
+                    "is closed."),
+    cfg.IntOpt('pool_timeout',
+               default=60,
+               help="Time in seconds a request waits for a pooled "
+                    "connection when pool_maxsize of them are in use."),
+]
+
+
+def register_http_opts(conf):
+    conf.register_group(http_group)
+    for opt in HttpGroup:
+        conf.register_opt(opt, group='http')
+
+
+waiter_group = cfg.OptGroup(name='waiter', title='Status Waiter Options')
+
+WaiterGroup = [
+    cfg.FloatOpt('initial_interval',
+                 default=1.0,
+                 help="Time in seconds before the first status re-check. "
+                      "The interval grows up to the build_interval of the "
+                      "service."),
+    cfg.FloatOpt('backoff_factor',
+                 default=2.0,
+                 help="Factor by which the interval between status checks "
+                      "grows."),
+    cfg.FloatOpt('jitter',
+                 default=0.1,
+                 help="Relative random variation applied to every interval "
+                      "between status checks."),
+]
+
+
+def register_waiter_opts(conf):
+    conf.register_group(waiter_group)
+    for opt in WaiterGroup:
+        conf.register_opt(opt, group='waiter')
+
+
+teardown_group = cfg.OptGroup(name='teardown', title='Teardown Options')
+
+TeardownGroup = [
+    cfg.IntOpt('workers',
+               default=8,
+               help="Maximum number of resources deleted concurrently when "
+                    "a test class tears down its fixtures."),
+]
+
+
+def register_teardown_opts(conf):
+    conf.register_group(teardown_group)
+    for opt in TeardownGroup:
+        conf.register_opt(opt, group='teardown')
+
+
+metrics_group = cfg.OptGroup(name='metrics', title='Request Metrics Options')
+
+MetricsGroup = [
+    cfg.BoolOpt('enabled',
+                default=True,
+                help="Record the latency, connect time and body sizes of "
+                     "every API request."),
+    cfg.StrOpt('export_path',
+               default='',
+               help="File the request metrics are written to when the "
+                    "process exits. %(pid)s is replaced by the process id. "
+                    "Empty to not export them."),
+    cfg.StrOpt('export_format',
+               default='json',
+               help="Format of the exported metrics, json or prometheus."),
+]
+
+
+def register_metrics_opts(conf):
+    conf.register_group(metrics_group)
+    for opt in MetricsGroup:
+        conf.register_opt(opt, group='metrics')
+
+
+debug_group = cfg.OptGroup(name='debug', title='Debug Options')
+
+DebugGroup = [
+    cfg.IntOpt('log_body_limit',
+               default=2048,
+               help="Maximum number of bytes of a request or response body "
+                    "written to the debug log."),
+    cfg.IntOpt('request_log_buffer',
+               default=0,
+               help="If positive, the debug records of the API requests "
+                    "are kept in a ring buffer of this many records instead "
+                    "of being logged, and only attached to the results of "
+                    "the tests which fail."),
+]
+
+
+def register_debug_opts(conf):
+    conf.register_group(debug_group)
+    for opt in DebugGroup:
+        conf.register_opt(opt, group='debug')
+
+
 @singleton
 class TempestConfig:
     """Provides OpenStack configuration information."""
@@ -535,6 +740,11 @@ class TempestConfig:
         register_boto_opts(cfg.CONF)
         register_compute_admin_opts(cfg.CONF)
         register_stress_opts(cfg.CONF)
+        register_http_opts(cfg.CONF)
+        register_waiter_opts(cfg.CONF)
+        register_teardown_opts(cfg.CONF)
+        register_metrics_opts(cfg.CONF)
+        register_debug_opts(cfg.CONF)
         self.compute = cfg.CONF.compute
         self.whitebox = cfg.CONF.whitebox
         self.identity = cfg.CONF.identity
@@ -546,6 +756,11 @@ class TempestConfig:
         self.boto = cfg.CONF.boto
         self.compute_admin = cfg.CONF['compute-admin']
         self.stress = cfg.CONF.stress
+        self.http = cfg.CONF.http
+        self.waiter = cfg.CONF.waiter
+        self.teardown = cfg.CONF.teardown
+        self.metrics = cfg.CONF.metrics
+        self.debug = cfg.CONF.debug
         if not self.compute_admin.username:
             self.compute_admin.username = self.identity.admin_username
             self.compute_admin.password = self.identity.admin_password
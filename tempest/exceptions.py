@@ -90,6 +90,18 @@ class SnapshotBuildErrorException(TempestException):
     message = "Snapshot %(snapshot_id)s failed to build and is in ERROR status"
 
 
+class StatusErrorException(TempestException):
+    message = "%(name)s went to failure status %(status)s"
+
+
+class ChecksumMismatch(TempestException):
+    message = "Checksum of %(name)s is %(actual)s, expected %(expected)s"
+
+
+class SizeMismatch(TempestException):
+    message = "Size of %(name)s is %(actual)s, expected %(expected)s"
+
+
 class StackBuildErrorException(TempestException):
     message = ("Stack %(stack_identifier)s is in %(stack_status)s status "
                "due to '%(stack_status_reason)s'")
@@ -160,6 +172,15 @@ class TearDownException(TempestException):
     message = "%(num)d cleanUp operation failed"
 
 
+class StressAgentError(TempestException):
+    message = "Stress agent %(agent)s failed: %(reason)s"
+
+
+class ConnectionPoolTimeout(TimeoutException):
+    message = ("No pooled connection to %(endpoint)s freed up in %(timeout)s "
+               "seconds, %(in_use)d in use")
+
+
 class RFCViolation(RestClientException):
     message = "RFC Violation"
 
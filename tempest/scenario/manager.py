@@ -16,8 +16,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import logging
 import subprocess
+import threading
 
 # Default client libs
 import glanceclient
@@ -33,6 +35,7 @@ except ImportError:
     pass
 
 from tempest.api.network import common as net_common
+from tempest.common import teardown
 from tempest.common.utils.data_utils import rand_name
 from tempest import exceptions
 import tempest.manager
@@ -171,45 +174,93 @@ class OfficialClientTest(tempest.test.TestCase):
 
     manager_class = OfficialClientManager
 
+    # Teardown order of the resource types: the resources of a tier are
+    # deleted concurrently once all those of the previous tiers are gone.
+    # Types not listed here are deleted with the ports, after the servers
+    # that may be using them.
+    teardown_tiers = (
+        ('DeletableFloatingIp',),
+        ('Server', 'Snapshot'),
+        ('DeletablePort',),
+        ('DeletableSubnet',),
+        ('DeletableRouter',),
+        ('DeletableNetwork',),
+    )
+
+    @classmethod
+    def _teardown_tier(cls, thing):
+        name = thing.__class__.__name__
+        for tier, names in enumerate(cls.teardown_tiers):
+            if name in names:
+                return tier
+        return 2
+
     @classmethod
     def tearDownClass(cls):
         # NOTE(jaypipes): Because scenario tests are typically run in a
         # specific order, and because test methods in scenario tests
         # generally create resources in a particular order, we destroy
         # resources in the reverse order in which resources are added to
-        # the scenario test class object
+        # the scenario test class object. Resources of the same type do
+        # not depend on each other and are deleted concurrently.
+        things = {}
         while cls.os_resources:
             thing = cls.os_resources.pop()
-            LOG.debug("Deleting %r from shared resources of %s" %
-                      (thing, cls.__name__))
+            key = (thing.__class__.__name__, getattr(thing, 'id', id(thing)))
+            # A resource may have been added twice, e.g. a server is added
+            # again once it is active
+            things.setdefault(key, thing)
+
+        graph = teardown.TeardownGraph()
+        tiers = dict((key, cls._teardown_tier(thing))
+                     for key, thing in things.items())
+        # NOTE: the quantum client shares a single httplib2.Http, which is
+        # not thread safe, so its calls are serialized.
+        locks = {}
+        for key, thing in things.items():
+            lock = None
+            if isinstance(thing, net_common.DeletableResource):
+                lock = locks.setdefault(id(thing.client), threading.Lock())
+            graph.add(key,
+                      functools.partial(cls._delete_resource, thing, lock),
+                      wait=functools.partial(cls._wait_for_deletion, thing),
+                      requires=[k for k, tier in tiers.items()
+                                if tier < tiers[key]])
+        failures = graph.run()
+        if failures:
+            exc_info = failures[0][1]
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    @staticmethod
+    def _delete_resource(thing, lock=None):
+        LOG.debug("Deleting %r from shared resources" % thing)
+        # OpenStack resources are assumed to have a delete()
+        # method which destroys the resource...
+        if lock is None:
+            thing.delete()
+        else:
+            with lock:
+                thing.delete()
 
+    @staticmethod
+    def _wait_for_deletion(thing):
+        def is_deletion_complete():
+            # Deletion testing is only required for objects whose
+            # existence cannot be checked via retrieval.
+            if isinstance(thing, dict):
+                return True
             try:
-                # OpenStack resources are assumed to have a delete()
-                # method which destroys the resource...
-                thing.delete()
+                thing.get()
             except Exception as e:
-                # If the resource is already missing, mission accomplished.
+                # Clients are expected to return an exception
+                # called 'NotFound' if retrieval fails.
                 if e.__class__.__name__ == 'NotFound':
-                    continue
-                raise
-
-            def is_deletion_complete():
-                # Deletion testing is only required for objects whose
-                # existence cannot be checked via retrieval.
-                if isinstance(thing, dict):
                     return True
-                try:
-                    thing.get()
-                except Exception as e:
-                    # Clients are expected to return an exception
-                    # called 'NotFound' if retrieval fails.
-                    if e.__class__.__name__ == 'NotFound':
-                        return True
-                    raise
-                return False
+                raise
+            return False
 
-            # Block until resource deletion has completed or timed-out
-            tempest.test.call_until_true(is_deletion_complete, 10, 1)
+        # Block until resource deletion has completed or timed-out
+        tempest.test.call_until_true(is_deletion_complete, 10, 1)
 
 
 class NetworkScenarioTest(OfficialClientTest):
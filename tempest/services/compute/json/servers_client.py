@@ -17,10 +17,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -150,44 +150,68 @@ class ServersClientJSON(RestClient):
 
     def wait_for_server_status(self, server_id, status):
         """Waits for a server to reach a given status."""
-        resp, body = self.get_server(server_id)
-        server_status = body['status']
-        start = int(time.time())
 
-        while(server_status != status):
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get_server(server_id)
-            server_status = body['status']
-
-            if server_status == 'ERROR':
-                raise exceptions.BuildErrorException(server_id=server_id)
-
-            timed_out = int(time.time()) - start >= self.build_timeout
+            return body['status']
+
+        def on_timeout(server_status, elapsed):
+            message = ('Server %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (server_id, status, self.build_timeout))
+            message += ' Current status: %s.' % server_status
+            return exceptions.TimeoutException(message)
+
+        waiters.wait_for(get_status, status, self.build_timeout,
+                         self.build_interval, fail_states=('ERROR',),
+                         fail=lambda _: exceptions.BuildErrorException(
+                             server_id=server_id),
+                         on_timeout=on_timeout,
+                         name='server %s status %s' % (server_id, status))
+
+    def wait_for_servers_status(self, server_ids, status, ignore_error=False):
+        """Waits for several servers to reach a given status.
+
+        All the servers are polled together through servers/detail, only
+        asking for the ones changed since the previous poll. Returns a dict
+        of the server ids to their details. Wait for the status DELETED to
+        wait for the termination of the servers.
+        """
 
-            if server_status != status and timed_out:
-                message = ('Server %s failed to reach %s status within the '
-                           'required time (%s s).' %
-                           (server_id, status, self.build_timeout))
-                message += ' Current status: %s.' % server_status
-                raise exceptions.TimeoutException(message)
+        def list_servers(since):
+            params = {'changes-since': since} if since else None
+            resp, body = self.list_servers_with_detail(params)
+            return body['servers']
+
+        def on_timeout(pending, elapsed):
+            message = ('Servers %s failed to reach %s status within the '
+                       'required time (%s s).' %
+                       (', '.join(pending), status, self.build_timeout))
+            return exceptions.TimeoutException(message)
+
+        fail_states = () if ignore_error else ('ERROR',)
+        return waiters.wait_for_all(
+            list_servers, server_ids, status, self.build_timeout,
+            self.build_interval, fail_states=fail_states,
+            fail=lambda server_id, _: exceptions.BuildErrorException(
+                server_id=server_id),
+            on_timeout=on_timeout, name='servers status %s' % status,
+            incremental=True)
 
     def wait_for_server_termination(self, server_id, ignore_error=False):
         """Waits for server to reach termination."""
-        start_time = int(time.time())
-        while True:
-            try:
-                resp, body = self.get_server(server_id)
-            except exceptions.NotFound:
-                return
 
-            server_status = body['status']
-            if server_status == 'ERROR' and not ignore_error:
-                raise exceptions.BuildErrorException(server_id=server_id)
-
-            if int(time.time()) - start_time >= self.build_timeout:
-                raise exceptions.TimeoutException
-
-            time.sleep(self.build_interval)
+        def get_status():
+            resp, body = self.get_server(server_id)
+            return body['status']
+
+        fail_states = () if ignore_error else ('ERROR',)
+        waiters.wait_for(waiters.not_found_as_deleted(get_status),
+                         waiters.DELETED, self.build_timeout,
+                         self.build_interval, fail_states=fail_states,
+                         fail=lambda _: exceptions.BuildErrorException(
+                             server_id=server_id),
+                         name='server %s termination' % server_id)
 
     def list_addresses(self, server_id):
         """Lists all addresses for a server."""
@@ -15,12 +15,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import time
 import urllib
 
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
@@ -142,29 +142,47 @@ class ImagesClientXML(RestClientXML):
         Waits until the HTTP response code for the request matches the
         expected value
         """
-        resp, body = self.get("images/%s" % str(image_id), self.headers)
-        start = int(time.time())
 
-        while resp.status != code:
-            time.sleep(self.build_interval)
+        def get_code():
             resp, body = self.get("images/%s" % str(image_id), self.headers)
+            return resp.status
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        waiters.wait_for(get_code, code, self.build_timeout,
+                         self.build_interval,
+                         name='image %s response %s' % (image_id, code))
 
     def wait_for_image_status(self, image_id, status):
         """Waits for an image to reach a given status."""
-        resp, image = self.get_image(image_id)
-        start = int(time.time())
 
-        while image['status'] != status:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, image = self.get_image(image_id)
-            if image['status'] == 'ERROR':
-                raise exceptions.AddImageException(image_id=image_id)
+            return image['status']
+
+        waiters.wait_for(get_status, status, self.build_timeout,
+                         self.build_interval, fail_states=('ERROR',),
+                         fail=lambda _: exceptions.AddImageException(
+                             image_id=image_id),
+                         name='image %s status %s' % (image_id, status))
+
+    def wait_for_images_status(self, image_ids, status):
+        """Waits for several images to reach a given status.
+
+        All the images are polled together through images/detail, only
+        asking for the ones changed since the previous poll. Returns a dict
+        of the image ids to their details.
+        """
 
-            if int(time.time()) - start >= self.build_timeout:
-                raise exceptions.TimeoutException
+        def list_images(since):
+            params = {'changes-since': since} if since else None
+            resp, images = self.list_images_with_detail(params)
+            return images
+
+        return waiters.wait_for_all(
+            list_images, image_ids, status, self.build_timeout,
+            self.build_interval, fail_states=('ERROR',),
+            fail=lambda image_id, _: exceptions.AddImageException(
+                image_id=image_id),
+            name='images status %s' % status, incremental=True)
 
     def _metadata_body(self, meta):
         post_body = Element('metadata')
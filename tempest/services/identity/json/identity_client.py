@@ -1,6 +1,6 @@
-import httplib2
 import json
 
+from tempest.common import connection_pool
 from tempest.common.rest_client import RestClient
 from tempest import exceptions
 
@@ -227,6 +227,9 @@ class TokenClientJSON(RestClient):
 
         self.auth_url = auth_url
         self.config = config
+        dscv = config.identity.disable_ssl_certificate_validation
+        self.http_obj = connection_pool.PooledHttp(
+            disable_ssl_certificate_validation=dscv)
 
     def auth(self, user, password, tenant):
         creds = {
@@ -245,8 +248,6 @@ class TokenClientJSON(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         if headers is None:
             headers = {}
 
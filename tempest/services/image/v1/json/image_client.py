@@ -20,11 +20,13 @@ import errno
 import json
 import logging
 import os
-import time
 import urllib
 
 from tempest.common import glance_http
+from tempest.common import ranged_download
 from tempest.common.rest_client import RestClient
+from tempest.common import streaming
+from tempest.common import waiters
 from tempest import exceptions
 
 LOG = logging.getLogger(__name__)
@@ -36,7 +38,15 @@ class ImageClientJSON(RestClient):
         super(ImageClientJSON, self).__init__(config, username, password,
                                               auth_url, tenant_name)
         self.service = self.config.images.catalog_type
-        self.http = self._get_http()
+        self._http = None
+
+    @property
+    def http(self):
+        # Built on first use so that constructing the client does not
+        # require authenticating against Keystone.
+        if self._http is None:
+            self._http = self._get_http()
+        return self._http
 
     def _image_meta_from_headers(self, headers):
         meta = {'properties': {}}
@@ -104,31 +114,48 @@ class ImageClientJSON(RestClient):
             return None
 
     def _get_http(self):
-        token, endpoint = self.keystone_auth(self.user,
-                                             self.password,
-                                             self.auth_url,
-                                             self.service,
-                                             self.tenant_name)
+        # The token comes from the shared token cache, so building the
+        # client does not authenticate again if any client already did.
+        # It is looked up again for every request, as by request().
+        self.get_auth()
+        endpoint = self.base_url
         dscv = self.config.identity.disable_ssl_certificate_validation
-        return glance_http.HTTPClient(endpoint=endpoint, token=token,
-                                      insecure=dscv)
+        reauthenticate = None
+        if self.reauth_on_unauthorized and self.strategy == 'keystone':
+            reauthenticate = self._reauthenticate
+        return glance_http.HTTPClient(
+            endpoint=endpoint, token=self._current_token,
+            reauthenticate=reauthenticate, insecure=dscv,
+            chunk_size=self.config.images.upload_chunk_size,
+            pool_maxsize=self.config.http.pool_maxsize,
+            pool_idle_timeout=self.config.http.pool_idle_timeout)
+
+    def _send_data(self, method, url, headers, data):
+        """Upload image data and check what Glance stored.
+
+        data may be a string, a file-like object such as a pipe, or an
+        iterator of strings; unless its size is known up front it is sent
+        with chunked transfer encoding. Its MD5 and size are computed while
+        it is sent and checked against the checksum and size of the image
+        Glance returns.
+        """
+        upload = streaming.Upload()
+        resp, body_iter = self.http.raw_request(method, url, headers=headers,
+                                                body=data, upload=upload)
+        self._error_checker(method, url, headers, data, resp, body_iter)
+        body = json.loads(''.join([c for c in body_iter]))
+        image = body['image']
+        if image.get('checksum') is not None:
+            upload.verify('image %s' % image['id'], image['checksum'],
+                          image['size'])
+        return resp, image
 
     def _create_with_data(self, headers, data):
-        resp, body_iter = self.http.raw_request('POST', '/v1/images',
-                                                headers=headers, body=data)
-        self._error_checker('POST', '/v1/images', headers, data, resp,
-                            body_iter)
-        body = json.loads(''.join([c for c in body_iter]))
-        return resp, body['image']
+        return self._send_data('POST', '/v1/images', headers, data)
 
     def _update_with_data(self, image_id, headers, data):
         url = '/v1/images/%s' % image_id
-        resp, body_iter = self.http.raw_request('PUT', url, headers=headers,
-                                                body=data)
-        self._error_checker('PUT', url, headers, data,
-                            resp, body_iter)
-        body = json.loads(''.join([c for c in body_iter]))
-        return resp, body['image']
+        return self._send_data('PUT', url, headers, data)
 
     def create_image(self, name, container_format, disk_format, **kwargs):
         params = {
@@ -208,6 +235,64 @@ class ImageClientJSON(RestClient):
         resp, body = self.get(url)
         return resp, body
 
+    def get_image_streaming(self, image_id, dest=None):
+        """Retrieve image data as a stream.
+
+        Returns the response and an iterator over the image data in chunks,
+        whose hexdigest() is the MD5 of the data read so far, to be closed
+        if the data isn't read to its end. If dest is given, the data is
+        written into that file-like object and checked
+        against the image checksum before returning.
+        """
+        url = '/v1/images/%s' % image_id
+        resp, body = self.http.raw_request('GET', url, checksum=True)
+        try:
+            self._error_checker('GET', url, {}, None, resp, body)
+            if dest is not None:
+                body.write_to(dest)
+        except Exception:
+            # NOTE: don't leave the connection open with unread data
+            body.close()
+            raise
+        if dest is not None:
+            checksum = resp.getheader('x-image-meta-checksum')
+            if checksum and checksum != body.hexdigest():
+                raise exceptions.ChecksumMismatch(
+                    name='image %s' % image_id, actual=body.hexdigest(),
+                    expected=checksum)
+        return resp, body
+
+    def get_image_ranged(self, image_id, dest=None, chunk_size=None,
+                         workers=None):
+        """Retrieve image data with concurrent Range requests.
+
+        The data is written into a memory map of dest (a path or a file
+        object), or of anonymous memory if dest is None, and its MD5 is
+        checked against the image checksum.
+
+        Returns the HEAD response, the memory map and a dict with the number
+        of ranges, the bytes downloaded, the MD5 of the data, the elapsed
+        time and the throughput in bytes per second.
+        """
+        url = 'v1/images/%s' % image_id
+        resp, meta = self.get_image_meta(image_id)
+
+        def get_range(first, last):
+            return self.get(url, headers={'Range': 'bytes=%d-%d' %
+                                          (first, last)})
+
+        buf, report = ranged_download.download(
+            get_range, int(meta['size']), dest=dest,
+            chunk_size=chunk_size or self.config.images.transfer_chunk_size,
+            workers=workers or self.config.images.transfer_workers)
+        checksum = meta.get('checksum')
+        if checksum and checksum != report['md5']:
+            buf.close()
+            raise exceptions.ChecksumMismatch(
+                name='image %s' % image_id, actual=report['md5'],
+                expected=checksum)
+        return resp, buf, report
+
     def is_resource_deleted(self, id):
         try:
             self.get_image(id)
@@ -253,27 +338,17 @@ class ImageClientJSON(RestClient):
         status = meta['status']
         return status
 
-    #NOTE(afazkas): Wait reinvented again. It is not in the correct layer
     def wait_for_image_status(self, image_id, status):
         """Waits for a Image to reach a given status."""
-        start_time = time.time()
-        old_value = value = self._get_image_status(image_id)
-        while True:
-            dtime = time.time() - start_time
-            time.sleep(self.build_interval)
-            if value != old_value:
-                LOG.info('Value transition from "%s" to "%s"'
-                         'in %d second(s).', old_value,
-                         value, dtime)
-            if (value == status):
-                return value
-
-            if dtime > self.build_timeout:
-                message = ('Time Limit Exceeded! (%ds)'
-                           'while waiting for %s, '
-                           'but we got %s.' %
-                           (self.build_timeout, status, value))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
-            old_value = value
-            value = self._get_image_status(image_id)
+
+        def on_timeout(value, elapsed):
+            message = ('Time Limit Exceeded! (%ds)'
+                       'while waiting for %s, '
+                       'but we got %s.' %
+                       (self.build_timeout, status, value))
+            return exceptions.TimeoutException(message)
+
+        return waiters.wait_for(
+            lambda: self._get_image_status(image_id), status,
+            self.build_timeout, self.build_interval, on_timeout=on_timeout,
+            name='image %s status %s' % (image_id, status))
@@ -16,12 +16,13 @@
 #    under the License.
 
 import json
+import random
 import urllib
 
-import jsonschema
-
 from tempest.common import glance_http
 from tempest.common import rest_client
+from tempest.common import schema_cache
+from tempest.common import streaming
 from tempest import exceptions
 
 
@@ -31,15 +32,32 @@ class ImageClientV2JSON(rest_client.RestClient):
         super(ImageClientV2JSON, self).__init__(config, username, password,
                                                 auth_url, tenant_name)
         self.service = self.config.images.catalog_type
-        self.http = self._get_http()
+        self._http = None
+
+    @property
+    def http(self):
+        # Built on first use so that constructing the client does not
+        # require authenticating against Keystone.
+        if self._http is None:
+            self._http = self._get_http()
+        return self._http
 
     def _get_http(self):
-        token, endpoint = self.keystone_auth(self.user, self.password,
-                                             self.auth_url, self.service,
-                                             self.tenant_name)
+        # The token comes from the shared token cache, so building the
+        # client does not authenticate again if any client already did.
+        # It is looked up again for every request, as by request().
+        self.get_auth()
+        endpoint = self.base_url
         dscv = self.config.identity.disable_ssl_certificate_validation
-        return glance_http.HTTPClient(endpoint=endpoint, token=token,
-                                      insecure=dscv)
+        reauthenticate = None
+        if self.reauth_on_unauthorized and self.strategy == 'keystone':
+            reauthenticate = self._reauthenticate
+        return glance_http.HTTPClient(
+            endpoint=endpoint, token=self._current_token,
+            reauthenticate=reauthenticate, insecure=dscv,
+            chunk_size=self.config.images.upload_chunk_size,
+            pool_maxsize=self.config.http.pool_maxsize,
+            pool_idle_timeout=self.config.http.pool_idle_timeout)
 
     def get_images_schema(self):
         url = 'v2/schemas/images'
@@ -55,13 +73,21 @@ class ImageClientV2JSON(rest_client.RestClient):
 
     def _validate_schema(self, body, type='image'):
         if type == 'image':
-            resp, schema = self.get_image_schema()
+            get_schema = self.get_image_schema
         elif type == 'images':
-            resp, schema = self.get_images_schema()
+            get_schema = self.get_images_schema
         else:
             raise ValueError("%s is not a valid schema type" % type)
 
-        jsonschema.validate(body, schema)
+        rate = self.config.images.schema_validation_rate
+        if rate < 1 and random.random() >= rate:
+            return
+        # The schema is downloaded once per endpoint, see SchemaCache
+        self.get_auth()
+        url = '%s/v2/schemas/%s' % (self.base_url, type)
+        validator = schema_cache.get_cache().get_validator(
+            url, lambda: get_schema()[1])
+        validator.validate(body)
 
     def create_image(self, name, container_format, disk_format, **kwargs):
         params = {
@@ -78,6 +104,9 @@ class ImageClientV2JSON(rest_client.RestClient):
                 else:
                     params[option] = value
 
+        # Additional properties, stored as is
+        params.update(kwargs.get('properties', {}))
+
         data = json.dumps(params)
         self._validate_schema(data)
 
@@ -114,13 +143,52 @@ class ImageClientV2JSON(rest_client.RestClient):
         return False
 
     def store_image(self, image_id, data):
+        """Upload image data and check what Glance stored.
+
+        data may be a string, a file-like object such as a pipe, or an
+        iterator of strings; unless its size is known up front it is sent
+        with chunked transfer encoding. Its MD5 and size are computed while
+        it is sent and checked against the checksum and size of the image.
+        """
         url = 'v2/images/%s/file' % image_id
         headers = {'Content-Type': 'application/octet-stream'}
+        upload = streaming.Upload()
         resp, body = self.http.raw_request('PUT', url, headers=headers,
-                                           body=data)
+                                           body=data, upload=upload)
+        self._error_checker('PUT', url, headers, None, resp, body)
+        _, image = self.get_image_metadata(image_id)
+        upload.verify('image %s' % image_id, image.get('checksum'),
+                      image.get('size'))
         return resp, body
 
     def get_image_file(self, image_id):
         url = 'v2/images/%s/file' % image_id
         resp, body = self.get(url)
         return resp, body
+
+    def get_image_file_streaming(self, image_id, dest=None):
+        """Retrieve image data as a stream.
+
+        Returns the response and an iterator over the image data in chunks,
+        whose hexdigest() is the MD5 of the data read so far, to be closed
+        if the data isn't read to its end. If dest is given, the data is
+        written into that file-like object and checked
+        against the Content-MD5 of the response before returning.
+        """
+        url = 'v2/images/%s/file' % image_id
+        resp, body = self.http.raw_request('GET', url, checksum=True)
+        try:
+            self._error_checker('GET', url, {}, None, resp, body)
+            if dest is not None:
+                body.write_to(dest)
+        except Exception:
+            # NOTE: don't leave the connection open with unread data
+            body.close()
+            raise
+        if dest is not None:
+            checksum = resp.getheader('content-md5')
+            if checksum and checksum != body.hexdigest():
+                raise exceptions.ChecksumMismatch(
+                    name='image %s' % image_id, actual=body.hexdigest(),
+                    expected=checksum)
+        return resp, body
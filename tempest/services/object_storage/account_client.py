@@ -15,10 +15,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import httplib2
 import json
 import urllib
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
 from tempest import exceptions
 
@@ -86,12 +86,34 @@ class AccountClient(RestClient):
 
         url = '?format=%s' % self.format
         if params:
-            url += '&%s' + urllib.urlencode(params)
+            url += '&%s' % urllib.urlencode(params)
 
         resp, body = self.get(url)
         body = json.loads(body)
         return resp, body
 
+    def list_all_account_containers(self, params=None):
+        """
+        Returns an iterator over all containers of the account, paging
+        lazily through list_account_containers() with the 'limit' (default
+        10,000) and 'marker' params, and filtering with the 'prefix' and
+        'delimiter' ones. The next page is fetched while the current one is
+        consumed.
+        """
+        params = dict(params or {})
+        params.pop('format', None)
+        limit = int(params.pop('limit', pagination.PAGE_SIZE))
+        marker = params.pop('marker', None)
+
+        def get_page(marker, limit):
+            page_params = dict(params, limit=limit)
+            if marker is not None:
+                page_params['marker'] = marker
+            resp, body = self.list_account_containers(params=page_params)
+            return body
+
+        return pagination.iter_pages(get_page, limit, marker)
+
 
 class AccountClientCustomizedHeader(RestClient):
 
@@ -105,7 +127,6 @@ class AccountClientCustomizedHeader(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        self.http_obj = httplib2.Http()
         if headers is None:
             headers = {}
         if self.base_url is None:
@@ -147,7 +168,7 @@ class AccountClientCustomizedHeader(RestClient):
 
         url = '?format=%s' % self.format
         if params:
-            url += '&%s' + urllib.urlencode(params)
+            url += '&%s' % urllib.urlencode(params)
 
         headers = {}
         if metadata:
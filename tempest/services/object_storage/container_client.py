@@ -16,9 +16,19 @@
 #    under the License.
 
 import json
+import logging
+import Queue
+import sys
+import threading
+import time
 import urllib
+import urlparse
 
+from tempest.common import pagination
 from tempest.common.rest_client import RestClient
+from tempest import exceptions
+
+LOG = logging.getLogger(__name__)
 
 
 class ContainerClient(RestClient):
@@ -30,6 +40,7 @@ class ContainerClient(RestClient):
         self.headers = {}
         self.service = self.config.object_storage.catalog_type
         self.format = 'json'
+        self._bulk_delete_limit = None
 
     def create_container(self, container_name, metadata=None,
                          metadata_prefix='X-Container-Meta-'):
@@ -90,41 +101,30 @@ class ContainerClient(RestClient):
 
     def list_all_container_objects(self, container, params=None):
         """
-            Returns complete list of all objects in the container, even if
+            Returns an iterator over all objects in the container, even if
             item count is beyond 10,000 item listing limit.
             Does not require any paramaters aside from container name.
+
+            The listing is paged with the 'limit' (default 10,000) and
+            'marker' params, and filtered with the 'prefix' and 'delimiter'
+            ones. Pages are fetched lazily, the next one while the current
+            one is consumed, so memory use does not depend on the number of
+            objects.
         """
-        #TODO(dwalleck):  Rewite using json format to avoid newlines at end of
-        #obj names. Set limit to API limit - 1 (max returned items = 9999)
-        limit = 9999
-        if params is not None:
-            if 'limit' in params:
-                limit = params['limit']
-
-            if 'marker' in params:
-                limit = params['marker']
-
-        resp, objlist = self.list_container_contents(container,
-                                                     params={'limit': limit})
-        return objlist
-        """tmp = []
-        for obj in objlist:
-            tmp.append(obj['name'])
-        objlist = tmp
-
-        if len(objlist) >= limit:
-
-            #Increment marker
-            marker = objlist[len(objlist) - 1]
-
-            #Get the next chunk of the list
-            objlist.extend(_list_all_container_objects(container,
-                                                      params={'marker': marker,
-                                                              'limit': limit}))
-            return objlist
-        else:
-            #Return final, complete list
-            return objlist"""
+        params = dict(params or {})
+        params.pop('format', None)
+        limit = int(params.pop('limit', pagination.PAGE_SIZE))
+        marker = params.pop('marker', None)
+
+        def get_page(marker, limit):
+            page_params = dict(params, limit=limit)
+            if marker is not None:
+                page_params['marker'] = marker
+            resp, body = self.list_container_contents(container,
+                                                      params=page_params)
+            return body
+
+        return pagination.iter_pages(get_page, limit, marker)
 
     def list_container_contents(self, container, params=None):
         """
@@ -169,3 +169,153 @@ class ContainerClient(RestClient):
         resp, body = self.get(url)
         body = json.loads(body)
         return resp, body
+
+    def get_bulk_delete_limit(self):
+        """
+        Returns the largest number of objects the bulk delete middleware
+        deletes per request as advertised by the /info capabilities of the
+        proxy, or 0 if bulk delete is not available.
+        """
+        if self._bulk_delete_limit is None:
+            if self.base_url is None:
+                self._set_auth()
+            parts = urlparse.urlparse(self.base_url)
+            info_url = '%s://%s/info' % (parts.scheme, parts.netloc)
+            self._log_request('GET', info_url, {}, None)
+            resp, body = self.http_obj.request(info_url, 'GET')
+            self._log_response(resp, body)
+            limit = 0
+            if resp.status == 200:
+                try:
+                    bulk = json.loads(body).get('bulk_delete')
+                except ValueError:
+                    bulk = None
+                if bulk:
+                    limit = int(bulk.get('max_deletes_per_request', 10000))
+            self._bulk_delete_limit = limit
+        return self._bulk_delete_limit
+
+    def bulk_delete(self, paths):
+        """
+        Deletes the objects or empty containers at the given
+        'container[/object]' paths with a single request to the bulk delete
+        middleware. Returns the response and its parsed body.
+        """
+        body = '\n'.join(urllib.quote(('/%s' % path).encode('utf-8'))
+                         for path in paths)
+        headers = {'Content-Type': 'text/plain',
+                   'Accept': 'application/json'}
+        resp, body = self.post('?bulk-delete', body, headers)
+        body = json.loads(body)
+        # NOTE: the middleware answers 200 as soon as it starts streaming
+        # its result, so failures are only found in the body.
+        if body.get('Errors') or not body.get(
+                'Response Status', '200').startswith('2'):
+            raise exceptions.RestClientException(
+                "Bulk delete failed: %s %s" % (body.get('Response Status'),
+                                               body.get('Errors')))
+        return resp, body
+
+    def purge_container(self, container, delete_container=True,
+                        workers=None):
+        """
+        Deletes every object in the container, then the container itself
+        unless delete_container is False.
+
+        Object names are streamed from the paginated listing. They are
+        deleted in batches with the bulk delete middleware when the proxy
+        advertises it, otherwise by a pool of workers threads (by default
+        [teardown] workers) sending one DELETE per object.
+
+        Returns a dict with the number of objects deleted, the number
+        already gone, whether bulk delete was used, the elapsed time and
+        the deletes per second.
+        """
+        start = time.time()
+        names = (obj['name'] for obj in
+                 self.list_all_container_objects(container))
+        batch_size = self.get_bulk_delete_limit()
+        if batch_size:
+            deleted, not_found = self._bulk_purge(container, names,
+                                                  batch_size)
+        else:
+            deleted, not_found = self._concurrent_purge(
+                container, names,
+                workers or self.config.teardown.workers)
+        if delete_container:
+            try:
+                self.delete_container(container)
+            except exceptions.NotFound:
+                pass
+        elapsed = time.time() - start
+        report = {'deleted': deleted,
+                  'not_found': not_found,
+                  'bulk': bool(batch_size),
+                  'elapsed': elapsed,
+                  'rate': deleted / elapsed if elapsed else None}
+        LOG.info("Purged %(deleted)d object(s) in %(elapsed).2f s",
+                 report)
+        return report
+
+    def _bulk_purge(self, container, names, batch_size):
+        deleted = not_found = 0
+        batch = []
+        for name in names:
+            batch.append('%s/%s' % (container, name))
+            if len(batch) < batch_size:
+                continue
+            resp, body = self.bulk_delete(batch)
+            deleted += body.get('Number Deleted', 0)
+            not_found += body.get('Number Not Found', 0)
+            batch = []
+        if batch:
+            resp, body = self.bulk_delete(batch)
+            deleted += body.get('Number Deleted', 0)
+            not_found += body.get('Number Not Found', 0)
+        return deleted, not_found
+
+    def _concurrent_purge(self, container, names, workers):
+        counts = {'deleted': 0, 'not_found': 0}
+        errors = []
+        lock = threading.Lock()
+        names_queue = Queue.Queue(maxsize=workers * 2)
+
+        def delete():
+            while True:
+                name = names_queue.get()
+                if name is None:
+                    return
+                if errors:
+                    # Drain the queue so that the listing is not blocked
+                    continue
+                url = '%s/%s' % (container,
+                                 urllib.quote(name.encode('utf-8')))
+                try:
+                    self.delete(url)
+                    key = 'deleted'
+                except exceptions.NotFound:
+                    key = 'not_found'
+                except Exception:
+                    errors.append(sys.exc_info())
+                    continue
+                with lock:
+                    counts[key] += 1
+
+        threads = [threading.Thread(target=delete)
+                   for _ in xrange(max(1, workers))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            for name in names:
+                if errors:
+                    break
+                names_queue.put(name)
+        finally:
+            for thread in threads:
+                names_queue.put(None)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+        return counts['deleted'], counts['not_found']
@@ -17,12 +17,21 @@
 
 import hashlib
 import hmac
-import httplib2
+import json
+import logging
+import Queue
+import sys
+import threading
+import time
 import urlparse
 
+from tempest.common import ranged_download
 from tempest.common.rest_client import RestClient
+from tempest.common import streaming
 from tempest import exceptions
 
+LOG = logging.getLogger(__name__)
+
 
 class ObjectClient(RestClient):
     def __init__(self, config, username, password, auth_url, tenant_name=None):
@@ -74,6 +83,85 @@ class ObjectClient(RestClient):
         resp, body = self.get(url)
         return resp, body
 
+    def create_object_streaming(self, container, object_name, data,
+                                content_length=None, metadata=None):
+        """Create storage object from a file-like object or an iterator.
+
+        The data is sent in chunks with its MD5 computed on the fly, so
+        memory use does not depend on the object size. Without
+        content_length, and if the length of data cannot be found out
+        without reading it, chunked transfer encoding is used.
+
+        Returns the response and the MD5 hex digest of the data sent, which
+        a successful upload returns as its ETag.
+        """
+
+        headers = {}
+        if metadata:
+            for key in metadata:
+                headers[str(key)] = metadata[key]
+
+        url = "%s/%s" % (str(container), str(object_name))
+        resp, body, md5 = self.stream_request(
+            'PUT', url, headers=headers, body=data,
+            content_length=content_length,
+            chunk_size=self.config.object_storage.stream_chunk_size)
+        body.read()
+        return resp, md5
+
+    def get_object_streaming(self, container, object_name, dest=None,
+                             headers=None):
+        """Retrieve object's data as a stream.
+
+        Returns the response and a StreamingBody iterating over the object
+        data in chunks; its hexdigest() is the MD5 of the data read so far.
+        If dest is given, the data is written into that file-like object
+        before returning.
+        """
+
+        url = "%s/%s" % (str(container), str(object_name))
+        resp, body, _ = self.stream_request(
+            'GET', url, headers=headers,
+            chunk_size=self.config.object_storage.stream_chunk_size)
+        if dest is not None:
+            body.write_to(dest)
+        return resp, body
+
+    def get_object_ranged(self, container, object_name, dest=None,
+                          chunk_size=None, workers=None):
+        """Retrieve object's data with concurrent Range requests.
+
+        The data is written into a memory map of dest (a path or a file
+        object), or of anonymous memory if dest is None, and its MD5 is
+        checked against the ETag unless the object is a large object
+        manifest.
+
+        Returns the HEAD response, the memory map and a dict with the number
+        of ranges, the bytes downloaded, the MD5 of the data, the elapsed
+        time and the throughput in bytes per second.
+        """
+        conf = self.config.object_storage
+        url = "%s/%s" % (str(container), str(object_name))
+        resp, _ = self.head(url)
+
+        def get_range(first, last):
+            return self.get(url, headers={'Range': 'bytes=%d-%d' %
+                                          (first, last)})
+
+        buf, report = ranged_download.download(
+            get_range, int(resp['content-length']), dest=dest,
+            chunk_size=chunk_size or conf.segment_size,
+            workers=workers or conf.transfer_workers)
+        # NOTE: the ETag of a manifest is not the MD5 of the whole data
+        if ('x-object-manifest' not in resp and
+                'x-static-large-object' not in resp):
+            etag = resp.get('etag', '').strip('"')
+            if etag != report['md5']:
+                buf.close()
+                raise exceptions.ChecksumMismatch(
+                    name=url, actual=report['md5'], expected=etag)
+        return resp, buf, report
+
     def copy_object_in_same_container(self, container, src_object_name,
                                       dest_object_name, metadata=None):
         """Copy storage object's data to the new object using PUT."""
@@ -145,6 +233,106 @@ class ObjectClient(RestClient):
         resp, body = self.put(url, data, self.headers)
         return resp, body
 
+    def create_large_object(self, container, object_name, data,
+                            segment_size=None, workers=None, manifest='dlo',
+                            segment_container=None):
+        """Upload a large object as segments sent concurrently.
+
+        data, a string, a file-like object or an iterator, is split into
+        segments of segment_size bytes uploaded by create_object_segments()
+        from workers threads over the pooled connections. At most workers
+        segments are read ahead, so memory use does not depend on the
+        object size. The ETag of every segment is checked against its MD5,
+        then a dynamic ('dlo') or static ('slo') manifest is written.
+
+        Returns the response of the manifest PUT and a dict with the number
+        of segments, the bytes uploaded, the MD5 of the whole data, the
+        elapsed time and the throughput in bytes per second.
+        """
+        conf = self.config.object_storage
+        segment_size = segment_size or conf.segment_size
+        workers = max(1, workers or conf.transfer_workers)
+        segment_container = segment_container or container
+        if manifest not in ('dlo', 'slo'):
+            raise ValueError("%s is not a valid manifest type" % manifest)
+
+        segments = {}
+        errors = []
+        tasks = Queue.Queue(maxsize=workers)
+
+        def upload():
+            while True:
+                task = tasks.get()
+                if task is None:
+                    return
+                if errors:
+                    # Drain the queue so that the reader is not blocked
+                    continue
+                index, name, chunk = task
+                try:
+                    resp, _ = self.create_object_segments(
+                        segment_container, object_name, name, chunk)
+                    expected = hashlib.md5(chunk).hexdigest()
+                    etag = resp.get('etag', '').strip('"')
+                    if etag != expected:
+                        raise exceptions.ChecksumMismatch(
+                            name='%s/%s/%s' % (segment_container, object_name,
+                                               name),
+                            actual=etag, expected=expected)
+                    segments[index] = (name, etag, len(chunk))
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        threads = [threading.Thread(target=upload) for _ in xrange(workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        start = time.time()
+        md5 = hashlib.md5()
+        total = 0
+        try:
+            for index, chunk in enumerate(streaming.iter_blocks(
+                    data, segment_size)):
+                if errors:
+                    break
+                md5.update(chunk)
+                total += len(chunk)
+                # NOTE: zero padded so that the DLO listing order is the
+                # segment order
+                tasks.put((index, '%08d' % index, chunk))
+        finally:
+            for thread in threads:
+                tasks.put(None)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0][0], errors[0][1], errors[0][2]
+
+        url = "%s/%s" % (str(container), str(object_name))
+        if manifest == 'dlo':
+            headers = {'X-Object-Manifest': '%s/%s/' % (segment_container,
+                                                        object_name)}
+            resp, body = self.put(url, '', headers)
+        else:
+            body = json.dumps([{'path': '/%s/%s/%s' % (segment_container,
+                                                       object_name, name),
+                                'etag': etag,
+                                'size_bytes': size}
+                               for name, etag, size in
+                               (segments[index]
+                                for index in sorted(segments))])
+            resp, body = self.put(url + '?multipart-manifest=put', body,
+                                  self.headers)
+        elapsed = time.time() - start
+        report = {'segments': len(segments),
+                  'bytes': total,
+                  'md5': md5.hexdigest(),
+                  'elapsed': elapsed,
+                  'throughput': total / elapsed if elapsed else None}
+        LOG.info("Uploaded %(bytes)d bytes in %(segments)d segment(s) in "
+                 "%(elapsed).2f s", report)
+        return resp, report
+
 
 class ObjectClientCustomizedHeader(RestClient):
 
@@ -158,8 +346,6 @@ class ObjectClientCustomizedHeader(RestClient):
 
     def request(self, method, url, headers=None, body=None):
         """A simple HTTP request interface."""
-        dscv = self.config.identity.disable_ssl_certificate_validation
-        self.http_obj = httplib2.Http(disable_ssl_certificate_validation=dscv)
         if headers is None:
             headers = {}
         if self.base_url is None:
@@ -16,10 +16,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common import rest_client
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -77,23 +77,28 @@ class OrchestrationClient(rest_client.RestClient):
             'DELETE_FAILED',
             'UPDATE_FAILED',
             'ROLLBACK_FAILED')):
-        """Waits for a Volume to reach a given status."""
-        stack_status = None
-        start = int(time.time())
+        """Waits for a Stack to reach a given status."""
+        stack = {}
 
-        while stack_status != status:
+        def get_status():
             resp, body = self.get_stack(stack_identifier)
-            stack_name = body['stack_name']
-            stack_status = body['stack_status']
-            if stack_status in failure_status:
-                raise exceptions.StackBuildErrorException(
-                    stack_identifier=stack_identifier,
-                    stack_status=stack_status,
-                    stack_status_reason=body['stack_status_reason'])
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Stack %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (stack_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
+            stack.update(body)
+            return body['stack_status']
+
+        def fail(stack_status):
+            return exceptions.StackBuildErrorException(
+                stack_identifier=stack_identifier,
+                stack_status=stack_status,
+                stack_status_reason=stack['stack_status_reason'])
+
+        def on_timeout(stack_status, elapsed):
+            message = ('Stack %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (stack['stack_name'], status, self.build_timeout))
+            return exceptions.TimeoutException(message)
+
+        waiters.wait_for(get_status, status, self.build_timeout,
+                         self.build_interval, fail_states=failure_status,
+                         fail=fail, on_timeout=on_timeout,
+                         name='stack %s status %s' % (stack_identifier,
+                                                      status))
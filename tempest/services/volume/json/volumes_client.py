@@ -16,10 +16,10 @@
 #    under the License.
 
 import json
-import time
 import urllib
 
 from tempest.common.rest_client import RestClient
+from tempest.common import waiters
 from tempest import exceptions
 
 
@@ -106,23 +106,45 @@ class VolumesClientJSON(RestClient):
 
     def wait_for_volume_status(self, volume_id, status):
         """Waits for a Volume to reach a given status."""
-        resp, body = self.get_volume(volume_id)
-        volume_name = body['display_name']
-        volume_status = body['status']
-        start = int(time.time())
+        volume = {}
 
-        while volume_status != status:
-            time.sleep(self.build_interval)
+        def get_status():
             resp, body = self.get_volume(volume_id)
-            volume_status = body['status']
-            if volume_status == 'error':
-                raise exceptions.VolumeBuildErrorException(volume_id=volume_id)
-
-            if int(time.time()) - start >= self.build_timeout:
-                message = ('Volume %s failed to reach %s status within '
-                           'the required time (%s s).' %
-                           (volume_name, status, self.build_timeout))
-                raise exceptions.TimeoutException(message)
+            volume.update(body)
+            return body['status']
+
+        def on_timeout(volume_status, elapsed):
+            message = ('Volume %s failed to reach %s status within '
+                       'the required time (%s s).' %
+                       (volume['display_name'], status, self.build_timeout))
+            return exceptions.TimeoutException(message)
+
+        waiters.wait_for(get_status, status, self.build_timeout,
+                         self.build_interval, fail_states=('error',),
+                         fail=lambda _: exceptions.VolumeBuildErrorException(
+                             volume_id=volume_id),
+                         on_timeout=on_timeout,
+                         name='volume %s status %s' % (volume_id, status))
+
+    def wait_for_volumes_status(self, volume_ids, status):
+        """Waits for several Volumes to reach a given status.
+
+        All the volumes are polled together through volumes/detail. Returns
+        a dict of the volume ids to their details.
+        """
+
+        def list_volumes(since):
+            resp, volumes = self.list_volumes_with_detail()
+            return volumes
+
+        # NOTE: Cinder has no changes-since filter, every poll is a full
+        # listing.
+        return waiters.wait_for_all(
+            list_volumes, volume_ids, status, self.build_timeout,
+            self.build_interval, fail_states=('error',),
+            fail=lambda volume_id, _: exceptions.VolumeBuildErrorException(
+                volume_id=volume_id),
+            name='volumes status %s' % status)
 
     def is_resource_deleted(self, id):
         try:
@@ -13,12 +13,12 @@
 #    under the License.
 
 import logging
-import time
 import urllib
 
 from lxml import etree
 
 from tempest.common.rest_client import RestClientXML
+from tempest.common import waiters
 from tempest import exceptions
 from tempest.services.compute.xml.common import Document
 from tempest.services.compute.xml.common import Element
@@ -97,30 +97,20 @@ class SnapshotsClientXML(RestClientXML):
 
         return status
 
-    #NOTE(afazkas): Wait reinvented again. It is not in the correct layer
     def wait_for_snapshot_status(self, snapshot_id, status):
         """Waits for a Snapshot to reach a given status."""
-        start_time = time.time()
-        old_value = value = self._get_snapshot_status(snapshot_id)
-        while True:
-            dtime = time.time() - start_time
-            time.sleep(self.build_interval)
-            if value != old_value:
-                LOG.info('Value transition from "%s" to "%s"'
-                         'in %d second(s).', old_value,
-                         value, dtime)
-            if (value == status):
-                return value
-
-            if dtime > self.build_timeout:
-                message = ('Time Limit Exceeded! (%ds)'
-                           'while waiting for %s, '
-                           'but we got %s.' %
-                           (self.build_timeout, status, value))
-                raise exceptions.TimeoutException(message)
-            time.sleep(self.build_interval)
-            old_value = value
-            value = self._get_snapshot_status(snapshot_id)
+
+        def on_timeout(value, elapsed):
+            message = ('Time Limit Exceeded! (%ds)'
+                       'while waiting for %s, '
+                       'but we got %s.' %
+                       (self.build_timeout, status, value))
+            return exceptions.TimeoutException(message)
+
+        return waiters.wait_for(
+            lambda: self._get_snapshot_status(snapshot_id), status,
+            self.build_timeout, self.build_interval, on_timeout=on_timeout,
+            name='snapshot %s status %s' % (snapshot_id, status))
 
     def delete_snapshot(self, snapshot_id):
         """Delete Snapshot."""
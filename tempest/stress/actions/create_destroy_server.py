@@ -13,22 +13,30 @@
 #    limitations under the License.
 
 from tempest.common.utils.data_utils import rand_name
+from tempest.stress import stats
 
 
-def create_destroy(manager, logger):
+def create_destroy_once(manager, logger):
     image = manager.config.compute.image_ref
     flavor = manager.config.compute.flavor_ref
-    while True:
-        name = rand_name("instance")
-        logger.info("creating %s" % name)
+    reporter = stats.get_reporter()
+    name = rand_name("instance")
+    logger.info("creating %s" % name)
+    with reporter.step('create'):
         resp, server = manager.servers_client.create_server(
             name, image, flavor)
         server_id = server['id']
         assert(resp.status == 202)
         manager.servers_client.wait_for_server_status(server_id, 'ACTIVE')
-        logger.info("created %s" % server_id)
-        logger.info("deleting %s" % name)
+    logger.info("created %s" % server_id)
+    logger.info("deleting %s" % name)
+    with reporter.step('delete'):
         resp, _ = manager.servers_client.delete_server(server_id)
         assert(resp.status == 204)
         manager.servers_client.wait_for_server_termination(server_id)
-        logger.info("deleted %s" % server_id)
+    logger.info("deleted %s" % server_id)
+
+
+def create_destroy(manager, logger):
+    while True:
+        create_destroy_once(manager, logger)
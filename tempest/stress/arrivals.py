@@ -0,0 +1,227 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Open-loop load generation.
+
+A closed-loop worker starts its next action when the previous one is over,
+so the load it offers drops as soon as the cloud slows down. Here a
+Dispatcher thread of the driver schedules invocations at a target arrival
+rate, constant or Poisson, whatever the cloud does, and queues them for a
+pool of worker processes each running one invocation at a time. The rate
+may change over time, following a load profile (see
+tempest.stress.profiles).
+
+For every invocation the workers report two steps: 'queued', from the
+scheduled arrival to a worker taking it, and 'service', the invocation
+itself. When invocations pile up faster than the pool serves them, the
+cloud can't keep up with the offered rate: the Dispatcher reports it, and
+drops the arrivals beyond its backlog limit rather than queueing them
+forever. Dropped arrivals are reported as 'queued' errors, and so are the
+arrivals still queued when the run stops, as unserved.
+"""
+
+import logging
+import Queue
+import random
+import threading
+import time
+
+from tempest.stress import profiles
+from tempest.stress import stats
+
+LOG = logging.getLogger(__name__)
+
+CONSTANT = 'constant'
+POISSON = 'poisson'
+
+QUEUED = 'queued'
+SERVICE = 'service'
+
+DROPPED = 'Dropped'
+UNSERVED = 'Unserved'
+
+# Seconds between two checks of a rate profile while its rate is zero
+IDLE_INTERVAL = 0.1
+
+
+def next_interval(rate, distribution=CONSTANT, rng=random):
+    """Return the seconds until the next arrival at rate arrivals/s."""
+    if distribution == POISSON:
+        return rng.expovariate(rate)
+    return 1.0 / rate
+
+
+class Dispatcher(threading.Thread):
+
+    """Queues invocations of an action at their arrival times.
+
+    :param tasks: the multiprocessing.Queue the workers take invocations
+                  from; each item is the scheduled arrival time
+    :param rate: arrivals per second, or a profiles.Profile of the rate,
+                 which is read at every arrival
+    :param max_backlog: number of queued invocations beyond which arrivals
+                        are dropped
+    :param reporter: stats.Reporter the dropped arrivals are reported to
+    """
+
+    def __init__(self, name, tasks, rate, distribution=CONSTANT,
+                 max_backlog=100, reporter=None):
+        if distribution not in (CONSTANT, POISSON):
+            raise ValueError("Unknown arrival distribution %s" % distribution)
+        if not isinstance(rate, profiles.Profile):
+            if rate <= 0:
+                raise ValueError("The arrival rate must be positive, not %s"
+                                 % rate)
+            rate = profiles.Soak(rate)
+        super(Dispatcher, self).__init__(name='stress-dispatcher-' + name)
+        self.daemon = True
+        self.action = name
+        self.tasks = tasks
+        self.profile = rate
+        self.distribution = distribution
+        self.max_backlog = max_backlog
+        self.reporter = reporter
+        self.arrivals = 0
+        self.dropped = 0
+        self.unserved = 0
+        self.peak_backlog = 0
+        self.saturated_at = None
+        self.saturated_rate = None
+        self.started_at = None
+        self.stopped_at = None
+        self._stopping = threading.Event()
+
+    def backlog(self):
+        try:
+            return self.tasks.qsize()
+        except NotImplementedError:
+            # e.g. on OS X
+            return 0
+
+    def run(self):
+        if self.started_at is None:
+            self.started_at = time.time()
+        arrival = self.started_at
+        while True:
+            rate = self.profile.level(arrival - self.started_at)
+            if rate > 0:
+                arrival += next_interval(rate, self.distribution)
+            else:
+                arrival += IDLE_INTERVAL
+            delay = arrival - time.time()
+            if delay > 0:
+                self._stopping.wait(delay)
+            if self._stopping.is_set():
+                break
+            if rate <= 0:
+                continue
+            self.arrivals += 1
+            backlog = self.backlog()
+            self.peak_backlog = max(self.peak_backlog, backlog)
+            if backlog >= self.max_backlog:
+                if self.saturated_at is None:
+                    self.saturated_at = time.time()
+                    self.saturated_rate = rate
+                    LOG.warning("%s: the cloud can't keep up with %.2f "
+                                "ops/s, %d invocations are waiting; "
+                                "dropping arrivals", self.action, rate,
+                                backlog)
+                self.dropped += 1
+                if self.reporter is not None:
+                    self.reporter.record(QUEUED, arrival, time.time(),
+                                         stats.ERROR, DROPPED)
+                continue
+            self.tasks.put(arrival)
+        self.stopped_at = time.time()
+
+    def stop(self):
+        """Stop the arrivals and take back those no worker took."""
+        self._stopping.set()
+        self.join()
+        now = time.time()
+        while True:
+            try:
+                # NOTE: not get_nowait(), items may still be on their way
+                # from the feeder thread of the queue to its pipe
+                arrival = self.tasks.get(timeout=0.1)
+            except Queue.Empty:
+                break
+            self.unserved += 1
+            if self.reporter is not None:
+                self.reporter.record(QUEUED, arrival, now, stats.ERROR,
+                                     UNSERVED)
+        # NOTE: arrivals put while the queue was drained, if any, are
+        # dropped with it instead of keeping the driver from exiting
+        self.tasks.cancel_join_thread()
+
+    def summary(self):
+        end = self.stopped_at or time.time()
+        duration = end - (self.started_at or end)
+        return {
+            'action': self.action,
+            'distribution': self.distribution,
+            'offered_rate': self.profile.level(duration),
+            'arrival_rate': self.arrivals / duration if duration else None,
+            'arrivals': self.arrivals,
+            'dropped': self.dropped,
+            'unserved': self.unserved,
+            'peak_backlog': self.peak_backlog,
+            'saturated': self.saturated_at is not None,
+            'saturated_at': self.saturated_at,
+            'saturated_rate': self.saturated_rate,
+        }
+
+
+def merge_summaries(summaries):
+    """Merge the Dispatcher summaries of equal shares of the load of an
+    action, e.g. run by several drivers.
+    """
+    merged = dict(summaries[0])
+    for key in ('offered_rate', 'arrival_rate', 'arrivals', 'dropped',
+                'unserved', 'peak_backlog'):
+        values = [summary[key] for summary in summaries
+                  if summary[key] is not None]
+        merged[key] = sum(values) if values else None
+    saturated = [summary for summary in summaries if summary['saturated']]
+    if saturated:
+        first = min(saturated, key=lambda summary: summary['saturated_at'])
+        merged['saturated_at'] = first['saturated_at']
+        merged['saturated_rate'] = first['saturated_rate'] * len(summaries)
+    merged['saturated'] = bool(saturated)
+    return merged
+
+
+def serve(target, manager, logger, tasks, reporter, kwargs):
+    """Worker loop running the invocations a Dispatcher queues.
+
+    Errors are reported and the worker goes on, since the arrival rate
+    doesn't depend on the outcome of the invocations.
+    """
+    while not reporter.stopping():
+        try:
+            arrival = tasks.get(timeout=0.5)
+        except Queue.Empty:
+            continue
+        reporter.record(QUEUED, arrival, time.time())
+        try:
+            with reporter.step(SERVICE):
+                target(manager, logger, **kwargs)
+        except stats.Stopped:
+            raise
+        except Exception:
+            logger.exception("%s failed" % reporter.action)
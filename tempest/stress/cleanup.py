@@ -16,45 +16,61 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import functools
+import logging
+
 from tempest import clients
+from tempest.common import teardown
+
+LOG = logging.getLogger(__name__)
 
 
 def cleanup():
     admin_manager = clients.AdminManager()
+    graph = teardown.TeardownGraph()
+    servers_client = admin_manager.servers_client
+    keypairs_client = admin_manager.keypairs_client
+    floating_ips_client = admin_manager.floating_ips_client
+    identity_client = admin_manager.identity_client
 
-    _, body = admin_manager.servers_client.list_servers({"all_tenants": True})
+    _, body = servers_client.list_servers({"all_tenants": True})
     for s in body['servers']:
-        try:
-            admin_manager.servers_client.delete_server(s['id'])
-        except Exception:
-            pass
+        # NOTE: the servers of every tenant are listed, so they are awaited
+        # one by one rather than through the tenant's servers/detail
+        graph.add(('server', s['id']),
+                  functools.partial(servers_client.delete_server, s['id']),
+                  wait=functools.partial(
+                      servers_client.wait_for_server_termination, s['id']))
 
-    for s in body['servers']:
-        try:
-            admin_manager.servers_client.wait_for_server_termination(s['id'])
-        except Exception:
-            pass
-
-    _, keypairs = admin_manager.keypairs_client.list_keypairs()
+    _, keypairs = keypairs_client.list_keypairs()
     for k in keypairs:
-        try:
-            admin_manager.keypairs_client.delete_keypair(k['name'])
-        except Exception:
-            pass
+        graph.add(('keypair', k['name']),
+                  functools.partial(keypairs_client.delete_keypair,
+                                    k['name']))
 
-    _, floating_ips = admin_manager.floating_ips_client.list_floating_ips()
+    _, floating_ips = floating_ips_client.list_floating_ips()
     for f in floating_ips:
-        try:
-            admin_manager.floating_ips_client.delete_floating_ip(f['id'])
-        except Exception:
-            pass
+        graph.add(('floating_ip', f['id']),
+                  functools.partial(floating_ips_client.delete_floating_ip,
+                                    f['id']))
 
-    _, users = admin_manager.identity_client.get_users()
+    # The stress users and tenants go last, once nothing they own is left
+    owned = graph.keys()
+    _, users = identity_client.get_users()
     for user in users:
         if user['name'].startswith("stress_user"):
-            admin_manager.identity_client.delete_user(user['id'])
+            graph.add(('user', user['id']),
+                      functools.partial(identity_client.delete_user,
+                                        user['id']),
+                      requires=owned)
 
-    _, tenants = admin_manager.identity_client.list_tenants()
+    _, tenants = identity_client.list_tenants()
     for tenant in tenants:
         if tenant['name'].startswith("stress_tenant"):
-            admin_manager.identity_client.delete_tenant(tenant['id'])
+            graph.add(('tenant', tenant['id']),
+                      functools.partial(identity_client.delete_tenant,
+                                        tenant['id']),
+                      requires=owned)
+
+    for key, exc_info in graph.run():
+        LOG.error("Cleanup of %s %s failed: %s", key[0], key[1], exc_info[1])
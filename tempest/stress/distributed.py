@@ -0,0 +1,487 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Distributed stress runs.
+
+A single driver host can only load a cloud so much. A Coordinator splits
+the tests of a run between agents, stress drivers on other hosts or on the
+same one, each running an equal share of the load (see split_tests()):
+
+1. the coordinator connects to every agent and sends it its tests, which
+   the agent prepares, i.e. starts their workers,
+2. once every agent is ready, the coordinator tells them all to start,
+3. agents send their snapshots, which carry their latency histograms, and
+   the coordinator merges and logs them every ``metrics_interval``,
+4. after the duration of the run, or as soon as errors show up in the
+   logs of the cloud or an agent is lost, the coordinator stops the
+   agents and merges their reports. As with a single driver, the cloud is
+   only cleaned up if no errors were found in its logs.
+
+An agent that says nothing for ``agent_timeout`` seconds is considered
+lost: the workers of an agent share its connection, which stays open when
+only the agent itself dies.
+
+Agents and coordinator exchange JSON objects, one per line, over TCP. The
+``type`` of a message is one of 'prepare' (with the ``tests`` of the
+agent and the ``token`` it shares with the coordinator), 'ready',
+'start', 'snapshot' (with the ``snapshot``), 'stop', 'report' (with the
+``report``) or 'error' (with a ``message``).
+"""
+
+import binascii
+import collections
+import hmac
+import json
+import logging
+import math
+import multiprocessing
+import os
+import Queue
+import socket
+import threading
+import time
+
+from tempest import exceptions
+from tempest.stress import arrivals
+from tempest.stress import cleanup
+from tempest.stress import driver
+from tempest.stress import profiles
+from tempest.stress import stats
+
+LOG = logging.getLogger(__name__)
+
+# Why a coordinator stops a run before its end
+LOG_ERRORS = 'log_errors'
+AGENT_LOST = 'agent_lost'
+
+
+def parse_address(address, default_host='127.0.0.1'):
+    """Return the (host, port) of a 'host:port' or 'port' string."""
+    host, _, port = address.rpartition(':')
+    return host or default_host, int(port)
+
+
+def listen(address):
+    """Return a socket listening on address, a (host, port) pair."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(address)
+    listener.listen(1)
+    return listener
+
+
+class Channel(object):
+
+    """A TCP connection exchanging JSON messages, one per line."""
+
+    def __init__(self, sock, name):
+        self.sock = sock
+        self.name = name
+        self._reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, address, timeout=None):
+        sock = socket.create_connection(address, timeout)
+        return cls(sock, '%s:%s' % address)
+
+    def send(self, kind, **fields):
+        fields['type'] = kind
+        data = json.dumps(fields) + '\n'
+        # NOTE: agents send snapshots from the thread of their aggregator
+        with self._lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        try:
+            line = self._reader.readline()
+        except (socket.error, socket.timeout) as e:
+            raise exceptions.StressAgentError(agent=self.name, reason=e)
+        if not line:
+            raise exceptions.StressAgentError(agent=self.name,
+                                              reason="connection closed")
+        return json.loads(line)
+
+    def expect(self, kind):
+        """Receive a message of type kind and return it.
+
+        :raises StressAgentError: if the peer sends something else, e.g. an
+                                  error, or goes away
+        """
+        message = self.receive()
+        if message['type'] == 'error':
+            raise exceptions.StressAgentError(agent=self.name,
+                                              reason=message['message'])
+        if message['type'] != kind:
+            raise exceptions.StressAgentError(
+                agent=self.name, reason="got %s instead of %s" %
+                (message['type'], kind))
+        return message
+
+    def close(self):
+        try:
+            self._reader.close()
+            self.sock.close()
+        except socket.error:
+            pass
+
+
+def split_tests(tests, count):
+    """Return the tests of each of count drivers sharing the load of tests.
+
+    A test with a number of workers runs on as many drivers as it has
+    workers, up to count, which split its workers as evenly as possible;
+    a test with a load profile of workers runs on every driver. The
+    arrival rate of a test and its load profile are divided between the
+    drivers it runs on, and every share is marked with its
+    ``load_share``, so that load curves are reported for the whole load.
+    """
+    shares = [[] for _ in xrange(count)]
+    # NOTE: the drivers tests with fewer workers than count run on, and
+    # the extra workers, are spread by starting each test where the
+    # previous one stopped
+    offset = 0
+    for test in tests:
+        threads = test.get('threads', 1)
+        if isinstance(threads, dict):
+            drivers = count
+        else:
+            drivers = min(count, threads)
+        for i in xrange(drivers):
+            part = dict(test, load_share=1.0 / drivers)
+            if isinstance(threads, dict):
+                part['threads'] = profiles.scale(threads, 1.0 / drivers)
+            else:
+                part['threads'] = (threads // drivers +
+                                   (1 if i < threads % drivers else 0))
+            if 'rate' in test:
+                part['rate'] = profiles.scale(test['rate'], 1.0 / drivers)
+            if 'max_backlog' in test:
+                part['max_backlog'] = int(math.ceil(
+                    test['max_backlog'] / float(drivers)))
+            shares[(offset + i) % count].append(part)
+        if drivers < count:
+            offset += drivers
+        elif not isinstance(threads, dict):
+            offset += threads % count
+        offset %= count
+    return shares
+
+
+def new_token():
+    """Return a random token for agents started for a single run."""
+    return binascii.hexlify(os.urandom(16))
+
+
+def _run_agent(channel, token):
+    def send_snapshot(snapshot):
+        # NOTE: the coordinator only expects snapshots once it started us
+        if run.started_at is None:
+            return
+        try:
+            channel.send('snapshot', snapshot=snapshot)
+        except socket.error as e:
+            LOG.warning("Unable to send a snapshot to %s: %s",
+                        channel.name, e)
+
+    message = channel.expect('prepare')
+    if not hmac.compare_digest(message.get('token', u'').encode('utf-8'),
+                               token.encode('utf-8')):
+        channel.send('error', message="invalid token")
+        raise exceptions.StressAgentError(agent=channel.name,
+                                          reason="invalid token")
+    run = driver.StressRun(message['tests'], listener=send_snapshot,
+                           histograms=True)
+    try:
+        run.prepare()
+    except Exception as e:
+        channel.send('error', message=str(e))
+        raise
+    channel.send('ready')
+    try:
+        channel.expect('start')
+        run.start()
+        channel.expect('stop')
+    except exceptions.StressAgentError as e:
+        LOG.error("Stopping: %s", e)
+    finally:
+        run.stop()
+    channel.send('report', report=run.report())
+
+
+def serve_agent(listener, token, once=False):
+    """Run the shares of stress runs coordinators connect to listener for.
+
+    Agents run the actions coordinators send, so only coordinators which
+    know token are served.
+
+    :param listener: a listening socket, see listen()
+    :param token: the secret the coordinators must send
+    :param once: whether to return after the first run
+    """
+    if not token:
+        raise ValueError("Stress agents need a token")
+    while True:
+        sock, address = listener.accept()
+        channel = Channel(sock, '%s:%s' % address)
+        LOG.info("Coordinator %s connected", channel.name)
+        try:
+            _run_agent(channel, token)
+        except Exception:
+            LOG.exception("Run of coordinator %s failed", channel.name)
+        finally:
+            channel.close()
+        if once:
+            return
+
+
+def start_local_agents(count, token):
+    """Start count agents on this host, each in its own process.
+
+    :returns: the addresses of the agents and their processes
+    """
+    addresses = []
+    processes = []
+    for _ in xrange(count):
+        listener = listen(('127.0.0.1', 0))
+        process = multiprocessing.Process(target=serve_agent,
+                                          args=(listener, token, True))
+        process.start()
+        addresses.append(listener.getsockname())
+        processes.append(process)
+        # NOTE: the agent has its own copy
+        listener.close()
+    return addresses, processes
+
+
+class Coordinator(object):
+
+    """Runs stress tests on agents, see the module docstring.
+
+    :param agents: the (host, port) addresses of the agents
+    :param token: the secret shared with the agents
+    """
+
+    def __init__(self, agents, tests, token):
+        self.agents = agents
+        self.tests = tests
+        self.token = token
+        self.conf = driver.admin_manager.config.stress
+        self.channels = []
+        self.lost = set()
+        self._messages = Queue.Queue()
+        # The latest snapshot of every agent, by index
+        self._snapshots = {}
+
+    def _read(self, index, channel):
+        while True:
+            try:
+                message = channel.receive()
+            except exceptions.StressAgentError as e:
+                self._messages.put((index, e))
+                return
+            self._messages.put((index, message))
+            if message['type'] in ('report', 'error'):
+                return
+
+    def _lose(self, index, reason):
+        if index not in self.lost:
+            LOG.error("Lost agent %s: %s", self.channels[index].name, reason)
+            self.lost.add(index)
+
+    def _write_snapshot(self, path):
+        if self._snapshots:
+            stats.write_snapshot(
+                stats.merge_snapshots(self._snapshots.values()), path)
+
+    def _watch(self, end_time, watcher, snapshot_path):
+        """Merge the snapshots of the agents until end_time.
+
+        :returns: why the run must stop before end_time, or None
+        """
+        now = time.time()
+        next_snapshot = now + self.conf.metrics_interval
+        next_check = now + watcher.interval
+        while True:
+            now = time.time()
+            if now >= end_time:
+                return None
+            timeout = min(end_time, next_snapshot, next_check) - now
+            try:
+                index, message = self._messages.get(timeout=max(0, timeout))
+            except Queue.Empty:
+                pass
+            else:
+                if isinstance(message, Exception):
+                    self._lose(index, message)
+                    return AGENT_LOST
+                if message['type'] == 'snapshot':
+                    self._snapshots[index] = message['snapshot']
+                else:
+                    self._lose(index, "unexpected %s" % message['type'])
+                    return AGENT_LOST
+            now = time.time()
+            if now >= next_snapshot:
+                next_snapshot += self.conf.metrics_interval
+                self._write_snapshot(snapshot_path)
+            if now >= next_check:
+                next_check += watcher.interval
+                if watcher.has_errors():
+                    return LOG_ERRORS
+
+    def _collect_reports(self):
+        """Return the reports of the agents that are still there."""
+        reports = {}
+        deadline = time.time() + self.conf.agent_timeout
+        waiting = set(xrange(len(self.channels))) - self.lost
+        while waiting:
+            try:
+                index, message = self._messages.get(
+                    timeout=max(0, deadline - time.time()))
+            except Queue.Empty:
+                for index in waiting:
+                    self._lose(index, "no report")
+                break
+            if isinstance(message, Exception):
+                self._lose(index, message)
+            elif message['type'] == 'report':
+                reports[index] = message['report']
+            elif message['type'] == 'snapshot':
+                self._snapshots[index] = message['snapshot']
+                continue
+            else:
+                self._lose(index, "unexpected %s" % message['type'])
+            waiting.discard(index)
+        return [report for _, report in sorted(reports.items())]
+
+    def merge(self, reports):
+        """Return the report of the whole run from those of the agents."""
+        report = stats.merge_reports(reports)
+        report['agents'] = len(self.agents)
+        report['lost_agents'] = sorted(self.channels[index].name
+                                       for index in self.lost)
+        summaries = collections.OrderedDict()
+        curves = collections.OrderedDict()
+        for agent_report in reports:
+            for summary in agent_report.get('open_loop', []):
+                summaries.setdefault(summary['action'], []).append(summary)
+            for curve in agent_report.get('load_curves', []):
+                curves.setdefault(curve['action'], []).append(curve)
+        if summaries:
+            report['open_loop'] = [arrivals.merge_summaries(action_summaries)
+                                   for action_summaries in summaries.values()]
+        if curves:
+            tests = dict((driver.action_name(test), test)
+                         for test in self.tests)
+            report['load_curves'] = []
+            for action, action_curves in curves.items():
+                test = tests[action]
+                parameter = action_curves[0]['parameter']
+                curve = profiles.LoadCurve.merge(
+                    [action_curve['points'] for action_curve in action_curves])
+                report['load_curves'].append({
+                    'action': action,
+                    'parameter': parameter,
+                    'profile': test[parameter],
+                    'points': curve.report(),
+                    'knee': curve.knee(**driver.knee_thresholds(test,
+                                                                self.conf)),
+                })
+        return report
+
+    def run(self, duration=None, report_path=None, snapshot_path=None):
+        """Run the tests on the agents, see driver.stress_openstack()."""
+        watcher = driver.LogWatcher()
+        watcher.clear()
+        timeout = self.conf.agent_timeout
+        self.channels = [Channel.connect(address, timeout)
+                         for address in self.agents]
+        try:
+            for channel, tests in zip(self.channels,
+                                      split_tests(self.tests,
+                                                  len(self.channels))):
+                channel.send('prepare', tests=tests, token=self.token)
+            for channel in self.channels:
+                channel.expect('ready')
+            if duration is None:
+                duration = driver.default_duration(self.tests)
+            for channel in self.channels:
+                channel.send('start')
+            started_at = time.time()
+            for index, channel in enumerate(self.channels):
+                reader = threading.Thread(target=self._read,
+                                          args=(index, channel))
+                reader.daemon = True
+                reader.start()
+            stopped = self._watch(started_at + duration, watcher,
+                                  snapshot_path)
+            for index, channel in enumerate(self.channels):
+                if index not in self.lost:
+                    try:
+                        channel.send('stop')
+                    except socket.error as e:
+                        self._lose(index, e)
+            reports = self._collect_reports()
+            # NOTE: agents send a last snapshot before their report
+            self._write_snapshot(snapshot_path)
+        finally:
+            for channel in self.channels:
+                channel.close()
+        if not reports:
+            raise exceptions.StressAgentError(agent='*',
+                                              reason="no agent reported")
+        report = self.merge(reports)
+        report['stopped'] = stopped
+        driver.log_report(report)
+        if report_path:
+            driver.write_report(report, report_path)
+        if stopped != LOG_ERRORS:
+            LOG.info("cleaning up")
+            cleanup.cleanup()
+        return report
+
+
+def coordinate(tests, agents=(), local_agents=0, duration=None,
+               report_path=None, snapshot_path=None):
+    """Run tests on agents and on local_agents started for the run.
+
+    The agents given are sent the ``agent_token`` of the [stress] section of
+    tempest.conf, the local agents too if there are such agents, else a
+    token of their own.
+    """
+    conf = driver.admin_manager.config.stress
+    agents = list(agents)
+    token = conf.agent_token
+    if not token:
+        if agents:
+            raise exceptions.InvalidConfiguration(
+                "agent_token must be set in the [stress] section to run "
+                "tests on remote agents")
+        token = new_token()
+    processes = []
+    if local_agents:
+        addresses, processes = start_local_agents(local_agents, token)
+        agents.extend(addresses)
+    try:
+        return Coordinator(agents, tests, token).run(duration, report_path,
+                                                     snapshot_path)
+    finally:
+        for process in processes:
+            process.join(conf.agent_timeout)
+            if process.is_alive():
+                process.terminate()
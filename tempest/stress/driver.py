@@ -12,7 +12,9 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import functools
 import importlib
+import json
 import logging
 import multiprocessing
 import time
@@ -21,10 +23,17 @@ from tempest import clients
 from tempest.common import ssh
 from tempest.common.utils.data_utils import rand_name
 from tempest import exceptions
+from tempest.stress import arrivals
 from tempest.stress import cleanup
+from tempest.stress import engines
+from tempest.stress import profiles
+from tempest.stress import stats
 
 admin_manager = clients.AdminManager()
 
+# Seconds a run lasts when neither asked nor set by a load profile
+DEFAULT_DURATION = 300
+
 # setup logging to file
 logging.basicConfig(
     format='%(asctime)s %(process)d %(name)-20s %(levelname)-8s %(message)s',
@@ -98,59 +107,314 @@ def get_action_function(path):
     return getattr(importlib.import_module(module_part), function)
 
 
-def stress_openstack(tests, duration):
+def action_name(test):
+    """The name an action reports its events under."""
+    return test.get('name') or test['action'].rpartition('.')[2]
+
+
+def _run_worker(target, reporter, manager, kwargs, tasks=None, users=1,
+                engine=engines.THREAD):
+    stats.set_reporter(reporter)
+
+    def user(tasks):
+        try:
+            if tasks is None:
+                target(manager, logger, **kwargs)
+            else:
+                arrivals.serve(target, manager, logger, tasks, reporter,
+                               kwargs)
+        except stats.Stopped:
+            pass
+
+    engines.run_users(user, users, engine, reporter, tasks)
+
+
+def _stop_workers(processes, stop_event, timeout):
+    # NOTE: workers end at their next step, so that none is killed while
+    # it sends an event, which could leave the queue unreadable. The ones
+    # still busy after timeout are terminated.
+    stop_event.set()
+    deadline = time.time() + timeout
+    for p in processes:
+        p.join(max(0, deadline - time.time()))
+    for p in processes:
+        if p.is_alive():
+            p.terminate()
+
+
+def _start_worker(test, manager, events, stop_event, tasks=None,
+                  retire_event=None):
+    """Start a worker process of test and return it."""
+    engine = test.get('engine', admin_manager.config.stress.engine)
+    if test.get('use_isolated_tenants', False):
+        username = rand_name("stress_user")
+        tenant_name = rand_name("stress_tenant")
+        password = "pass"
+        identity_client = admin_manager.identity_client
+        _, tenant = identity_client.create_tenant(name=tenant_name)
+        identity_client.create_user(username,
+                                    password,
+                                    tenant['id'],
+                                    "email")
+        manager = clients.Manager(username=username,
+                                  password="pass",
+                                  tenant_name=tenant_name)
+    target = get_action_function(test['action'])
+    reporter = stats.Reporter(events, action_name(test), stop_event,
+                              retire_event)
+    p = multiprocessing.Process(target=_run_worker,
+                                args=(target, reporter, manager,
+                                      test.get('kwargs', {}), tasks,
+                                      test.get('users', 1), engine))
+    p.start()
+    return p
+
+
+def knee_thresholds(test, conf):
+    """Return the knee() thresholds of test, see profiles.LoadCurve."""
+    knee = test.get('knee', {})
+    return {
+        'error_rate': knee.get('error_rate', conf.knee_error_rate),
+        'p95_ms': knee.get('p95_ms', conf.knee_p95_ms),
+        'latency_factor': knee.get('latency_factor',
+                                   conf.knee_latency_factor),
+    }
+
+
+def _report_knee(name, parameter, knee):
+    if knee is None:
+        logger.info("%s: no saturation point found" % name)
+        return
+    logger.warning("%s: saturated at %s %s, %s of step %s is %.3f, beyond "
+                   "%.3f; last level below: %s" %
+                   (name, parameter, knee['level'], knee['metric'],
+                    knee['step'], knee['value'], knee['threshold'],
+                    knee['last_good_level']))
+
+
+def default_duration(tests):
+    """Return the length of the longest load profile of tests, if any."""
+    lengths = []
+    for test in tests:
+        for parameter in ('threads', 'rate'):
+            if isinstance(test.get(parameter), dict):
+                profile = profiles.load_profile(test[parameter])
+                if profile.duration:
+                    lengths.append(profile.duration)
+    return max(lengths) if lengths else DEFAULT_DURATION
+
+
+class StressRun(object):
+
+    """The workers of the tests of a run and the collection of their events.
+
+    A run is prepared, i.e. its fixed workers started, then started, i.e.
+    its arrivals and load profiles, and finally stopped.
+
+    :param listener: callable the periodic snapshots are also passed to
+    :param histograms: whether snapshots carry their latency histograms
+    """
+
+    def __init__(self, tests, snapshot_path=None, listener=None,
+                 histograms=False):
+        self.tests = tests
+        self.conf = admin_manager.config.stress
+        self.events = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.aggregator = stats.Aggregator(self.events,
+                                           self.conf.metrics_window,
+                                           self.conf.metrics_interval,
+                                           snapshot_path, listener,
+                                           histograms)
+        self.processes = []
+        self.dispatchers = []
+        self.scalers = []
+        # (action name, test, profiled parameter, LoadCurve)
+        self.curves = []
+        self.started_at = None
+
+    def prepare(self):
+        """Start the fixed workers of every test."""
+        conf = self.conf
+        events = self.events
+        stop_event = self.stop_event
+        self.aggregator.start()
+        for test in self.tests:
+            name = action_name(test)
+            engines.check_engine(test.get('engine', conf.engine))
+            # The fraction of the load of the test run here, see
+            # tempest.stress.distributed
+            share = test.get('load_share', 1)
+            if test.get('use_admin', False):
+                manager = admin_manager
+            else:
+                manager = clients.Manager()
+            tasks = None
+            threads = test.get('threads', 1)
+            if 'rate' in test:
+                tasks = multiprocessing.Queue()
+                rate = test['rate']
+                if isinstance(rate, dict):
+                    rate = profiles.load_profile(rate)
+                    self.curves.append((name, test, 'rate',
+                                        profiles.LoadCurve(rate, None,
+                                                           share=share)))
+                self.dispatchers.append(arrivals.Dispatcher(
+                    name, tasks, rate, test.get('arrival', arrivals.CONSTANT),
+                    test.get('max_backlog', conf.max_backlog),
+                    stats.Reporter(events, name)))
+            if isinstance(threads, dict):
+                profile = profiles.load_profile(threads)
+                if not isinstance(test.get('rate'), dict):
+                    self.curves.append((name, test, 'threads',
+                                        profiles.LoadCurve(profile, None,
+                                                           discrete=True,
+                                                           share=share)))
+                self.scalers.append(profiles.Scaler(
+                    name, profile, functools.partial(_start_worker, test,
+                                                     manager, events,
+                                                     stop_event, tasks)))
+            else:
+                for _ in xrange(threads):
+                    self.processes.append(_start_worker(test, manager,
+                                                        events, stop_event,
+                                                        tasks))
+
+    def start(self):
+        """Start the arrivals and the load profiles."""
+        # NOTE: arrivals are only scheduled, and profiles started, once
+        # every fixed worker is up, so that the time it takes to start them
+        # isn't counted as queueing delay or shifts the profiles
+        self.started_at = time.time()
+        for name, _, _, curve in self.curves:
+            curve.started_at = self.started_at
+            self.aggregator.add_curve(name, curve)
+        for thread in self.dispatchers + self.scalers:
+            thread.started_at = self.started_at
+            thread.start()
+
+    def stop(self):
+        """Stop every worker and collect their last events."""
+        for thread in self.dispatchers + self.scalers:
+            thread.stop()
+        for scaler in self.scalers:
+            self.processes.extend(scaler.processes())
+        _stop_workers(self.processes, self.stop_event, self.conf.stop_timeout)
+        self.aggregator.stop()
+        self.aggregator.write_snapshot(self.aggregator.snapshot())
+
+    def report(self):
+        """Return the report of the run, see stats.Aggregator.report()."""
+        sections = {}
+        if self.dispatchers:
+            sections['open_loop'] = [d.summary() for d in self.dispatchers]
+        if self.curves:
+            sections['load_curves'] = [
+                {
+                    'action': name,
+                    'parameter': parameter,
+                    'profile': test[parameter],
+                    'points': curve.report(),
+                    'knee': curve.knee(**knee_thresholds(test, self.conf)),
+                } for name, test, parameter, curve in self.curves]
+        return self.aggregator.report(**sections)
+
+
+def log_report(report):
+    """Log the saturation and memory figures of a run report."""
+    for summary in report.get('open_loop', []):
+        if summary['saturated']:
+            logger.warning("%(action)s couldn't keep up from "
+                           "%(saturated_rate).2f ops/s on: %(dropped)d "
+                           "of %(arrivals)d arrivals dropped, %(unserved)d "
+                           "unserved" % summary)
+    for curve in report.get('load_curves', []):
+        _report_knee(curve['action'], curve['parameter'], curve['knee'])
+    for memory in report['memory']:
+        logger.info("%(action)s: %(users)d users in %(processes)d processes,"
+                    " %(kb_per_user).0f kB per user" % memory)
+
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info("stress report written to %s" % path)
+
+
+class LogWatcher(object):
+
+    """Checks the logs of the cloud for errors, if configured to."""
+
+    def __init__(self):
+        conf = admin_manager.config.stress
+        self.logfiles = conf.target_logfiles
+        self.interval = int(conf.log_check_interval)
+        self.computes = []
+        if self.logfiles:
+            self.computes = _get_compute_nodes(conf.target_controller)
+
+    def clear(self):
+        """Remove the logs, so that only the errors of the run are seen."""
+        for node in self.computes:
+            do_ssh("rm -f %s" % self.logfiles, node)
+
+    def has_errors(self):
+        if not self.logfiles:
+            return False
+        return bool(_error_in_logs(self.logfiles, self.computes))
+
+    def wait(self, end_time):
+        """Wait until end_time, return True if errors are found before."""
+        while True:
+            remaining = end_time - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, self.interval))
+            if self.has_errors():
+                return True
+
+
+def stress_openstack(tests, duration=None, report_path=None,
+                     snapshot_path=None):
     """
     Workload driver. Executes an action function against a nova-cluster.
 
+    By default every worker of a test runs its action function, which
+    loops until the end of the run (closed loop). A test with a ``rate``
+    (invocations per second) is run open loop instead: its action function
+    performs a single invocation, which a Dispatcher schedules ``rate``
+    times per second, with ``arrival`` 'constant' or 'poisson' spacing, for
+    its workers to serve; see tempest.stress.arrivals. With ``users``,
+    every worker process runs that many such users rather than one, as
+    threads or greenthreads depending on ``engine``; see
+    tempest.stress.engines.
+
+    The ``threads`` or the ``rate`` of a test may also follow a load
+    profile, see tempest.stress.profiles, in which case the latency and
+    errors of the action are analysed against the load to find the level
+    at which the cloud saturates. The run lasts duration seconds, by
+    default as long as the longest profile.
+
+    The steps of the actions are timed, see tempest.stress.stats. Their
+    rolling metrics are logged, and appended to snapshot_path if given,
+    periodically; the totals of the run are written to report_path.
+
+    The run stops early if errors are found in the logs of the cloud, in
+    which case the resources it created are left for investigation.
     """
-    logfiles = admin_manager.config.stress.target_logfiles
-    log_check_interval = int(admin_manager.config.stress.log_check_interval)
-    if logfiles:
-        controller = admin_manager.config.stress.target_controller
-        computes = _get_compute_nodes(controller)
-        for node in computes:
-            do_ssh("rm -f %s" % logfiles, node)
-    processes = []
-    for test in tests:
-        if test.get('use_admin', False):
-            manager = admin_manager
-        else:
-            manager = clients.Manager()
-        for _ in xrange(test.get('threads', 1)):
-            if test.get('use_isolated_tenants', False):
-                username = rand_name("stress_user")
-                tenant_name = rand_name("stress_tenant")
-                password = "pass"
-                identity_client = admin_manager.identity_client
-                _, tenant = identity_client.create_tenant(name=tenant_name)
-                identity_client.create_user(username,
-                                            password,
-                                            tenant['id'],
-                                            "email")
-                manager = clients.Manager(username=username,
-                                          password="pass",
-                                          tenant_name=tenant_name)
-            target = get_action_function(test['action'])
-            p = multiprocessing.Process(target=target,
-                                        args=(manager, logger),
-                                        kwargs=test.get('kwargs', {}))
-            processes.append(p)
-            p.start()
-    end_time = time.time() + duration
-    had_errors = False
-    while True:
-        remaining = end_time - time.time()
-        if remaining <= 0:
-            break
-        time.sleep(min(remaining, log_check_interval))
-        if not logfiles:
-            continue
-        errors = _error_in_logs(logfiles, computes)
-        if errors:
-            had_errors = True
-            break
-    for p in processes:
-        p.terminate()
+    watcher = LogWatcher()
+    watcher.clear()
+    run = StressRun(tests, snapshot_path)
+    run.prepare()
+    if duration is None:
+        duration = default_duration(tests)
+    run.start()
+    had_errors = watcher.wait(run.started_at + duration)
+    run.stop()
+    report = run.report()
+    log_report(report)
+    if report_path:
+        write_report(report, report_path)
     if not had_errors:
         logger.info("cleaning up")
         cleanup.cleanup()
@@ -0,0 +1,185 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Simulated users of a worker process.
+
+A worker process runs one simulated user by default, i.e. one action loop
+or one open-loop server. With ``users`` in the stress description it runs
+that many concurrently instead, sharing its imports and its client
+manager:
+
+* with the 'thread' engine each user is an OS thread,
+* with the 'eventlet' engine each user is a greenthread; the process is
+  monkey patched, so that the HTTP requests of a user, its sleeps and its
+  locks yield to the others. This needs eventlet to be installed.
+
+Workers also report the memory they use every MEMORY_INTERVAL seconds,
+so that the memory per simulated user of both models can be compared.
+"""
+
+import logging
+import Queue
+import resource
+import threading
+import time
+
+try:
+    import eventlet
+    import eventlet.queue
+except ImportError:
+    eventlet = None
+
+from tempest.common import connection_pool
+
+LOG = logging.getLogger(__name__)
+
+THREAD = 'thread'
+EVENTLET = 'eventlet'
+ENGINES = (THREAD, EVENTLET)
+
+# Seconds between two memory samples of a worker
+MEMORY_INTERVAL = 5
+
+# Seconds between two polls of the invocation queue by greenthreads
+POLL_INTERVAL = 0.01
+
+
+def check_engine(engine):
+    if engine not in ENGINES:
+        raise ValueError("Unknown stress engine %s, expected one of %s"
+                         % (engine, ', '.join(ENGINES)))
+    if engine == EVENTLET and eventlet is None:
+        raise ValueError("The eventlet stress engine needs eventlet")
+
+
+def memory_kb():
+    """Return the memory used by this process, in kB.
+
+    This is the proportional set size where the kernel provides it, which
+    splits the pages a forked worker still shares with the driver between
+    them, or else the resident set size.
+    """
+    for path, field in (('/proc/self/smaps_rollup', 'Pss:'),
+                        ('/proc/self/status', 'VmRSS:')):
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith(field):
+                        return int(line.split()[1])
+        except (IOError, ValueError):
+            pass
+    # NOTE: the peak rather than the current size, in kB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _sample_memory(reporter, users, base_kb):
+    while not reporter.stopping():
+        reporter.record_memory(users, base_kb, memory_kb())
+        time.sleep(MEMORY_INTERVAL)
+
+
+def _run_user(user, index, tasks, reporter):
+    try:
+        user(tasks)
+    except Exception:
+        LOG.exception("User %d of %s failed", index, reporter.action)
+
+
+class _GreenTasks(object):
+
+    """The invocation queue of a process, for its greenthreads.
+
+    Getting from a multiprocessing.Queue blocks the whole process, so a
+    single greenthread polls it, and only while some user is waiting.
+    """
+
+    def __init__(self, tasks, reporter):
+        self.tasks = tasks
+        self.reporter = reporter
+        self._queue = eventlet.queue.LightQueue()
+        eventlet.spawn_n(self._feed)
+
+    def _feed(self):
+        while not self.reporter.stopping():
+            if not self._queue.getting():
+                eventlet.sleep(POLL_INTERVAL)
+                continue
+            try:
+                self._queue.put(self.tasks.get_nowait())
+            except Queue.Empty:
+                eventlet.sleep(POLL_INTERVAL)
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except eventlet.queue.Empty:
+            raise Queue.Empty()
+
+
+def _run_threads(user, count, reporter, tasks, base_kb):
+    reporter.record_memory(count, base_kb, base_kb)
+    sampler = threading.Thread(target=_sample_memory,
+                               args=(reporter, count, base_kb))
+    sampler.daemon = True
+    sampler.start()
+    if count == 1:
+        user(tasks)
+        return
+    threads = [threading.Thread(target=_run_user,
+                                args=(user, index, tasks, reporter))
+               for index in xrange(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _run_green(user, count, reporter, tasks, base_kb):
+    eventlet.monkey_patch()
+    # NOTE: the pool may have been created by the driver before the fork,
+    # with locks that would block every greenthread of the process. The
+    # same goes for the condition the queue of events hands events to its
+    # feeder thread with, which is recreated as after a fork, so that the
+    # feeder is a greenthread too.
+    connection_pool.reset_pool()
+    reporter.queue._after_fork()
+    reporter.record_memory(count, base_kb, base_kb)
+    if tasks is not None:
+        tasks = _GreenTasks(tasks, reporter)
+    eventlet.spawn_n(_sample_memory, reporter, count, base_kb)
+    pool = eventlet.GreenPool(count)
+    for index in xrange(count):
+        pool.spawn_n(_run_user, user, index, tasks, reporter)
+    pool.waitall()
+
+
+def run_users(user, count, engine, reporter, tasks=None):
+    """Run count users in this process and return once they are all over.
+
+    :param user: callable running a user, taking the queue of invocations
+                 to serve (see arrivals.serve) or None for closed loop
+    :param reporter: the stats.Reporter of the process
+    :param tasks: the multiprocessing.Queue of invocations of an open-loop
+                  test, or None
+    """
+    check_engine(engine)
+    base_kb = memory_kb()
+    if engine == EVENTLET:
+        _run_green(user, count, reporter, tasks, base_kb)
+    else:
+        _run_threads(user, count, reporter, tasks, base_kb)
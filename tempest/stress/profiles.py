@@ -0,0 +1,401 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Load profiles and saturation point detection.
+
+The ``threads`` of a test in the stress description, or its ``rate`` when
+it is run open loop, may be a load profile rather than a number, e.g.::
+
+    {"type": "ramp", "start": 1, "end": 20, "duration": 600}
+    {"type": "step", "start": 2, "end": 20, "step": 2, "interval": 120}
+    {"type": "spike", "base": 5, "peak": 50, "at": 300, "length": 60}
+    {"type": "soak", "level": 10, "duration": 3600}
+
+A profile gives the load level, a number of workers or of invocations per
+second, as a function of the time elapsed since the start of the run.
+
+The events of an action with a profile are also counted in a LoadCurve,
+by the load level offered when they started, so that the latency and
+errors of each step can be compared across levels. The knee of the curve
+is the lowest level at which the error rate or the p95 latency of a step
+crosses its threshold: the load the cloud can take is below it.
+"""
+
+import logging
+import math
+import multiprocessing
+import threading
+import time
+
+from tempest.common import metrics
+from tempest.stress import stats
+
+LOG = logging.getLogger(__name__)
+
+# Events a load curve point needs before its figures are trusted
+MIN_SAMPLES = 5
+
+# p95 latency growth in ms too small to be a saturation sign, whatever the
+# factor, e.g. for steps that take a millisecond when the cloud keeps up
+MIN_GROWTH_MS = 10
+
+
+class Profile(object):
+
+    """Load level as a function of the seconds elapsed since the start."""
+
+    # Seconds after which the level doesn't change any more, if any
+    duration = None
+
+    def level(self, elapsed):
+        raise NotImplementedError()
+
+    def bucket(self, level):
+        """Return the load curve point level is counted in."""
+        return level
+
+
+class Ramp(Profile):
+
+    """Linear ramp from start to end over duration seconds, then end.
+
+    :param resolution: the width of the load curve points, by default a
+                       tenth of the ramp
+    """
+
+    def __init__(self, start, end, duration, resolution=None):
+        if duration <= 0:
+            raise ValueError("The duration of a ramp must be positive")
+        self.start = start
+        self.end = end
+        self.duration = duration
+        self.resolution = resolution or abs(end - start) / 10.0 or 1
+
+    def bucket(self, level):
+        """Round level to the nearest start + n * resolution.
+
+        The level of a ramp changes continuously, this keeps its load curve
+        down to a few points.
+        """
+        steps = round((level - self.start) / float(self.resolution))
+        return self.start + steps * self.resolution
+
+    def level(self, elapsed):
+        if elapsed >= self.duration:
+            return self.end
+        return self.start + ((self.end - self.start) * elapsed /
+                             float(self.duration))
+
+
+class Step(Profile):
+
+    """From start to end by step every interval seconds, then end."""
+
+    def __init__(self, start, end, step, interval):
+        if not step or (end - start) * step < 0:
+            raise ValueError("The step of a step profile must lead from %s "
+                             "to %s, not %s" % (start, end, step))
+        if interval <= 0:
+            raise ValueError("The interval of a step profile must be "
+                             "positive")
+        self.start = start
+        self.end = end
+        self.step = step
+        self.interval = interval
+        steps = int(math.ceil((end - start) / float(step)))
+        self.duration = (steps + 1) * interval
+
+    def level(self, elapsed):
+        level = self.start + self.step * int(elapsed // self.interval)
+        if self.step > 0:
+            return min(level, self.end)
+        return max(level, self.end)
+
+
+class Spike(Profile):
+
+    """base, except peak for length seconds from at seconds on."""
+
+    def __init__(self, base, peak, at, length):
+        if length <= 0:
+            raise ValueError("The length of a spike must be positive")
+        self.base = base
+        self.peak = peak
+        self.at = at
+        self.length = length
+
+    def level(self, elapsed):
+        if self.at <= elapsed < self.at + self.length:
+            return self.peak
+        return self.base
+
+
+class Soak(Profile):
+
+    """The same level all along, for duration seconds if given."""
+
+    def __init__(self, level, duration=None):
+        self.constant = level
+        self.duration = duration
+
+    def level(self, elapsed):
+        return self.constant
+
+
+PROFILES = {
+    'ramp': Ramp,
+    'step': Step,
+    'spike': Spike,
+    'soak': Soak,
+}
+
+# The fields of profile descriptions that are load levels
+LEVEL_FIELDS = ('start', 'end', 'step', 'resolution', 'base', 'peak',
+                'level')
+
+
+def load_profile(spec):
+    """Return the Profile described by spec, a number or a dict.
+
+    A number is a constant level.
+
+    :raises ValueError: if spec isn't a valid profile
+    """
+    if isinstance(spec, (int, long, float)):
+        return Soak(spec)
+    spec = dict(spec)
+    kind = spec.pop('type', None)
+    if kind not in PROFILES:
+        raise ValueError("Unknown load profile type %s, expected one of %s"
+                         % (kind, ', '.join(sorted(PROFILES))))
+    try:
+        return PROFILES[kind](**spec)
+    except TypeError as e:
+        raise ValueError("Invalid %s profile %s: %s" % (kind, spec, e))
+
+
+def scale(spec, factor):
+    """Return the profile description spec with its levels times factor.
+
+    spec may also be a number, i.e. a constant level.
+    """
+    if isinstance(spec, (int, long, float)):
+        return spec * factor
+    return dict((key, value * factor if key in LEVEL_FIELDS else value)
+                for key, value in spec.items())
+
+
+def workers(profile, elapsed):
+    """Return the number of workers profile asks for after elapsed."""
+    return max(0, int(round(profile.level(elapsed))))
+
+
+class Scaler(threading.Thread):
+
+    """Keeps the number of workers of a test at the level of its profile.
+
+    Workers beyond the level are asked to retire, which they do at their
+    next step, see stats.Reporter.
+
+    :param start_worker: callable taking the retire event of a new worker,
+                         a multiprocessing.Event, and returning its started
+                         multiprocessing.Process
+    :param interval: seconds between two checks of the level
+    """
+
+    def __init__(self, name, profile, start_worker, interval=1):
+        super(Scaler, self).__init__(name='stress-scaler-' + name)
+        self.daemon = True
+        self.profile = profile
+        self.start_worker = start_worker
+        self.interval = interval
+        self.started_at = None
+        self.active = []
+        self.retired = []
+        self.peak_workers = 0
+        self._stopping = threading.Event()
+
+    def run(self):
+        if self.started_at is None:
+            self.started_at = time.time()
+        while not self._stopping.is_set():
+            target = workers(self.profile, time.time() - self.started_at)
+            while len(self.active) < target and not self._stopping.is_set():
+                retire_event = multiprocessing.Event()
+                process = self.start_worker(retire_event)
+                self.active.append((process, retire_event))
+            while len(self.active) > target:
+                process, retire_event = self.active.pop()
+                retire_event.set()
+                self.retired.append(process)
+            self.peak_workers = max(self.peak_workers, len(self.active))
+            # NOTE: is_alive() also reaps the retired workers that are over
+            self.retired = [p for p in self.retired if p.is_alive()]
+            self._stopping.wait(self.interval)
+
+    def stop(self):
+        self._stopping.set()
+        self.join()
+
+    def processes(self):
+        """Return every worker process still running."""
+        return [p for p, _ in self.active] + self.retired
+
+
+class _Point(object):
+
+    def __init__(self):
+        # Latencies of the successful steps, in microseconds
+        self.latency = metrics.Histogram()
+        self.count = 0
+        self.errors = 0
+
+    def add(self, event):
+        self.count += 1
+        if event.outcome == stats.OK:
+            self.latency.record((event.end - event.start) * 1e6)
+        else:
+            self.errors += 1
+
+    def error_rate(self):
+        return float(self.errors) / self.count if self.count else 0.0
+
+    def p95_ms(self):
+        p95 = self.latency.percentile(95)
+        return None if p95 is None else p95 / 1e3
+
+
+class LoadCurve(object):
+
+    """Latency and errors of the steps of an action by offered load level.
+
+    :param started_at: the time the profile started
+    :param discrete: whether the levels are numbers of workers, which are
+                     rounded as by Scaler
+    :param share: the fraction of the whole load profile describes, the
+                  levels of the curve are those of the whole load
+    """
+
+    def __init__(self, profile, started_at, discrete=False, share=1):
+        self.profile = profile
+        self.started_at = started_at
+        self.discrete = discrete
+        self.share = share
+        self.points = {}
+
+    @classmethod
+    def merge(cls, reports):
+        """Return the curve made of the points of several curve reports.
+
+        Only the points are merged, which is enough for knee().
+        """
+        curve = cls(None, None)
+        for report in reports:
+            for entry in report:
+                key = (entry['level'], entry['step'])
+                point = curve.points.get(key)
+                if point is None:
+                    point = curve.points[key] = _Point()
+                point.count += entry['count']
+                point.errors += entry['errors']
+                point.latency.merge(
+                    metrics.Histogram.from_dict(entry['latency_us']))
+        return curve
+
+    def level_at(self, when):
+        elapsed = max(0, when - self.started_at)
+        if self.discrete:
+            level = int(round(self.profile.bucket(
+                workers(self.profile, elapsed))))
+        else:
+            level = self.profile.bucket(self.profile.level(elapsed))
+        if self.share != 1:
+            # NOTE: rounded so that the shares of a level, e.g. 54.5 / 3
+            # and back, end up in the same point
+            return round(level / float(self.share), 6)
+        return level
+
+    def add(self, event):
+        key = (self.level_at(event.start), event.step)
+        point = self.points.get(key)
+        if point is None:
+            point = self.points[key] = _Point()
+        point.add(event)
+
+    def report(self):
+        """Return the figures of every level and step, by level."""
+        report = []
+        for (level, step), point in sorted(self.points.items()):
+            latency = [point.latency.percentile(p) for p in (50, 95, 99)]
+            report.append({
+                'level': level,
+                'step': step,
+                'count': point.count,
+                'errors': point.errors,
+                'error_rate': point.error_rate(),
+                'latency_ms': dict(zip(
+                    ('p50', 'p95', 'p99'),
+                    [None if l is None else l / 1e3 for l in latency])),
+                'latency_us': point.latency.to_dict(),
+            })
+        return report
+
+    def knee(self, error_rate=None, p95_ms=None, latency_factor=None,
+             min_samples=MIN_SAMPLES):
+        """Return the lowest level at which a step crosses a threshold.
+
+        :param error_rate: the error rate beyond which a step fails
+        :param p95_ms: the p95 latency in ms beyond which a step fails
+        :param latency_factor: a step also fails when its p95 latency grows
+                               beyond latency_factor times its p95 at the
+                               lowest level, and by MIN_GROWTH_MS at least
+        :param min_samples: points with fewer events are ignored
+        :returns: a dict with the level, the step, what crossed which
+                  threshold and the highest level below, or None if no
+                  threshold was crossed
+        """
+        baseline = {}
+        last_good = None
+        for level in sorted(set(level for level, _ in self.points)):
+            checked = False
+            for step in sorted(s for l, s in self.points if l == level):
+                point = self.points[(level, step)]
+                if point.count < min_samples:
+                    continue
+                checked = True
+                p95 = point.p95_ms()
+                crossed = None
+                if error_rate is not None and point.error_rate() > error_rate:
+                    crossed = ('error_rate', point.error_rate(), error_rate)
+                elif p95 is not None:
+                    if p95_ms and p95 > p95_ms:
+                        crossed = ('p95_ms', p95, p95_ms)
+                    elif latency_factor and step in baseline:
+                        limit = max(baseline[step] * latency_factor,
+                                    baseline[step] + MIN_GROWTH_MS)
+                        if p95 > limit:
+                            crossed = ('p95_growth', p95, limit)
+                    baseline.setdefault(step, p95)
+                if crossed:
+                    metric, value, threshold = crossed
+                    return {'level': level, 'step': step, 'metric': metric,
+                            'value': value, 'threshold': threshold,
+                            'last_good_level': last_good}
+            if checked:
+                last_good = level
+        return None
@@ -19,16 +19,53 @@
 import argparse
 import json
 
+from tempest.stress import distributed
 from tempest.stress import driver
 
 
+def _agent_addresses(value):
+    return [distributed.parse_address(address, 'localhost')
+            for address in value.split(',')]
+
+
 def main(ns):
+    if ns.agent:
+        token = driver.admin_manager.config.stress.agent_token
+        if not token:
+            parser.error("agent_token must be set in the [stress] section "
+                         "of tempest.conf to run as an agent")
+        listener = distributed.listen(distributed.parse_address(ns.agent))
+        distributed.serve_agent(listener, token)
+        return
+    if not ns.tests:
+        parser.error("a test description is needed unless run as an agent")
     tests = json.load(open(ns.tests, 'r'))
-    driver.stress_openstack(tests, ns.duration)
+    if ns.agents or ns.local_agents:
+        distributed.coordinate(tests, ns.agents, ns.local_agents,
+                               ns.duration, ns.report, ns.snapshots)
+    else:
+        driver.stress_openstack(tests, ns.duration, ns.report, ns.snapshots)
 
 
 parser = argparse.ArgumentParser(description='Run stress tests. ')
-parser.add_argument('-d', '--duration', default=300, type=int,
-                    help="Duration of test.")
-parser.add_argument('tests', help="Name of the file with test description.")
+parser.add_argument('-d', '--duration', type=int,
+                    help="Duration of test, by default the length of the "
+                         "longest load profile, or 300 seconds.")
+parser.add_argument('-r', '--report', default='stress-report.json',
+                    help="JSON file the metrics of the run are written to.")
+parser.add_argument('-s', '--snapshots',
+                    help="File the periodic metric snapshots are appended "
+                         "to, as JSON lines.")
+parser.add_argument('--agent', metavar='[HOST:]PORT',
+                    help="Run as an agent, running the tests coordinators "
+                         "connecting to this address send. HOST defaults to "
+                         "127.0.0.1.")
+parser.add_argument('--agents', metavar='HOST:PORT[,HOST:PORT...]',
+                    type=_agent_addresses, default=[],
+                    help="Split the tests between these agents.")
+parser.add_argument('--local-agents', metavar='N', type=int, default=0,
+                    help="Split the tests between N agents started on this "
+                         "host, and the agents given with --agents if any.")
+parser.add_argument('tests', nargs='?',
+                    help="Name of the file with test description.")
 main(parser.parse_args())
@@ -0,0 +1,501 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Metrics of stress actions.
+
+Stress actions report every step they go through (e.g. 'create' from the
+request to the server being ACTIVE) as an Event, through the Reporter of
+their worker process. Events are sent over a multiprocessing queue to the
+Aggregator thread of the driver, which keeps per (action, step):
+
+* the latency histogram and error count of the whole run,
+* the events of the last ``window`` seconds, for rolling ops/s, error rate
+  and latency percentiles.
+
+Worker processes also send Memory samples, see tempest.stress.engines.
+
+The rolling figures are logged and appended as JSON lines to a snapshot
+file every ``interval`` seconds, and the totals are written as a JSON
+report at the end of the run. Reports, and snapshots if asked, carry
+latency histograms, so that those of several drivers can be merged, see
+merge_snapshots() and merge_reports().
+"""
+
+import collections
+import contextlib
+import json
+import logging
+import os
+import Queue
+import threading
+import time
+
+from tempest.common import metrics
+
+LOG = logging.getLogger(__name__)
+
+OK = 'ok'
+ERROR = 'error'
+
+# What a worker process reports, see Reporter
+_reporter = None
+
+
+class Event(collections.namedtuple('Event', 'action step start end '
+                                            'outcome error')):
+
+    """A step of an action, from start to end (UNIX times).
+
+    :param outcome: OK or ERROR
+    :param error: the name of the exception class of an ERROR
+    """
+
+
+class Memory(collections.namedtuple('Memory', 'action pid users base_kb '
+                                              'kb')):
+
+    """Memory used by a worker process running users simulated users.
+
+    :param base_kb: the memory it used before starting them
+    """
+
+
+class Stopped(Exception):
+
+    """Raised in a worker by Reporter.step() once the run is over."""
+
+
+class Reporter(object):
+
+    """Sends the events of a worker process to the driver.
+
+    :param stop_event: multiprocessing.Event set at the end of the run
+    :param retire_event: multiprocessing.Event set when this worker alone
+                         must stop
+    """
+
+    def __init__(self, queue, action, stop_event=None, retire_event=None):
+        self.queue = queue
+        self.action = action
+        self.stop_event = stop_event
+        self.retire_event = retire_event
+
+    def record(self, step, start, end, outcome=OK, error=None):
+        self.queue.put(Event(self.action, step, start, end, outcome, error))
+
+    def record_memory(self, users, base_kb, kb):
+        self.queue.put(Memory(self.action, os.getpid(), users, base_kb, kb))
+
+    def stopping(self):
+        return any(event is not None and event.is_set()
+                   for event in (self.stop_event, self.retire_event))
+
+    @contextlib.contextmanager
+    def step(self, name):
+        """Time the enclosed block as step name.
+
+        An exception raised by the block is recorded as an error and
+        propagated. Once the driver asks workers to stop, entering a step
+        raises Stopped so that actions end between steps.
+        """
+        if self.stopping():
+            raise Stopped()
+        start = time.time()
+        try:
+            yield
+        except Stopped:
+            raise
+        except Exception as e:
+            self.record(name, start, time.time(), ERROR, type(e).__name__)
+            raise
+        self.record(name, start, time.time())
+
+
+class _NullReporter(object):
+
+    """Reporter of processes that aren't stress workers."""
+
+    def record(self, step, start, end, outcome=OK, error=None):
+        pass
+
+    def record_memory(self, users, base_kb, kb):
+        pass
+
+    def stopping(self):
+        return False
+
+    @contextlib.contextmanager
+    def step(self, name):
+        yield
+
+
+def set_reporter(reporter):
+    global _reporter
+    _reporter = reporter
+
+
+def get_reporter():
+    """Return the Reporter of this worker process.
+
+    Outside of the stress driver workers, the returned reporter discards
+    everything, so actions can run standalone.
+    """
+    return _reporter or _NullReporter()
+
+
+def _ms(value):
+    return None if value is None else value / 1e3
+
+
+class StepStats(object):
+
+    """Run totals and rolling window of an (action, step)."""
+
+    def __init__(self, window=60):
+        self.window = window
+        # Latencies of the successful steps, in microseconds
+        self.latency = metrics.Histogram()
+        self.count = 0
+        self.errors = 0
+        self.error_types = collections.defaultdict(int)
+        self.first = None
+        self.last = None
+        self._recent = collections.deque()
+
+    def add(self, event):
+        latency = (event.end - event.start) * 1e6
+        ok = event.outcome == OK
+        self.count += 1
+        if ok:
+            self.latency.record(latency)
+        else:
+            self.errors += 1
+            self.error_types[event.error or 'unknown'] += 1
+        if self.first is None or event.start < self.first:
+            self.first = event.start
+        if self.last is None or event.end > self.last:
+            self.last = event.end
+        self._recent.append((event.end, latency, ok))
+
+    def _prune(self, now):
+        while self._recent and self._recent[0][0] < now - self.window:
+            self._recent.popleft()
+
+    def rolling(self, now, started_at, histograms=False):
+        """Return the figures of the last window seconds.
+
+        :param histograms: whether to add the latency histogram
+        """
+        self._prune(now)
+        span = min(self.window, max(now - started_at, 1e-6))
+        histogram = metrics.Histogram()
+        errors = 0
+        for _, latency, ok in self._recent:
+            if ok:
+                histogram.record(latency)
+            else:
+                errors += 1
+        count = len(self._recent)
+        rolling = _rolling(count, errors, span, histogram)
+        if histograms:
+            rolling['latency_us'] = histogram.to_dict()
+        return rolling
+
+    def totals(self, duration):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'error_rate': (float(self.errors) / self.count
+                           if self.count else 0.0),
+            'ops_per_s': self.count / duration if duration else None,
+            'error_types': dict(self.error_types),
+            'latency_ms': {
+                'mean': _ms(self.latency.mean()),
+                'p50': _ms(self.latency.percentile(50)),
+                'p95': _ms(self.latency.percentile(95)),
+                'p99': _ms(self.latency.percentile(99)),
+                'max': _ms(self.latency.max),
+            },
+            'latency_us': self.latency.to_dict(),
+        }
+
+
+def _rolling(count, errors, span, histogram):
+    return {
+        'count': count,
+        'ops_per_s': count / span,
+        'error_rate': float(errors) / count if count else 0.0,
+        'latency_ms': {
+            'p50': _ms(histogram.percentile(50)),
+            'p95': _ms(histogram.percentile(95)),
+            'p99': _ms(histogram.percentile(99)),
+        },
+    }
+
+
+class Aggregator(threading.Thread):
+
+    """Collects the events of the workers in the driver.
+
+    :param queue: the multiprocessing.Queue the workers' Reporters use
+    :param window: seconds covered by the rolling figures
+    :param interval: seconds between snapshots
+    :param snapshot_path: file the snapshots are appended to, as JSON lines
+    :param listener: callable every snapshot is also passed to
+    :param histograms: whether snapshots carry their latency histograms
+    """
+
+    def __init__(self, queue, window=60, interval=10, snapshot_path=None,
+                 listener=None, histograms=False):
+        super(Aggregator, self).__init__(name='stress-aggregator')
+        self.daemon = True
+        self.queue = queue
+        self.window = window
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self.listener = listener
+        self.histograms = histograms
+        self.started_at = time.time()
+        self.stopped_at = None
+        self.stats = collections.OrderedDict()
+        # Load curves of the actions with a load profile, by action
+        self.curves = {}
+        # [users, base kB, peak kB] of the worker processes, by (action, pid)
+        self.memory = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def add(self, event):
+        if isinstance(event, Memory):
+            self._add_memory(event)
+            return
+        key = (event.action, event.step)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = StepStats(self.window)
+            stats.add(event)
+            curve = self.curves.get(event.action)
+            if curve is not None:
+                curve.add(event)
+
+    def _add_memory(self, sample):
+        with self._lock:
+            memory = self.memory.setdefault((sample.action, sample.pid),
+                                            [sample.users, sample.base_kb, 0])
+            memory[2] = max(memory[2], sample.kb)
+
+    def memory_report(self):
+        """Return the peak memory of the workers of every action.
+
+        kb_per_user is the memory of all the workers of an action divided
+        by the number of users they simulate.
+        """
+        actions = collections.OrderedDict()
+        with self._lock:
+            for (action, _), memory in sorted(self.memory.items()):
+                actions.setdefault(action, []).append(memory)
+        report = []
+        for action, workers in actions.items():
+            users = sum(users for users, _, _ in workers)
+            report.append({
+                'action': action,
+                'processes': len(workers),
+                'users': users,
+                'base_kb': sum(base for _, base, _ in workers) / len(workers),
+                'peak_kb': sum(peak for _, _, peak in workers) / len(workers),
+                'kb_per_user': (float(sum(peak for _, _, peak in workers)) /
+                                users if users else None),
+            })
+        return report
+
+    def add_curve(self, action, curve):
+        """Also count the events of action in curve, a LoadCurve."""
+        with self._lock:
+            self.curves[action] = curve
+
+    def run(self):
+        next_snapshot = self.started_at + self.interval
+        while not self._stopping.is_set():
+            self._drain(min(0.5, max(0, next_snapshot - time.time())))
+            if time.time() >= next_snapshot:
+                self.write_snapshot(self.snapshot())
+                next_snapshot += self.interval
+
+    def _drain(self, timeout):
+        try:
+            event = self.queue.get(timeout=timeout)
+        except Queue.Empty:
+            return
+        self.add(event)
+        # Then whatever is already there, without waiting
+        while True:
+            try:
+                self.add(self.queue.get_nowait())
+            except Queue.Empty:
+                return
+
+    def stop(self, timeout=5):
+        """Stop collecting, once the queued events are in."""
+        self._stopping.set()
+        self.join(timeout)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                self.add(self.queue.get(timeout=0.1))
+            except Queue.Empty:
+                break
+        self.stopped_at = time.time()
+
+    def snapshot(self, now=None):
+        """Return the rolling figures of every (action, step)."""
+        now = now or time.time()
+        with self._lock:
+            steps = []
+            for (action, step), stats in self.stats.items():
+                entry = stats.rolling(now, self.started_at,
+                                      self.histograms)
+                entry.update(action=action, step=step)
+                steps.append(entry)
+        return {'time': now, 'elapsed': now - self.started_at,
+                'steps': steps}
+
+    def write_snapshot(self, snapshot):
+        write_snapshot(snapshot, self.snapshot_path)
+        if self.listener is not None:
+            self.listener(snapshot)
+
+    def report(self, **sections):
+        """Return the totals of the run, with the extra sections given."""
+        end = self.stopped_at or time.time()
+        duration = end - self.started_at
+        with self._lock:
+            steps = []
+            for (action, step), stats in self.stats.items():
+                entry = stats.totals(duration)
+                entry.update(action=action, step=step)
+                steps.append(entry)
+        report = {'start': self.started_at, 'end': end,
+                  'duration': duration, 'steps': steps,
+                  'memory': self.memory_report()}
+        report.update(sections)
+        return report
+
+    def write_report(self, path, **sections):
+        with open(path, 'w') as f:
+            json.dump(self.report(**sections), f, indent=2)
+
+
+def _format(value):
+    return '-' if value is None else '%.1f' % value
+
+
+def write_snapshot(snapshot, path=None):
+    """Log a snapshot, and append it to path as a JSON line if given."""
+    for entry in snapshot['steps']:
+        LOG.info("%s/%s: %.2f ops/s, %.1f%% errors, p50 %s ms, "
+                 "p95 %s ms, p99 %s ms", entry['action'],
+                 entry['step'], entry['ops_per_s'],
+                 entry['error_rate'] * 100,
+                 *[_format(entry['latency_ms'][p])
+                   for p in ('p50', 'p95', 'p99')])
+    if path:
+        with open(path, 'a') as f:
+            f.write(json.dumps(snapshot) + '\n')
+
+
+def merge_snapshots(snapshots):
+    """Merge snapshots of several drivers taken at about the same time.
+
+    The snapshots must carry their histograms, see Aggregator. The merged
+    snapshot has the total ops/s and the error rate and latency of all the
+    events.
+    """
+    merged = collections.OrderedDict()
+    for snapshot in snapshots:
+        for entry in snapshot['steps']:
+            key = (entry['action'], entry['step'])
+            count, errors, ops, histogram = merged.get(
+                key, (0, 0, 0.0, metrics.Histogram()))
+            histogram.merge(metrics.Histogram.from_dict(entry['latency_us']))
+            merged[key] = (count + entry['count'],
+                           errors + int(round(entry['error_rate'] *
+                                              entry['count'])),
+                           ops + entry['ops_per_s'], histogram)
+    steps = []
+    for (action, step), (count, errors, ops, histogram) in merged.items():
+        # NOTE: the span the rolling figures are computed over is given
+        # by the summed rates rather than by a window length
+        entry = _rolling(count, errors, count / ops if ops else 1e-6,
+                         histogram)
+        entry.update(action=action, step=step)
+        steps.append(entry)
+    return {
+        'time': max(snapshot['time'] for snapshot in snapshots),
+        'elapsed': max(snapshot['elapsed'] for snapshot in snapshots),
+        'steps': steps,
+    }
+
+
+def merge_reports(reports):
+    """Merge the reports of the runs of several drivers into one.
+
+    Only the totals of the steps and the memory figures are merged: the
+    step totals are computed again from the summed counts and the merged
+    latency histograms, over the whole span of the runs.
+    """
+    start = min(report['start'] for report in reports)
+    end = max(report['end'] for report in reports)
+    duration = end - start
+    merged = collections.OrderedDict()
+    for report in reports:
+        for entry in report['steps']:
+            key = (entry['action'], entry['step'])
+            stats = merged.get(key)
+            if stats is None:
+                stats = merged[key] = StepStats()
+            stats.count += entry['count']
+            stats.errors += entry['errors']
+            for error, count in entry['error_types'].items():
+                stats.error_types[error] += count
+            stats.latency.merge(
+                metrics.Histogram.from_dict(entry['latency_us']))
+    steps = []
+    for (action, step), stats in merged.items():
+        entry = stats.totals(duration)
+        entry.update(action=action, step=step)
+        steps.append(entry)
+    memory = collections.OrderedDict()
+    for report in reports:
+        for entry in report['memory']:
+            totals = memory.setdefault(entry['action'], [0, 0, 0, 0])
+            totals[0] += entry['processes']
+            totals[1] += entry['users']
+            totals[2] += entry['base_kb'] * entry['processes']
+            totals[3] += entry['peak_kb'] * entry['processes']
+    memory_report = [
+        {
+            'action': action,
+            'processes': processes,
+            'users': users,
+            'base_kb': base / processes,
+            'peak_kb': peak / processes,
+            'kb_per_user': float(peak) / users if users else None,
+        } for action, (processes, users, base, peak) in memory.items()]
+    return {'start': start, 'end': end, 'duration': duration,
+            'steps': steps, 'memory': memory_report}
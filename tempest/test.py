@@ -16,12 +16,14 @@
 #    under the License.
 
 import logging
-import time
 
 import nose.plugins.attrib
 import testresources
 import testtools
+import testtools.content
 
+from tempest.common import http_log
+from tempest.common import waiters
 from tempest import config
 from tempest import manager
 
@@ -62,6 +64,18 @@ class BaseTestCase(testtools.TestCase,
         if hasattr(super(BaseTestCase, cls), 'setUpClass'):
             super(BaseTestCase, cls).setUpClass()
 
+    def setUp(self):
+        super(BaseTestCase, self).setUp()
+        request_log = http_log.get_buffer()
+        if request_log is not None:
+            request_log.clear()
+            self.addOnException(self._attach_request_log)
+
+    def _attach_request_log(self, exc_info):
+        request_log = http_log.get_buffer()
+        self.addDetail('request-log',
+                       testtools.content.text_content(request_log.dump()))
+
 
 def call_until_true(func, duration, sleep_for):
     """
@@ -72,18 +86,12 @@ def call_until_true(func, duration, sleep_for):
     :param func: A zero argument callable that returns True on success.
     :param duration: The number of seconds for which to attempt a
         successful call of the function.
-    :param sleep_for: The number of seconds to sleep after an unsuccessful
+    :param sleep_for: The longest time to sleep after an unsuccessful
                       invocation of the function.
     """
-    now = time.time()
-    timeout = now + duration
-    while now < timeout:
-        if func():
-            return True
-        LOG.debug("Sleeping for %d seconds", sleep_for)
-        time.sleep(sleep_for)
-        now = time.time()
-    return False
+    return bool(waiters.wait_for(func, bool, duration, sleep_for,
+                                 on_timeout=lambda status, elapsed: None,
+                                 name=getattr(func, '__name__', None)))
 
 
 class TestCase(BaseTestCase):
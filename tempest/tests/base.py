@@ -0,0 +1,74 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import atexit
+import os
+import shutil
+import tempfile
+
+from oslo.config import cfg
+import testtools
+
+from tempest.common import connection_pool
+from tempest import config
+from tools import fake_swift
+from tools import swift_benchmark
+
+_server = None
+
+
+def fake_cloud():
+    """Start tools/fake_swift.py, a Keystone and Swift stand-in, once.
+
+    The configuration of the process is loaded again from a file pointing
+    at it: TempestConfig is a singleton, the stand-in serves every test of
+    the process.
+
+    :returns: the stand-in and the TempestConfig
+    """
+    global _server
+    if _server is None:
+        server = fake_swift.Server()
+        auth_url = server.start()
+        atexit.register(server.stop)
+        conf_dir = tempfile.mkdtemp()
+        atexit.register(shutil.rmtree, conf_dir, True)
+        path = os.path.join(conf_dir, 'tempest.conf')
+        with open(path, 'w') as f:
+            f.write(swift_benchmark.FAKE_CONFIG % {'auth_url': auth_url})
+        os.environ['TEMPEST_CONFIG_DIR'] = conf_dir
+        os.environ['TEMPEST_CONFIG'] = 'tempest.conf'
+        # NOTE: the options are registered by the first TempestConfig(),
+        # which may have read another file already
+        config.TempestConfig()
+        cfg.CONF([], project='tempest', default_config_files=[path])
+        _server = server
+    return _server, config.TempestConfig()
+
+
+class FakeCloudTestCase(testtools.TestCase):
+
+    """Runs against the stand-in of fake_cloud(), self.server."""
+
+    def setUp(self):
+        super(FakeCloudTestCase, self).setUp()
+        self.server, self.config = fake_cloud()
+        self.addCleanup(self._close_connections)
+
+    def _close_connections(self):
+        # NOTE: the clients keep their connections to the stand-in alive
+        connection_pool.get_pool().clear()
@@ -0,0 +1,55 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+
+import testtools
+
+from tempest.common import concurrency
+
+
+class RunConcurrentlyTest(testtools.TestCase):
+
+    def test_results_and_bounded_threads(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def task(fail):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            try:
+                if fail:
+                    raise ValueError(fail)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+        results = concurrency.run_concurrently(
+            [lambda i=i: task('failed %d' % i if i % 3 == 0 else None)
+             for i in range(10)], 2)
+        self.assertEqual(10, len(results))
+        for i, exc_info in enumerate(results):
+            if i % 3:
+                self.assertIsNone(exc_info)
+            else:
+                self.assertEqual('failed %d' % i, str(exc_info[1]))
+        self.assertTrue(peak[0] <= 2)
+
+    def test_no_calls(self):
+        self.assertEqual([], concurrency.run_concurrently([], 4))
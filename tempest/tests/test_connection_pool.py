@@ -0,0 +1,68 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import threading
+import time
+
+import testtools
+
+from tempest.common import connection_pool
+from tempest import exceptions
+
+
+class ConnectionPoolTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ConnectionPoolTest, self).setUp()
+        self.pool = connection_pool.ConnectionPool(maxsize=1, timeout=0.2)
+        self.key_a = self.pool.make_key('http://a.example.com/')
+        self.key_b = self.pool.make_key('http://b.example.com/')
+
+    def test_checkout_reuses_checked_in(self):
+        http = self.pool.checkout(self.key_a)
+        self.pool.checkin(self.key_a, http)
+        self.assertIs(http, self.pool.checkout(self.key_a))
+        self.assertEqual(1, self.pool.stats()['hits'])
+
+    def test_checkout_times_out(self):
+        self.pool.checkout(self.key_a)
+        start = time.time()
+        self.assertRaises(exceptions.ConnectionPoolTimeout,
+                          self.pool.checkout, self.key_a)
+        self.assertTrue(time.time() - start >= 0.2)
+        # Other endpoints are not limited by key_a
+        self.pool.checkout(self.key_b)
+
+    def test_waiters_of_every_key_are_woken(self):
+        self.pool.timeout = 5
+        held = dict((key, self.pool.checkout(key))
+                    for key in (self.key_a, self.key_b))
+        got = []
+
+        def wait_for(key):
+            got.append(self.pool.checkout(key))
+
+        waiters = [threading.Thread(target=wait_for, args=(key,))
+                   for key in held]
+        for waiter in waiters:
+            waiter.start()
+        time.sleep(0.1)
+        for key, http in held.items():
+            self.pool.checkin(key, http)
+        for waiter in waiters:
+            waiter.join(10)
+        self.assertEqual(sorted(held.values()), sorted(got))
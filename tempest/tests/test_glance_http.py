@@ -0,0 +1,147 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import BaseHTTPServer
+import SocketServer
+import threading
+
+import testtools
+
+from tempest.common import glance_http
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.tokens.append(self.headers.get('X-Auth-Token'))
+        if self.headers.get('X-Auth-Token') in self.server.valid_tokens:
+            status, body = 200, 'image data'
+            if self.path.endswith('/big'):
+                body *= 100000
+        else:
+            status, body = 401, 'Authentication required'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.valid_tokens = set()
+        self.tokens = []
+
+    def handle_error(self, request, client_address):
+        # NOTE: the tests close connections in the middle of responses
+        pass
+
+
+class _ServerTestCase(testtools.TestCase):
+
+    def setUp(self):
+        super(_ServerTestCase, self).setUp()
+        self.server = _Server()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.endpoint = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.token = 'old'
+
+    def _client(self, **kwargs):
+        http = glance_http.HTTPClient(self.endpoint, **kwargs)
+        self.addCleanup(http.close)
+        return http
+
+
+class HTTPClientAuthTest(_ServerTestCase):
+
+    def _get(self, http):
+        resp, body = http.raw_request('GET', '/v1/images/1')
+        return resp.status, ''.join(body)
+
+    def test_token_callable_is_called_per_request(self):
+        http = self._client(token=lambda: self.token)
+        self.server.valid_tokens.update(['old', 'new'])
+        self._get(http)
+        self.token = 'new'
+        self._get(http)
+        self.assertEqual(['old', 'new'], self.server.tokens)
+
+    def test_replays_once_on_401(self):
+        failed = []
+
+        def reauthenticate(token):
+            failed.append(token)
+            self.token = 'new'
+
+        http = self._client(token=lambda: self.token,
+                            reauthenticate=reauthenticate)
+        self.server.valid_tokens.add('new')
+        self.assertEqual((200, 'image data'), self._get(http))
+        self.assertEqual(['old'], failed)
+        self.assertEqual(['old', 'new'], self.server.tokens)
+
+    def test_replay_rejected_again(self):
+        http = self._client(token=lambda: self.token,
+                            reauthenticate=lambda token: None)
+        self.assertEqual(401, self._get(http)[0])
+        self.assertEqual(['old', 'old'], self.server.tokens)
+
+    def test_no_replay_without_reauthenticate(self):
+        http = self._client(token='old')
+        self.assertEqual(401, self._get(http)[0])
+        self.assertEqual(['old'], self.server.tokens)
+
+
+class ResponseBodyIteratorTest(_ServerTestCase):
+
+    def setUp(self):
+        super(ResponseBodyIteratorTest, self).setUp()
+        self.server.valid_tokens.add('old')
+        self.http = self._client(token='old')
+
+    def test_read_to_the_end_keeps_connection(self):
+        resp, body = self.http.raw_request('GET', '/v1/images/big')
+        self.assertEqual(1000000, len(''.join(body)))
+        self.assertEqual(1, len(self.http._idle))
+
+    def test_close_before_the_end_closes_connection(self):
+        resp, body = self.http.raw_request('GET', '/v1/images/big')
+        body.next()
+        body.close()
+        self.assertEqual([], self.http._idle)
+        self.assertTrue(resp.isclosed())
+        self.assertRaises(StopIteration, body.next)
+
+    def test_garbage_collected_closes_connection(self):
+        resp, body = self.http.raw_request('GET', '/v1/images/big')
+        body.next()
+        del body
+        self.assertEqual([], self.http._idle)
+        self.assertTrue(resp.isclosed())
@@ -0,0 +1,71 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+
+from tempest.common import image_cache
+
+
+class ImageFixtureCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ImageFixtureCacheTest, self).setUp()
+        self.created = []
+        self.deleted = []
+
+    def _acquire(self, cache, key, found=None):
+        def create(key):
+            self.created.append(key)
+            return 'image-%d' % len(self.created)
+
+        return cache.acquire(key, lambda key: found, create,
+                             self.deleted.append)
+
+    def test_purge_deletes_released_images(self):
+        cache = image_cache.ImageFixtureCache()
+        image_id = self._acquire(cache, 'a')
+        self.assertEqual(image_id, self._acquire(cache, 'a'))
+        self.assertEqual(['a'], self.created)
+        cache.release(image_id)
+        cache.purge()
+        self.assertEqual([], self.deleted)
+        cache.release(image_id)
+        cache.purge()
+        self.assertEqual([image_id], self.deleted)
+        self.assertNotEqual(image_id, self._acquire(cache, 'a'))
+
+    def test_purge_all(self):
+        cache = image_cache.ImageFixtureCache()
+        image_id = self._acquire(cache, 'a')
+        cache.purge(unused_only=False)
+        self.assertEqual([image_id], self.deleted)
+
+    def test_kept_and_found_images_are_not_deleted(self):
+        cache = image_cache.ImageFixtureCache(keep=True)
+        cache.release(self._acquire(cache, 'a'))
+        self.assertEqual('image-0', self._acquire(cache, 'b',
+                                                  found='image-0'))
+        cache.release('image-0')
+        cache.purge(unused_only=False)
+        self.assertEqual(['a'], self.created)
+        self.assertEqual([], self.deleted)
+
+    def test_release_unknown_image(self):
+        cache = image_cache.ImageFixtureCache()
+        cache.release('not-a-fixture')
+        cache.purge()
+        self.assertEqual([], self.deleted)
@@ -0,0 +1,59 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+
+from tempest.common import metrics
+
+
+class URLTemplateTest(testtools.TestCase):
+
+    def test_ids(self):
+        self.assertEqual(
+            'servers/{id}/os-volume_attachments/{id}',
+            metrics.url_template('servers/3f2504e0-4f89-11d3-9a0c-0305e82c3301'
+                                 '/os-volume_attachments/42?detail=1'))
+
+    def test_object_store_relative(self):
+        for url, template in (('', ''),
+                              ('?format=json', ''),
+                              ('c1', '{container}'),
+                              ('c1?prefix=a', '{container}'),
+                              ('c1/obj', '{container}/{object}'),
+                              ('c1/a/b/c', '{container}/{object}')):
+            self.assertEqual(template, metrics.url_template(url, True))
+
+    def test_object_store_absolute(self):
+        for url, template in (
+                ('/v1/AUTH_x', '/v1/{account}'),
+                ('/v1/AUTH_x/', '/v1/{account}'),
+                ('/v1/AUTH_x/c1', '/v1/{account}/{container}'),
+                ('/v1/AUTH_x/c1/a/b', '/v1/{account}/{container}/{object}'),
+                ('http://swift:8080/v1/AUTH_x/c1/o?temp_url_sig=1',
+                 '/v1/{account}/{container}/{object}'),
+                ('/info', '/info')):
+            self.assertEqual(template, metrics.url_template(url, True))
+
+    def test_recorder_keys(self):
+        recorder = metrics.Recorder('object-store')
+        recorder.record('object-store', 'get', 'c1/o1', 200, 0.1)
+        recorder.record('object-store', 'GET', 'c2/o2', 200, 0.1)
+        recorder.record('compute', 'GET', 'servers/12', 200, 0.1)
+        self.assertEqual(
+            set([('object-store', 'GET', '{container}/{object}', '200'),
+                 ('compute', 'GET', 'servers/{id}', '200')]),
+            set(recorder.snapshot()[1]))
@@ -0,0 +1,44 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from tempest.services.identity.json import identity_client as json_client
+from tempest.services.identity.xml import identity_client as xml_client
+from tempest.tests import base
+
+
+class TokenClientTest(base.FakeCloudTestCase):
+
+    def _test_auth(self, client_class):
+        client = client_class(self.config)
+        resp, body = client.auth(self.config.identity.username,
+                                 self.config.identity.password,
+                                 self.config.identity.tenant_name)
+        self.assertEqual(200, resp.status)
+        self.assertIn('access', body)
+
+    def test_json_auth(self):
+        self._test_auth(json_client.TokenClientJSON)
+
+    def test_xml_auth(self):
+        self._test_auth(xml_client.TokenClientXML)
+
+    def test_json_get_token(self):
+        client = json_client.TokenClientJSON(self.config)
+        token = client.get_token(self.config.identity.username,
+                                 self.config.identity.password,
+                                 self.config.identity.tenant_name)
+        self.assertTrue(token)
@@ -22,6 +22,7 @@ import time
 import boto.exception
 from testtools import TestCase
 
+from tempest.common import waiters
 import tempest.config
 
 LOG = logging.getLogger(__name__)
@@ -39,26 +40,20 @@ def state_wait(lfunction, final_set=set(), valid_set=None):
         final_set = set((final_set,))
     if not isinstance(valid_set, set) and valid_set is not None:
         valid_set = set((valid_set,))
-    start_time = time.time()
-    old_status = status = lfunction()
-    while True:
-        if status != old_status:
-            LOG.info('State transition "%s" ==> "%s" %d second', old_status,
-                     status, time.time() - start_time)
-        if status in final_set:
-            return status
-        if valid_set is not None and status not in valid_set:
-            return status
-        dtime = time.time() - start_time
-        if dtime > default_timeout:
-            raise TestCase.failureException("State change timeout exceeded!"
-                                            '(%ds) While waiting'
-                                            'for %s at "%s"' %
-                                            (dtime,
-                                            final_set, status))
-        time.sleep(default_check_interval)
-        old_status = status
-        status = lfunction()
+
+    def is_final(status):
+        return (status in final_set or
+                (valid_set is not None and status not in valid_set))
+
+    def on_timeout(status, dtime):
+        return TestCase.failureException("State change timeout exceeded!"
+                                         '(%ds) While waiting'
+                                         'for %s at "%s"' %
+                                         (dtime, final_set, status))
+
+    return waiters.wait_for(lfunction, is_final, default_timeout,
+                            default_check_interval, on_timeout=on_timeout,
+                            name=getattr(lfunction, '__name__', None))
 
 
 def re_search_wait(lfunction, regexp):
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure the import time of tempest.clients and the cost of building a
+Manager.
+
+The "lazy" numbers are what tests pay today. The "eager" numbers import
+every registered client module and build every client with the Manager
+credentials, which is what tempest.clients used to do at import and
+Manager() time. Run it from the top of the tree as
+"python -m tools.client_benchmark".
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+IMPORT_SNIPPET = """
+import time
+start = time.time()
+import tempest.clients
+if %(eager)s:
+    for path in tempest.clients.CLIENTS.values():
+        for p in (path.values() if isinstance(path, dict) else [path]):
+            tempest.clients.get_client_class(p)
+print time.time() - start
+"""
+
+
+def time_import(eager, repeat):
+    results = []
+    for _ in xrange(repeat):
+        out = subprocess.check_output(
+            [sys.executable, '-c', IMPORT_SNIPPET % {'eager': eager}])
+        results.append(float(out.strip().splitlines()[-1]))
+    return min(results)
+
+
+def build_clients(manager, failures):
+    """Build every client of manager as Manager() used to, uncached.
+
+    The names of the clients that can't be built, e.g. for lack of
+    configuration, are added to failures.
+    """
+    from tempest import clients
+
+    built = []
+    for name, path in clients.CLIENTS.items():
+        if isinstance(path, dict):
+            path = path[manager.interface]
+        client_class = clients.get_client_class(path)
+        if name in clients.CONFIG_ONLY_CLIENTS:
+            args = (manager.config,)
+        else:
+            args = manager.client_args
+        try:
+            built.append(client_class(*args))
+        except Exception:
+            failures.add(name)
+    return built
+
+
+def time_manager(eager, repeat):
+    from tempest import clients
+
+    results = []
+    failures = set()
+    for _ in xrange(repeat):
+        start = time.time()
+        manager = clients.Manager()
+        if eager:
+            build_clients(manager, failures)
+        results.append(time.time() - start)
+    return min(results), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-n', '--repeat', default=5, type=int,
+                        help="Number of runs, the best one is reported.")
+    ns = parser.parse_args()
+
+    print "%-28s %10s" % ("", "seconds")
+    for eager in (False, True):
+        label = 'eager' if eager else 'lazy'
+        print "%-28s %10.4f" % ("import tempest.clients (%s)" % label,
+                                time_import(eager, ns.repeat))
+    for eager in (False, True):
+        label = 'eager' if eager else 'lazy'
+        elapsed, failures = time_manager(eager, ns.repeat)
+        print "%-28s %10.4f" % ("Manager() (%s)" % label, elapsed)
+        if failures:
+            print "  clients failing to build: %s" % ', '.join(
+                sorted(failures))
+
+
+if __name__ == "__main__":
+    main()
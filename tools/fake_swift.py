@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+In-memory stand-in for Keystone and a Swift proxy.
+
+It implements just enough of both APIs for the object storage clients to
+run without a cloud, e.g. for tools/swift_benchmark.py in CI: Keystone v2
+token requests returning an object-store endpoint, /info, account and
+container listings with limit/marker/prefix/delimiter, container and
+object metadata, object PUT (plain or chunked), GET (with single ranges
+and dynamic large object manifests), HEAD, DELETE and bulk delete.
+Credentials are not checked and everything lives in memory.
+"""
+
+import argparse
+import BaseHTTPServer
+import hashlib
+import json
+import SocketServer
+import threading
+import time
+import urllib
+import urlparse
+
+ACCOUNT = 'AUTH_bench'
+LISTING_LIMIT = 10000
+ACL_HEADERS = ('x-container-read', 'x-container-write')
+
+
+class _Store(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.containers = {}
+
+
+class _Container(object):
+
+    def __init__(self):
+        self.objects = {}
+        self.meta = {}
+
+
+class _Object(object):
+
+    def __init__(self, data, content_type, meta):
+        self.data = data
+        self.etag = hashlib.md5(data).hexdigest()
+        self.content_type = content_type
+        self.meta = meta
+        self.last_modified = time.strftime('%Y-%m-%dT%H:%M:%S.000000',
+                                           time.gmtime())
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Small replies are written header by header, don't let them wait for
+    # delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body='', headers=None):
+        self.send_response(status)
+        headers = dict(headers or {})
+        if status >= 400 and not body:
+            # Like the Swift proxy
+            body = '<html><h1>%s</h1></html>' % self.responses[status][0]
+            headers['Content-Type'] = 'text/html; charset=UTF-8'
+        headers.setdefault('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, status, data):
+        self._reply(status, json.dumps(data),
+                    {'Content-Type': 'application/json; charset=utf-8'})
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(';')[0], 16)
+                if not size:
+                    self.rfile.readline()
+                    return ''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _parse(self):
+        parts = urlparse.urlparse(self.path)
+        params = dict(urlparse.parse_qsl(parts.query, keep_blank_values=True))
+        return urllib.unquote(parts.path), params
+
+    def _route(self):
+        path, params = self._parse()
+        if path.endswith('/tokens'):
+            return self._tokens()
+        if path == '/info':
+            return self._json(200, {'swift': {'version': 'fake'},
+                                    'bulk_delete': {
+                                        'max_deletes_per_request': 10000}})
+        segments = path.lstrip('/').split('/', 3)
+        if len(segments) < 2 or segments[0] != 'v1':
+            return self._reply(404)
+        body = self._read_body()
+        segments = [segment for segment in segments[2:] if segment]
+        if 'bulk-delete' in params and self.command in ('POST', 'DELETE'):
+            return self._bulk_delete(body)
+        if not segments:
+            return self._account(params)
+        if len(segments) == 1:
+            return self._container(segments[0], params)
+        return self._object(segments[0], segments[1], body)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = _route
+
+    def _tokens(self):
+        self._read_body()
+        host, port = self.server.server_address[:2]
+        endpoint = 'http://%s:%d/v1/%s' % (host, port, ACCOUNT)
+        expires = time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                time.gmtime(time.time() + 86400))
+        self._json(200, {'access': {
+            'token': {'id': hashlib.md5(str(time.time())).hexdigest(),
+                      'expires': expires},
+            'serviceCatalog': [{
+                'type': 'object-store',
+                'name': 'swift',
+                'endpoints': [{'region': 'RegionOne',
+                               'publicURL': endpoint,
+                               'internalURL': endpoint,
+                               'adminURL': endpoint}]}]}})
+
+    def _listing(self, names, params, describe):
+        prefix = params.get('prefix', '')
+        marker = params.get('marker', '')
+        delimiter = params.get('delimiter')
+        limit = int(params.get('limit', LISTING_LIMIT))
+        if limit > LISTING_LIMIT:
+            return self._reply(412)
+        entries = []
+        subdirs = set()
+        for name in sorted(names):
+            if len(entries) >= limit:
+                break
+            if name <= marker or not name.startswith(prefix):
+                continue
+            if delimiter:
+                index = name.find(delimiter, len(prefix))
+                if index >= 0:
+                    subdir = name[:index + 1]
+                    if subdir not in subdirs and subdir > marker:
+                        subdirs.add(subdir)
+                        entries.append({'subdir': subdir})
+                    continue
+            entries.append(describe(name))
+        self._json(200, entries)
+
+    def _meta(self, kind):
+        """Return the metadata headers of the request for kind.
+
+        X-Remove-<kind>-Meta-* headers map to None. The container ACLs are
+        kept as metadata, but not enforced.
+        """
+        prefix = 'x-%s-meta-' % kind
+        remove = 'x-remove-%s-meta-' % kind
+        meta = {}
+        for header, value in self.headers.items():
+            header = header.lower()
+            if header.startswith(prefix) or header in ACL_HEADERS:
+                meta[header] = value
+            elif header.startswith(remove):
+                meta[prefix + header[len(remove):]] = None
+        return meta
+
+    def _update_meta(self, meta, kind):
+        for header, value in self._meta(kind).items():
+            if value:
+                meta[header] = value
+            else:
+                meta.pop(header, None)
+
+    def _account(self, params):
+        store = self.server.store
+        with store.lock:
+            containers = dict((name, (len(container.objects),
+                                      sum(len(obj.data) for obj in
+                                          container.objects.values())))
+                              for name, container in
+                              store.containers.items())
+        headers = {
+            'X-Account-Container-Count': str(len(containers)),
+            'X-Account-Object-Count': str(sum(c[0]
+                                              for c in containers.values())),
+            'X-Account-Bytes-Used': str(sum(c[1]
+                                            for c in containers.values()))}
+        if self.command == 'HEAD':
+            return self._reply(204, headers=headers)
+        if self.command == 'POST':
+            return self._reply(204)
+        self._listing(containers, params, lambda name: {
+            'name': name, 'count': containers[name][0],
+            'bytes': containers[name][1]})
+
+    def _container(self, name, params):
+        store = self.server.store
+        with store.lock:
+            container = store.containers.get(name)
+            if self.command == 'PUT':
+                status = 202
+                if container is None:
+                    container = store.containers[name] = _Container()
+                    status = 201
+                self._update_meta(container.meta, 'container')
+                return self._reply(status)
+            if container is None:
+                return self._reply(404)
+            if self.command == 'DELETE':
+                if container.objects:
+                    return self._reply(409)
+                del store.containers[name]
+                return self._reply(204)
+            if self.command == 'POST':
+                self._update_meta(container.meta, 'container')
+                return self._reply(204)
+            objects = dict(container.objects)
+            headers = dict(container.meta)
+        if self.command == 'HEAD':
+            headers.update({
+                'X-Container-Object-Count': str(len(objects)),
+                'X-Container-Bytes-Used': str(sum(len(obj.data) for obj in
+                                                  objects.values()))})
+            return self._reply(204, headers=headers)
+        self._listing(objects, params, lambda name: {
+            'name': name, 'bytes': len(objects[name].data),
+            'hash': objects[name].etag,
+            'content_type': objects[name].content_type,
+            'last_modified': objects[name].last_modified})
+
+    def _object(self, container_name, name, body):
+        store = self.server.store
+        if self.command == 'PUT':
+            meta = self._meta('object')
+            if 'X-Object-Manifest' in self.headers:
+                meta['x-object-manifest'] = self.headers['X-Object-Manifest']
+            new = _Object(body, self.headers.get('Content-Type',
+                                                 'application/octet-stream'),
+                          meta)
+        with store.lock:
+            container = store.containers.get(container_name)
+            obj = container and container.objects.get(name)
+            if container is None:
+                return self._reply(404)
+            if self.command == 'PUT':
+                container.objects[name] = new
+                return self._reply(201, headers={'Etag': new.etag})
+            if obj is None:
+                return self._reply(404)
+            if self.command == 'DELETE':
+                del container.objects[name]
+                return self._reply(204)
+            if self.command == 'POST':
+                # Like Swift, a POST replaces all the object metadata
+                obj.meta = self._meta('object')
+                if 'X-Object-Manifest' in self.headers:
+                    obj.meta['x-object-manifest'] = \
+                        self.headers['X-Object-Manifest']
+                return self._reply(202)
+            data, etag = obj.data, obj.etag
+            manifest = obj.meta.get('x-object-manifest')
+            if manifest:
+                data, etag = self._manifest_data(manifest)
+        headers = dict(obj.meta)
+        headers.update({'Etag': etag, 'Content-Type': obj.content_type,
+                        'Accept-Ranges': 'bytes'})
+        if self.command == 'HEAD':
+            headers['Content-Length'] = str(len(data))
+            return self._reply(200, headers=headers)
+        byte_range = self.headers.get('Range', '')
+        if byte_range.startswith('bytes=') and ',' not in byte_range:
+            first, last = byte_range[6:].split('-')
+            if first:
+                first = int(first)
+                last = int(last) if last else len(data) - 1
+            else:
+                first, last = len(data) - int(last), len(data) - 1
+            last = min(last, len(data) - 1)
+            if first > last:
+                return self._reply(416)
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (first, last,
+                                                           len(data))
+            return self._reply(206, data[first:last + 1], headers)
+        self._reply(200, data, headers)
+
+    def _manifest_data(self, manifest):
+        # Called with the store lock held
+        container_name, _, prefix = urllib.unquote(manifest).partition('/')
+        container = self.server.store.containers.get(container_name)
+        segments = []
+        if container is not None:
+            segments = [container.objects[name]
+                        for name in sorted(container.objects)
+                        if name.startswith(prefix)]
+        etag = hashlib.md5(''.join(seg.etag for seg in segments)).hexdigest()
+        return ''.join(seg.data for seg in segments), '"%s"' % etag
+
+    def _bulk_delete(self, body):
+        store = self.server.store
+        deleted = not_found = 0
+        errors = []
+        with store.lock:
+            for line in body.splitlines():
+                path = urllib.unquote(line.strip()).lstrip('/')
+                if not path:
+                    continue
+                container_name, _, name = path.partition('/')
+                container = store.containers.get(container_name)
+                if container is None or (name and
+                                         name not in container.objects):
+                    not_found += 1
+                elif name:
+                    del container.objects[name]
+                    deleted += 1
+                elif container.objects:
+                    errors.append([path, '409 Conflict'])
+                else:
+                    del store.containers[container_name]
+                    deleted += 1
+        self._json(200, {'Number Deleted': deleted,
+                         'Number Not Found': not_found,
+                         'Errors': errors,
+                         'Response Status': ('400 Bad Request' if errors
+                                             else '200 OK'),
+                         'Response Body': ''})
+
+
+class Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0)):
+        BaseHTTPServer.HTTPServer.__init__(self, address, Handler)
+        self.store = _Store()
+
+    @property
+    def auth_url(self):
+        return 'http://%s:%d/v2.0/' % self.server_address[:2]
+
+    def start(self):
+        """Serve from a daemon thread and return the Keystone URL."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.auth_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', default=8080, type=int)
+    ns = parser.parse_args()
+
+    server = Server((ns.host, ns.port))
+    print "Keystone URL: %s" % server.auth_url
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measure object storage throughput over a matrix of object sizes and
+concurrency levels.
+
+For every (size, concurrency) cell, --objects objects are PUT, then GET,
+HEAD and DELETEd by that many threads sharing the tempest object storage
+clients. The ops/s, MB/s and latency percentiles of every operation are
+printed and saved as JSON, so that runs against successive cloud releases
+can be compared.
+
+The cloud is the one of the tempest configuration, or with --fake the
+in-memory stand-in of tools/fake_swift.py started in-process. Run it from
+the top of the tree as "python -m tools.swift_benchmark".
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_SIZES = '1K,64K,1M,16M,256M,1G'
+FAKE_SIZES = '1K,64K,1M'
+OPERATIONS = ('PUT', 'GET', 'HEAD', 'DELETE')
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+FAKE_CONFIG = """
+[identity]
+uri = %(auth_url)s
+strategy = keystone
+username = bench
+password = bench
+tenant_name = bench
+
+[metrics]
+enabled = False
+"""
+
+
+def parse_size(text):
+    """Parse a size such as 512, 64K, 16M or 1G."""
+    text = text.strip().upper()
+    if text[-1:] in UNITS:
+        return int(text[:-1]) * UNITS[text[-1]]
+    return int(text)
+
+
+def format_size(size):
+    for unit in ('G', 'M', 'K'):
+        if size >= UNITS[unit] and not size % UNITS[unit]:
+            return '%d%s' % (size / UNITS[unit], unit)
+    return str(size)
+
+
+class Payload(object):
+
+    """File-like object of size bytes repeating a random block.
+
+    Object data is generated while it is sent, so large objects don't
+    have to fit in memory.
+    """
+
+    BLOCK = os.urandom(64 * 1024)
+
+    def __init__(self, size):
+        self.len = size
+        self.offset = 0
+
+    def tell(self):
+        return self.offset
+
+    def read(self, size=-1):
+        remaining = self.len - self.offset
+        if size < 0 or size > remaining:
+            size = remaining
+        pieces = []
+        while size:
+            start = self.offset % len(self.BLOCK)
+            piece = self.BLOCK[start:start + size]
+            pieces.append(piece)
+            size -= len(piece)
+            self.offset += len(piece)
+        return ''.join(pieces)
+
+
+class Benchmark(object):
+
+    def __init__(self, manager, objects):
+        from tempest.common import concurrency
+        from tempest.common import metrics
+
+        self.concurrency = concurrency
+        self.metrics = metrics
+        self.object_client = manager.object_client
+        self.container_client = manager.container_client
+        self.account_client = manager.account_client
+        self.objects = objects
+
+    def _put(self, container, name, size):
+        resp, md5 = self.object_client.create_object_streaming(
+            container, name, Payload(size), content_length=size)
+        if resp.get('etag', '').strip('"') != md5:
+            raise ValueError("ETag mismatch for %s/%s" % (container, name))
+        return size
+
+    def _get(self, container, name, size):
+        resp, body = self.object_client.get_object_streaming(container, name)
+        for _ in body:
+            pass
+        if body.bytes_read != size:
+            raise ValueError("Got %d bytes of %s/%s instead of %d" %
+                             (body.bytes_read, container, name, size))
+        return size
+
+    def _head(self, container, name, size):
+        self.object_client.list_object_metadata(container, name)
+        return 0
+
+    def _delete(self, container, name, size):
+        self.object_client.delete_object(container, name)
+        return 0
+
+    def run_operation(self, operation, container, names, size, concurrency):
+        call = getattr(self, '_' + operation.lower())
+        histogram = self.metrics.Histogram()
+        lock = threading.Lock()
+        transferred = [0]
+
+        def task(name):
+            start = time.time()
+            count = call(container, name, size)
+            latency = time.time() - start
+            with lock:
+                histogram.record(latency * 1e6)
+                transferred[0] += count
+
+        start = time.time()
+        errors = self.concurrency.run_concurrently(
+            [lambda name=name: task(name) for name in names], concurrency)
+        elapsed = time.time() - start
+        failures = [exc_info[1] for exc_info in errors if exc_info]
+        if failures:
+            print >> sys.stderr, "%s: %d error(s), first: %s" % (
+                operation, len(failures), failures[0])
+
+        def ms(value):
+            return None if value is None else value / 1e3
+
+        return {
+            'ops': histogram.count,
+            'errors': len(failures),
+            'elapsed': elapsed,
+            'ops_per_s': histogram.count / elapsed if elapsed else None,
+            'mb_per_s': (transferred[0] / 1e6 / elapsed
+                         if elapsed and transferred[0] else None),
+            'latency_ms': {
+                'mean': ms(histogram.mean()),
+                'p50': ms(histogram.percentile(50)),
+                'p95': ms(histogram.percentile(95)),
+                'p99': ms(histogram.percentile(99)),
+                'max': ms(histogram.max),
+            },
+        }
+
+    def run_cell(self, size, concurrency, operations):
+        container = 'bench-%s-%d-%d' % (format_size(size), concurrency,
+                                        int(time.time() * 1000))
+        names = ['object-%06d' % i for i in xrange(self.objects)]
+        self.container_client.create_container(container)
+        cell = {'size': size, 'concurrency': concurrency,
+                'objects': self.objects, 'operations': {}}
+        try:
+            for operation in operations:
+                cell['operations'][operation] = self.run_operation(
+                    operation, container, names, size, concurrency)
+        finally:
+            self.container_client.purge_container(container)
+        return cell
+
+
+def print_cell(cell):
+    for operation, result in sorted(cell['operations'].items(),
+                                    key=lambda item:
+                                    OPERATIONS.index(item[0])):
+        latency = result['latency_ms']
+        print "%6s %5d %-6s %9.1f %9s %9.2f %9.2f %9.2f %6d" % (
+            format_size(cell['size']), cell['concurrency'], operation,
+            result['ops_per_s'] or 0,
+            '%.2f' % result['mb_per_s'] if result['mb_per_s'] else '-',
+            latency['p50'] or 0, latency['p95'] or 0, latency['p99'] or 0,
+            result['errors'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('-s', '--sizes',
+                        help="Comma separated object sizes, default %s (%s "
+                             "with --fake)." % (DEFAULT_SIZES, FAKE_SIZES))
+    parser.add_argument('-c', '--concurrency', default='1,4,16',
+                        help="Comma separated numbers of threads.")
+    parser.add_argument('-n', '--objects', default=32, type=int,
+                        help="Number of objects per cell.")
+    parser.add_argument('-p', '--operations', default=','.join(OPERATIONS),
+                        help="Comma separated operations among %s." %
+                             ', '.join(OPERATIONS))
+    parser.add_argument('-o', '--output',
+                        help="Write the results to this JSON file.")
+    parser.add_argument('-l', '--label', default='',
+                        help="Label stored with the results, e.g. the "
+                             "cloud release.")
+    parser.add_argument('--fake', action='store_true',
+                        help="Run against an in-memory Swift stand-in.")
+    ns = parser.parse_args()
+
+    if not ns.sizes:
+        ns.sizes = FAKE_SIZES if ns.fake else DEFAULT_SIZES
+    sizes = [parse_size(size) for size in ns.sizes.split(',')]
+    levels = [int(level) for level in ns.concurrency.split(',')]
+    operations = [op.strip().upper() for op in ns.operations.split(',')]
+    for operation in operations:
+        if operation not in OPERATIONS:
+            parser.error("Unknown operation %s" % operation)
+
+    server = None
+    if ns.fake:
+        from tools import fake_swift
+
+        server = fake_swift.Server()
+        auth_url = server.start()
+        conf_dir = tempfile.mkdtemp()
+        with open(os.path.join(conf_dir, 'tempest.conf'), 'w') as f:
+            f.write(FAKE_CONFIG % {'auth_url': auth_url})
+        os.environ['TEMPEST_CONFIG_DIR'] = conf_dir
+        os.environ['TEMPEST_CONFIG'] = 'tempest.conf'
+
+    from tempest import clients
+
+    manager = clients.Manager()
+    # Fails early if there is no object storage endpoint
+    manager.account_client.list_account_containers()
+    benchmark = Benchmark(manager, ns.objects)
+
+    results = {'label': ns.label,
+               'start': time.time(),
+               'endpoint': manager.account_client.base_url,
+               'cells': []}
+    print "%6s %5s %-6s %9s %9s %9s %9s %9s %6s" % (
+        'size', 'conc', 'op', 'ops/s', 'MB/s', 'p50 ms', 'p95 ms', 'p99 ms',
+        'errors')
+    for size in sizes:
+        for concurrency in levels:
+            cell = benchmark.run_cell(size, concurrency, operations)
+            print_cell(cell)
+            results['cells'].append(cell)
+    results['end'] = time.time()
+
+    if ns.output:
+        with open(ns.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if server is not None:
+        from tempest.common import connection_pool
+
+        # Close the kept alive connections before the stand-in goes away
+        connection_pool.get_pool().clear()
+        server.stop()
+    # NOTE: failed operations make the run fail, e.g. the tox env running
+    # it against the stand-in
+    errors = sum(result['errors'] for cell in results['cells']
+                 for result in cell['operations'].values())
+    if errors:
+        print "%d operations failed" % errors
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())